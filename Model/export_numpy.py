@@ -0,0 +1,159 @@
+"""
+Export the trained Keras MLP and StandardScaler into a single NumPy artifact.
+
+The backend serves predictions from this .npz with a plain NumPy forward
+pass, so the API does not need TensorFlow at runtime. The scaler is folded
+into the first Dense layer, so the artifact takes raw features and serving
+needs no separate scaler step.
+
+Reduced-precision variants store float16 or int8 (per-input-row scaled)
+kernels for smaller artifacts; the backend selects one with MODEL_VARIANT.
+--keras also writes the folded Keras model for the TensorFlow fallback.
+
+Usage:
+    python export_numpy.py [--model diabetes_model.h5] [--scaler scaler.pkl] [--output diabetes_model.npz]
+    python export_numpy.py --precision int8 --output diabetes_model.int8.npz
+    python export_numpy.py --variants --keras
+"""
+
+import argparse
+import os
+
+import numpy as np
+
+PRECISIONS = ("float32", "float16", "int8")
+
+# Reduced-precision variants written by --variants / export_variants()
+VARIANT_ARTIFACTS = {
+    "float16": "diabetes_model.fp16.npz",
+    "int8": "diabetes_model.int8.npz"
+}
+
+FOLDED_KERAS_MODEL = "diabetes_model.folded.h5"
+# Model name suffix the backend uses to recognise a Keras model that takes raw features
+FOLDED_MODEL_SUFFIX = "_scaler_folded"
+
+
+def fold_scaler(kernel, bias, mean, scale):
+    """Absorb (x - mean) / scale into the first Dense layer so it takes raw features"""
+    kernel = np.asarray(kernel, dtype=np.float64)
+    bias = np.asarray(bias, dtype=np.float64)
+    mean = np.asarray(mean, dtype=np.float64)
+    scale = np.asarray(scale, dtype=np.float64)
+    folded_kernel = kernel / scale[:, np.newaxis]
+    folded_bias = bias - (mean / scale) @ kernel
+    return folded_kernel.astype(np.float32), folded_bias.astype(np.float32)
+
+
+def quantize_int8(kernel):
+    """Symmetric int8 quantization with one float32 scale per input row (shape (n_in, 1))
+
+    Folding the scaler leaves the first layer's rows orders of magnitude apart
+    (insulin vs. pedigree), so per-output-channel scales would round whole rows to zero.
+    """
+    kernel = np.asarray(kernel, dtype=np.float32)
+    max_abs = np.abs(kernel).max(axis=1, keepdims=True)
+    scales = np.where(max_abs > 0, max_abs / 127.0, 1.0).astype(np.float32)
+    quantized = np.clip(np.round(kernel / scales), -127, 127).astype(np.int8)
+    return quantized, scales
+
+
+def dense_layers(model):
+    """(kernel, bias, activation) of each Dense layer; Dropout and other weightless layers are no-ops at inference"""
+    layers = []
+    for layer in model.layers:
+        if not layer.get_weights():
+            continue
+        kernel, bias = layer.get_weights()
+        layers.append((kernel, bias, layer.get_config()["activation"]))
+    return layers
+
+
+def export_numpy_artifact(model, scaler, output_path, precision="float32", fold=True):
+    """Write the Dense layer weights/biases/activations (and scaler statistics unless folded) to one .npz file"""
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision: {precision}")
+
+    layers = dense_layers(model)
+    if fold:
+        kernel, bias = fold_scaler(layers[0][0], layers[0][1], scaler.mean_, scaler.scale_)
+        layers[0] = (kernel, bias, layers[0][2])
+
+    arrays = {}
+    for index, (kernel, bias, _) in enumerate(layers):
+        if precision == "int8":
+            arrays[f"kernel_{index}"], arrays[f"kernel_scale_{index}"] = quantize_int8(kernel)
+        else:
+            arrays[f"kernel_{index}"] = np.asarray(kernel, dtype=precision)
+        # Biases are a few dozen values; keeping them float32 costs nothing
+        arrays[f"bias_{index}"] = np.asarray(bias, dtype=np.float32)
+
+    if not fold:
+        arrays["scaler_mean"] = np.asarray(scaler.mean_, dtype=np.float32)
+        arrays["scaler_scale"] = np.asarray(scaler.scale_, dtype=np.float32)
+
+    np.savez_compressed(
+        output_path,
+        activations=np.array([activation for _, _, activation in layers]),
+        precision=np.array(precision),
+        **arrays
+    )
+    folded = ", scaler folded" if fold else ""
+    print(f"✅ NumPy artifact saved as '{output_path}' ({len(layers)} dense layers, {precision}{folded})")
+
+
+def export_variants(model, scaler, output_dir="."):
+    """Write every reduced-precision variant next to the float32 artifact"""
+    for precision, path in VARIANT_ARTIFACTS.items():
+        export_numpy_artifact(model, scaler, os.path.join(output_dir, path), precision=precision)
+
+
+def fold_keras_model(model, scaler):
+    """Copy of the Keras model with the scaler folded into its first Dense layer"""
+    import tensorflow as tf
+
+    folded = tf.keras.Sequential(
+        [tf.keras.Input(shape=model.input_shape[1:]),
+         *[layer.__class__.from_config(layer.get_config()) for layer in model.layers]],
+        name=f"{model.name}{FOLDED_MODEL_SUFFIX}"
+    )
+    folded.set_weights(model.get_weights())
+    first = next(layer for layer in folded.layers if layer.get_weights())
+    first.set_weights(fold_scaler(*first.get_weights(), scaler.mean_, scaler.scale_))
+    return folded
+
+
+def export_folded_keras_model(model, scaler, output_path=FOLDED_KERAS_MODEL):
+    """Save the scaler-folded Keras model used by the TensorFlow fallback"""
+    fold_keras_model(model, scaler).save(output_path)
+    print(f"✅ Folded Keras model saved as '{output_path}'")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the Keras model and scaler to a NumPy .npz artifact")
+    parser.add_argument("--model", default="diabetes_model.h5", help="Path to the trained Keras model")
+    parser.add_argument("--scaler", default="scaler.pkl", help="Path to the fitted StandardScaler")
+    parser.add_argument("--output", default="diabetes_model.npz", help="Path of the .npz artifact to write")
+    parser.add_argument("--precision", choices=PRECISIONS, default="float32", help="Stored kernel precision")
+    parser.add_argument("--keep-scaler", action="store_true",
+                        help="Store the scaler statistics separately instead of folding them into the first layer")
+    parser.add_argument("--variants", action="store_true",
+                        help=f"Write the {', '.join(VARIANT_ARTIFACTS)} variants instead of --output")
+    parser.add_argument("--keras", action="store_true", help=f"Also write {FOLDED_KERAS_MODEL}")
+    args = parser.parse_args()
+
+    import joblib
+    import tensorflow as tf
+
+    model = tf.keras.models.load_model(args.model)
+    scaler = joblib.load(args.scaler)
+    if args.variants:
+        export_variants(model, scaler)
+    else:
+        export_numpy_artifact(model, scaler, args.output, args.precision, fold=not args.keep_scaler)
+    if args.keras:
+        export_folded_keras_model(model, scaler)
+
+
+if __name__ == "__main__":
+    main()
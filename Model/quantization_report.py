@@ -0,0 +1,130 @@
+"""
+Compare the reduced-precision serving artifacts against the float32 model.
+
+Rebuilds the test split of train_diabetes.py, scores it with every NumPy
+artifact through the backend's inference engine (and with the Keras model when
+TensorFlow is installed), and reports accuracy parity, artifact size, resident
+memory of a serving process and single-row / batch latency.
+
+Usage:
+    python quantization_report.py [--output quantization_report.md]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import timeit
+
+import numpy as np
+
+MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.join(MODEL_DIR, '..', 'backend')
+sys.path.insert(0, BACKEND_DIR)
+
+from export_numpy import VARIANT_ARTIFACTS  # noqa: E402
+from training import load_dataset, split_dataset  # noqa: E402
+from inference import KerasInferenceEngine, NumpyInferenceEngine  # noqa: E402
+
+ARTIFACTS = {"float32": "diabetes_model.npz", **VARIANT_ARTIFACTS}
+
+# Peak RSS (Linux VmHWM, in KB) of a fresh process that loads one engine and scores one row
+RSS_PROBE = """
+import sys
+import numpy as np
+sys.path.insert(0, {backend!r})
+from inference import KerasInferenceEngine, NumpyInferenceEngine
+engine = {factory}
+engine.predict_proba(np.zeros((1, 8), dtype=np.float32))
+print(next(line.split()[1] for line in open('/proc/self/status') if line.startswith('VmHWM:')))
+"""
+
+
+def load_test_split(csv_path="diabetes.csv"):
+    """The held-out 20% test split of train_diabetes.py (raw features, 3-class labels)"""
+    X, y = load_dataset(csv_path)
+    _, _, X_test, _, _, y_test = split_dataset(X, y)
+    return X_test.astype(np.float32), y_test
+
+
+def latency_us(engine, features, number=2000):
+    """Best-of-5 microseconds per predict_proba call"""
+    return min(timeit.repeat(lambda: engine.predict_proba(features), number=number, repeat=5)) / number * 1e6
+
+
+def peak_rss_mb(factory):
+    """Peak resident memory (MB) of a process serving with the given engine"""
+    code = RSS_PROBE.format(backend=BACKEND_DIR, factory=factory)
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, cwd=MODEL_DIR,
+                            env={**os.environ, 'TF_CPP_MIN_LOG_LEVEL': '3'})
+    if result.returncode != 0:
+        return None
+    return int(result.stdout.strip().splitlines()[-1]) / 1024
+
+
+def build_report(X_test, y_test):
+    rows = []
+    reference = NumpyInferenceEngine(ARTIFACTS["float32"]).predict_proba(X_test)
+    batch = np.repeat(X_test, 4, axis=0)[:256]
+
+    engines = [(name, NumpyInferenceEngine(path), path) for name, path in ARTIFACTS.items()]
+    try:
+        engines.insert(0, ("keras float32", KerasInferenceEngine('diabetes_model.h5', 'scaler.pkl'), 'diabetes_model.h5'))
+    except ImportError:
+        print("⚠️ TensorFlow not installed, skipping the Keras reference")
+
+    for name, engine, path in engines:
+        probs = engine.predict_proba(X_test)
+        if isinstance(engine, NumpyInferenceEngine):
+            factory = f"NumpyInferenceEngine({path!r})"
+        else:
+            factory = "KerasInferenceEngine('diabetes_model.h5', 'scaler.pkl')"
+        rows.append({
+            "engine": name,
+            "artifact_kb": os.path.getsize(path) / 1024,
+            "accuracy": float((probs.argmax(axis=1) == y_test).mean() * 100),
+            "agreement": float((probs.argmax(axis=1) == reference.argmax(axis=1)).mean() * 100),
+            "max_diff": float(np.abs(probs - reference).max()),
+            "rss_mb": peak_rss_mb(factory),
+            "single_us": latency_us(engine, X_test[:1], number=200 if name.startswith("keras") else 2000),
+            "batch_us": latency_us(engine, batch, number=50 if name.startswith("keras") else 2000)
+        })
+    return rows
+
+
+def format_report(rows, n_test):
+    lines = [
+        "# Quantized Model Report",
+        "",
+        f"Test split of `train_diabetes.py` ({n_test} rows). Agreement and max |Δp| are against the",
+        "float32 NumPy artifact; latency is one `predict_proba` call, best of 5.",
+        "",
+        "| Engine | Artifact (KB) | Test accuracy | Agreement | Max abs prob diff | Peak RSS (MB) | 1 row (µs) | 256 rows (µs) |",
+        "|---|---|---|---|---|---|---|---|"
+    ]
+    for row in rows:
+        rss = f"{row['rss_mb']:.0f}" if row['rss_mb'] is not None else "n/a"
+        lines.append(
+            f"| {row['engine']} | {row['artifact_kb']:.1f} | {row['accuracy']:.2f}% | {row['agreement']:.2f}% "
+            f"| {row['max_diff']:.2e} | {rss} | {row['single_us']:.1f} | {row['batch_us']:.1f} |"
+        )
+    return '\n'.join(lines) + '\n'
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Accuracy, memory and latency of the serving artifacts")
+    parser.add_argument("--data", default="diabetes.csv", help="Training CSV")
+    parser.add_argument("--output", default="quantization_report.md", help="Markdown report to write")
+    args = parser.parse_args()
+
+    os.chdir(MODEL_DIR)
+    X_test, y_test = load_test_split(args.data)
+    report = format_report(build_report(X_test, y_test), len(y_test))
+    with open(args.output, 'w', encoding='utf-8') as f:
+        f.write(report)
+    print(report)
+    print(f"✅ Report saved as '{args.output}'")
+
+
+if __name__ == "__main__":
+    main()
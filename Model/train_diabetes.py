@@ -1,156 +1,203 @@
+"""
+Train the 3-class diabetes MLP and export every serving artifact.
+
+Runs unattended as a pipeline of stages (load -> label -> plot -> split ->
+scale -> train -> evaluate -> save); each stage is a function that tune.py
+and notebooks can reuse. Plots are optional and written as PNG files.
+
+Usage:
+    python train_diabetes.py
+    python train_diabetes.py --data big.csv --epochs 100 --seed 1 --output-dir out --plots plots
+    python train_diabetes.py --params search/best_params.json
+    python train_diabetes.py --publish ../backend/registry   # register (not activate) a new model version
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
 import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
-import tensorflow as tf
-import joblib
 
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler, LabelEncoder
-from imblearn.over_sampling import RandomOverSampler
-from tensorflow.keras.callbacks import EarlyStopping
+from training import (
+    DEFAULT_PARAMS, FEATURE_COLUMNS, NUM_CLASSES, fit_model, oversample_and_scale, read_frame,
+    split_dataset, three_class_labels
+)
+
+CLASS_NAMES = ['Normal', 'Pre-diabetic', 'Diabetic']
+SERVING_ARTIFACTS = ['diabetes_model.npz', 'diabetes_model.fp16.npz', 'diabetes_model.int8.npz',
+                     'diabetes_model.folded.h5']
+
 
 # ---- 1) Load data ----
-df = pd.read_csv('diabetes.csv')
-print("Dataset shape:", df.shape)
-print("Original outcome distribution:")
-print(df['Outcome'].value_counts())
+def load_stage(csv_path, cache=True):
+    started = time.perf_counter()
+    df = read_frame(csv_path, cache)
+    print(f"Dataset shape: {df.shape} ({time.perf_counter() - started:.2f}s)")
+    print("Original outcome distribution:")
+    print(df['Outcome'].value_counts())
+    return df
+
 
 # ---- 2) Create 3-class labels based on glucose levels ----
-def create_three_classes(glucose, original_outcome):
+def label_stage(df):
     """
     Create 3 classes based on medical criteria:
     0 = Normal (glucose < 100)
     1 = Pre-diabetic/Borderline (glucose 100-125)
     2 = Diabetic (glucose >= 126 OR original diabetic)
     """
-    if original_outcome == 1:  # Already diagnosed diabetic
-        return 2
-    elif glucose < 100:  # Normal
-        return 0
-    elif glucose <= 125:  # Pre-diabetic range
-        return 1
-    else:  # Glucose > 125, consider diabetic
-        return 2
-
-df['Outcome_3class'] = df.apply(lambda row: create_three_classes(row['Glucose'], row['Outcome']), axis=1)
-
-print("\nNew 3-class distribution:")
-print(df['Outcome_3class'].value_counts())
-print("\nClass mapping:")
-print("0 = Normal (glucose < 100)")
-print("1 = Pre-diabetic/Borderline (glucose 100-125)")
-print("2 = Diabetic (glucose >= 126 OR original diabetic)")
-
-# ---- 3) Plot histograms for 3 classes ----
-for label in df.columns.drop(['Outcome', 'Outcome_3class']):
-    plt.figure(figsize=(8,4))
-    for class_val, class_name in [(0, 'Normal'), (1, 'Pre-diabetic'), (2, 'Diabetic')]:
-        plt.hist(df[df['Outcome_3class'] == class_val][label],
-                label=f'{class_name} ({class_val})',
-                alpha=0.6, density=True, bins=15)
-    plt.title(f'{label} - 3 Class Distribution')
-    plt.xlabel(label)
-    plt.ylabel('Probability density')
-    plt.legend()
-    plt.tight_layout()
-    plt.show()
-
-# ---- 4) Prepare X and y ----
-X = df.drop(columns=['Outcome', 'Outcome_3class']).values
-y = df['Outcome_3class'].values
-
-# ---- 5) Convert labels to one-hot encoding ----
-from tensorflow.keras.utils import to_categorical
-y_categorical = to_categorical(y, num_classes=3)
-
-# ---- 6) Split the data ----
-X_train, X_temp, y_train, y_temp = train_test_split(X, y_categorical, test_size=0.4, random_state=0, stratify=y)
-X_val, X_test, y_val, y_test = train_test_split(X_temp, y_temp, test_size=0.5, random_state=0, stratify=np.argmax(y_temp, axis=1))
-
-# ---- 7) Oversample training data ----
-over = RandomOverSampler(random_state=0)
-X_train_res, y_train_res_indices = over.fit_resample(X_train, np.argmax(y_train, axis=1))
-y_train_res = to_categorical(y_train_res_indices, num_classes=3)
-
-# ---- 8) Scale features ----
-scaler = StandardScaler()
-X_train_res = scaler.fit_transform(X_train_res)
-X_val = scaler.transform(X_val)
-X_test = scaler.transform(X_test)
-
-# ---- 9) Build model for 3-class classification ----
-model = tf.keras.Sequential([
-    tf.keras.layers.Dense(32, activation='relu', input_shape=(X_train_res.shape[1],)),
-    tf.keras.layers.Dropout(0.2),
-    tf.keras.layers.Dense(24, activation='relu'),
-    tf.keras.layers.Dropout(0.2),
-    tf.keras.layers.Dense(16, activation='relu'),
-    tf.keras.layers.Dense(3, activation='softmax')  # 3 output classes
-])
-
-model.compile(
-    optimizer=tf.keras.optimizers.Adam(learning_rate=0.001),
-    loss=tf.keras.losses.CategoricalCrossentropy(),
-    metrics=['accuracy']
-)
-
-model.summary()
-
-# ---- 10) Add early stopping ----
-early = tf.keras.callbacks.EarlyStopping(monitor='val_loss', patience=20, restore_best_weights=True)
-
-# ---- 11) Train the model ----
-print("\n🧠 Training the 3-class diabetes model...\n")
-history = model.fit(
-    X_train_res, y_train_res,
-    validation_data=(X_val, y_val),
-    epochs=300,
-    batch_size=16,
-    callbacks=[early],
-    verbose=2
-)
-
-# ---- ✅ 12) Show final accuracies ----
-train_acc = history.history['accuracy'][-1]
-val_acc = history.history['val_accuracy'][-1]
-
-print(f"\n✅ Training accuracy: {train_acc*100:.2f}%")
-print(f"✅ Validation accuracy: {val_acc*100:.2f}%")
-
-# ---- 13) Evaluate on test data ----
-test_loss, test_acc = model.evaluate(X_test, y_test, verbose=0)
-print(f"✅ Test accuracy: {test_acc*100:.2f}%")
-
-# ---- 14) Predictions ----
-probs = model.predict(X_test)
-preds = np.argmax(probs, axis=1)
-true_labels = np.argmax(y_test, axis=1)
-
-print("\nFirst 10 predictions (0=Normal, 1=Pre-diabetic, 2=Diabetic):")
-class_names = ['Normal', 'Pre-diabetic', 'Diabetic']
-for i in range(min(10, len(preds))):
-    pred_class = class_names[preds[i]]
-    true_class = class_names[true_labels[i]]
-    prob_str = f"[{probs[i][0]:.3f}, {probs[i][1]:.3f}, {probs[i][2]:.3f}]"
-    print(f"Sample {i+1}: Predicted={pred_class}, True={true_class}, Probabilities={prob_str}")
-
-# ---- 15) Confusion Matrix ----
-from sklearn.metrics import confusion_matrix, classification_report
-print("\n📊 Confusion Matrix:")
-cm = confusion_matrix(true_labels, preds)
-print("Predicted: Normal, Pre-diabetic, Diabetic")
-print("Actual:")
-for i, row in enumerate(cm):
-    print(f"  {class_names[i]}: {row}")
-
-print("\n📈 Classification Report:")
-print(classification_report(true_labels, preds, target_names=class_names))
-print("\n💾 Saving 3-class model and scaler...")
-model.save('diabetes_model.h5')
-joblib.dump(scaler, 'scaler.pkl')
-print("✅ 3-class model saved as 'diabetes_model.h5'")
-print("✅ Scaler saved as 'scaler.pkl'")
-print("\n🎯 Model now predicts 3 classes:")
-print("   0 = Normal (low diabetes risk)")
-print("   1 = Pre-diabetic/Borderline (moderate risk)")
-print("   2 = Diabetic (high risk)")
+    df = df.assign(Outcome_3class=three_class_labels(df))
+    print("\nNew 3-class distribution:")
+    print(df['Outcome_3class'].value_counts())
+    return df
+
+
+# ---- 3) Plot histograms for 3 classes (optional) ----
+def plot_stage(df, plots_dir):
+    """Write one class-split histogram per feature as PNG files"""
+    import matplotlib
+    matplotlib.use('Agg')  # no display needed
+    import matplotlib.pyplot as plt
+
+    os.makedirs(plots_dir, exist_ok=True)
+    for label in FEATURE_COLUMNS:
+        fig, ax = plt.subplots(figsize=(8, 4))
+        for class_val, class_name in enumerate(CLASS_NAMES):
+            ax.hist(df.loc[df['Outcome_3class'] == class_val, label],
+                    label=f'{class_name} ({class_val})', alpha=0.6, density=True, bins=15)
+        ax.set_title(f'{label} - 3 Class Distribution')
+        ax.set_xlabel(label)
+        ax.set_ylabel('Probability density')
+        ax.legend()
+        fig.tight_layout()
+        fig.savefig(os.path.join(plots_dir, f'{label}.png'))
+        plt.close(fig)
+    print(f"📊 Histograms saved to '{plots_dir}/'")
+
+
+# ---- 4) Split, oversample and scale ----
+def prepare_stage(df, seed):
+    X = df[FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+    y = df['Outcome_3class'].to_numpy()
+    X_train, X_val, X_test, y_train, y_val, y_test = split_dataset(X, y, seed)
+    X_train, y_train, scaler = oversample_and_scale(X_train, y_train, seed)
+    return {
+        "train": (X_train, y_train),
+        "val": (scaler.transform(X_val), y_val),
+        "test": (scaler.transform(X_test), y_test),
+        "scaler": scaler
+    }
+
+
+# ---- 5) Build and train the model ----
+def train_stage(data, params, epochs, patience, seed, verbose):
+    import tensorflow as tf
+
+    tf.keras.utils.set_random_seed(seed)
+    print(f"\n🧠 Training the 3-class diabetes model ({params})...\n")
+    model, history = fit_model(params, *data["train"], *data["val"], epochs=epochs, patience=patience,
+                               verbose=verbose)
+    model.summary()
+    print(f"\n✅ Training accuracy: {history.history['accuracy'][-1] * 100:.2f}%")
+    print(f"✅ Validation accuracy: {history.history['val_accuracy'][-1] * 100:.2f}%")
+    return model
+
+
+# ---- 6) Evaluate on test data ----
+def evaluate_stage(model, data):
+    from sklearn.metrics import classification_report, confusion_matrix
+
+    X_test, true_labels = data["test"]
+    probs = model.predict(X_test, verbose=0)
+    preds = np.argmax(probs, axis=1)
+    test_accuracy = float((preds == true_labels).mean())
+    print(f"✅ Test accuracy: {test_accuracy * 100:.2f}%")
+
+    print("\n📊 Confusion Matrix:")
+    print("Predicted: Normal, Pre-diabetic, Diabetic")
+    print("Actual:")
+    for i, row in enumerate(confusion_matrix(true_labels, preds, labels=range(NUM_CLASSES))):
+        print(f"  {CLASS_NAMES[i]}: {row}")
+
+    print("\n📈 Classification Report:")
+    print(classification_report(true_labels, preds, labels=range(NUM_CLASSES), target_names=CLASS_NAMES))
+    return test_accuracy
+
+
+# ---- 7) Save model, scaler and serving artifacts ----
+def save_stage(model, scaler, output_dir):
+    import joblib
+    from export_numpy import export_folded_keras_model, export_numpy_artifact, export_variants
+
+    os.makedirs(output_dir, exist_ok=True)
+    print("\n💾 Saving 3-class model and scaler...")
+    model.save(os.path.join(output_dir, 'diabetes_model.h5'))
+    joblib.dump(scaler, os.path.join(output_dir, 'scaler.pkl'))
+    print(f"✅ 3-class model and scaler saved to '{output_dir}/'")
+
+    export_numpy_artifact(model, scaler, os.path.join(output_dir, 'diabetes_model.npz'))
+    export_variants(model, scaler, output_dir)
+    export_folded_keras_model(model, scaler, os.path.join(output_dir, 'diabetes_model.folded.h5'))
+
+
+# ---- 8) Register the serving artifacts as a new model version (optional) ----
+def publish_stage(output_dir, registry_dir, metrics, params):
+    """Publish to the backend's model registry; activate it there (or via /admin/models/activate) to serve it"""
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+    from registry import ModelRegistry
+
+    paths = [os.path.join(output_dir, name) for name in SERVING_ARTIFACTS]
+    params = {**params, "widths": list(params["widths"])}
+    return ModelRegistry(registry_dir).publish(paths, metrics, params)
+
+
+def load_params(path):
+    """Hyperparameters from a tune.py best_params.json (unknown keys ignored)"""
+    if path is None:
+        return dict(DEFAULT_PARAMS)
+    with open(path, encoding='utf-8') as f:
+        tuned = json.load(f)
+    params = {key: tuned.get(key, default) for key, default in DEFAULT_PARAMS.items()}
+    params["widths"] = tuple(params["widths"])
+    return params
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the 3-class diabetes model")
+    parser.add_argument("--data", default="diabetes.csv", help="Training CSV")
+    parser.add_argument("--output-dir", default=".", help="Where to write the model, scaler and artifacts")
+    parser.add_argument("--epochs", type=int, default=300, help="Maximum training epochs")
+    parser.add_argument("--patience", type=int, default=20, help="Early-stopping patience (epochs)")
+    parser.add_argument("--batch-size", type=int, default=None, help="Override the batch size")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the split, oversampling and TensorFlow")
+    parser.add_argument("--params", help="Hyperparameters from tune.py (best_params.json)")
+    parser.add_argument("--plots", metavar="DIR", help="Write feature histograms to DIR")
+    parser.add_argument("--no-cache", action="store_true", help="Parse the CSV instead of using the Parquet cache")
+    parser.add_argument("--publish", metavar="REGISTRY_DIR", help="Register the artifacts as a new model version")
+    parser.add_argument("--verbose", type=int, default=2, choices=[0, 1, 2], help="Keras fit verbosity")
+    args = parser.parse_args()
+
+    params = load_params(args.params)
+    if args.batch_size:
+        params["batch_size"] = args.batch_size
+
+    df = label_stage(load_stage(args.data, cache=not args.no_cache))
+    if args.plots:
+        plot_stage(df, args.plots)
+    data = prepare_stage(df, args.seed)
+    model = train_stage(data, params, args.epochs, args.patience, args.seed, args.verbose)
+    test_accuracy = evaluate_stage(model, data)
+    save_stage(model, data["scaler"], args.output_dir)
+    if args.publish:
+        publish_stage(args.output_dir, args.publish, {"test_accuracy": test_accuracy}, params)
+
+    print("\n🎯 Model now predicts 3 classes:")
+    print("   0 = Normal (low diabetes risk)")
+    print("   1 = Pre-diabetic/Borderline (moderate risk)")
+    print("   2 = Diabetic (high risk)")
+
+
+if __name__ == "__main__":
+    main()
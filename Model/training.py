@@ -0,0 +1,150 @@
+"""
+Shared data preparation and model building for the 3-class diabetes MLP.
+
+Used by train_diabetes.py and the hyperparameter search (tune.py) so both
+prepare data the same way: 3-class labels from glucose, a stratified
+60/20/20 split, oversampling of the training part and a StandardScaler fit
+on the oversampled rows.
+
+The CSV is parsed once into a typed Parquet copy in a .cache/ directory next
+to it (keyed on the CSV's size and mtime; copies of older versions are deleted),
+so repeated runs on large files skip text parsing.
+"""
+
+import glob
+import os
+import re
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+from imblearn.over_sampling import RandomOverSampler
+
+NUM_CLASSES = 3
+
+FEATURE_COLUMNS = ["Pregnancies", "Glucose", "BloodPressure", "SkinThickness", "Insulin", "BMI",
+                   "DiabetesPedigreeFunction", "Age"]
+# float64 features, so decimal or missing values in integer-looking columns still parse
+COLUMN_DTYPES = {
+    **{column: "float64" for column in FEATURE_COLUMNS},
+    "Outcome": "int8"
+}
+CACHE_DIR = ".cache"  # next to the CSV
+
+# Architecture and optimizer settings of train_diabetes.py
+DEFAULT_PARAMS = {
+    "widths": (32, 24, 16),
+    "dropout": 0.2,
+    "learning_rate": 0.001,
+    "batch_size": 16
+}
+
+
+def three_class_labels(df):
+    """0 = normal (glucose < 100), 1 = borderline (100-125), 2 = diabetic (>= 126 or original outcome)"""
+    return np.select(
+        [df['Outcome'] == 1, df['Glucose'] < 100, df['Glucose'] <= 125],
+        [2, 0, 1],
+        default=2
+    )
+
+
+def cache_path(csv_path):
+    """Parquet cache file for a CSV; a new path whenever the CSV changes"""
+    stat = os.stat(csv_path)
+    cache_dir = os.path.join(os.path.dirname(os.path.abspath(csv_path)), CACHE_DIR)
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(cache_dir, f"{stem}.{stat.st_size}-{stat.st_mtime_ns}.parquet")
+
+
+def prune_cache(path):
+    """Delete the cached Parquet copies of earlier versions of the same CSV"""
+    cache_dir, name = os.path.split(path)
+    stem = name[:-len(".parquet")].rsplit(".", 1)[0]
+    pattern = re.compile(re.escape(stem) + r"\.\d+-\d+\.parquet")
+    for stale in glob.glob(os.path.join(glob.escape(cache_dir), glob.escape(stem) + ".*.parquet")):
+        if stale != path and pattern.fullmatch(os.path.basename(stale)):
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+
+
+def read_frame(csv_path='diabetes.csv', cache=True):
+    """The training CSV as a typed DataFrame, read from (and saved to) the Parquet cache when pyarrow is installed"""
+    path = cache_path(csv_path) if cache else None
+    if path and os.path.exists(path):
+        return pd.read_parquet(path)
+
+    df = pd.read_csv(csv_path, usecols=[*FEATURE_COLUMNS, "Outcome"], dtype=COLUMN_DTYPES, engine="c")
+    if path:
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            df.to_parquet(path, index=False)
+            prune_cache(path)
+        except ImportError:
+            print("⚠️ pyarrow not installed, not caching the parsed CSV")
+    return df
+
+
+def load_dataset(csv_path='diabetes.csv', cache=True):
+    """Raw feature matrix (model feature order) and 3-class labels"""
+    df = read_frame(csv_path, cache)
+    return df[FEATURE_COLUMNS].to_numpy(dtype=np.float64), three_class_labels(df)
+
+
+def split_dataset(X, y, seed=0):
+    """Stratified 60/20/20 train/validation/test split"""
+    X_train, X_temp, y_train, y_temp = train_test_split(X, y, test_size=0.4, random_state=seed, stratify=y)
+    X_val, X_test, y_val, y_test = train_test_split(X_temp, y_temp, test_size=0.5, random_state=seed, stratify=y_temp)
+    return X_train, X_val, X_test, y_train, y_val, y_test
+
+
+def oversample_and_scale(X_train, y_train, seed=0):
+    """Balance the classes of a training set, then fit a scaler on the balanced rows"""
+    X_res, y_res = RandomOverSampler(random_state=seed).fit_resample(X_train, y_train)
+    scaler = StandardScaler()
+    return scaler.fit_transform(X_res), y_res, scaler
+
+
+def build_model(n_features, widths=(32, 24, 16), dropout=0.2, learning_rate=0.001):
+    """ReLU MLP with dropout after every hidden layer but the last, and a softmax output"""
+    import tensorflow as tf
+
+    layers = [tf.keras.Input(shape=(n_features,))]
+    for index, width in enumerate(widths):
+        layers.append(tf.keras.layers.Dense(width, activation='relu'))
+        if dropout and index < len(widths) - 1:
+            layers.append(tf.keras.layers.Dropout(dropout))
+    layers.append(tf.keras.layers.Dense(NUM_CLASSES, activation='softmax'))
+
+    model = tf.keras.Sequential(layers)
+    model.compile(
+        optimizer=tf.keras.optimizers.Adam(learning_rate=learning_rate),
+        loss=tf.keras.losses.CategoricalCrossentropy(),
+        metrics=['accuracy']
+    )
+    return model
+
+
+def fit_model(params, X_train, y_train, X_val=None, y_val=None, epochs=300, patience=20, verbose=0):
+    """Train a model with the given hyperparameters; early-stops on validation loss when a validation set is given"""
+    import tensorflow as tf
+
+    model = build_model(X_train.shape[1], params["widths"], params["dropout"], params["learning_rate"])
+    callbacks = []
+    validation_data = None
+    if X_val is not None:
+        validation_data = (X_val, tf.keras.utils.to_categorical(y_val, NUM_CLASSES))
+        callbacks.append(tf.keras.callbacks.EarlyStopping(monitor='val_loss', patience=patience,
+                                                          restore_best_weights=True))
+    history = model.fit(
+        X_train, tf.keras.utils.to_categorical(y_train, NUM_CLASSES),
+        validation_data=validation_data,
+        epochs=epochs,
+        batch_size=params["batch_size"],
+        callbacks=callbacks,
+        verbose=verbose
+    )
+    return model, history
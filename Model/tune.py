@@ -0,0 +1,203 @@
+"""
+Hyperparameter search with k-fold cross-validation for the 3-class diabetes MLP.
+
+Every (trial, fold) pair trains in its own process, so the search uses all CPU
+cores. Folds cover the train + validation part of the usual split; the test
+20% stays held out. The best configuration is retrained on all of it and
+evaluated once on the test split.
+
+Writes to --output-dir:
+    leaderboard.csv      one row per trial, best first
+    best_params.json     winning hyperparameters, CV scores and test accuracy
+    diabetes_model.h5    best model, with scaler.pkl
+    diabetes_model.npz   NumPy serving artifact of the best model
+
+Usage:
+    python tune.py --folds 5 --search grid
+    python tune.py --search random --trials 20 --workers 8 --output-dir search
+"""
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import StratifiedKFold
+
+from training import DEFAULT_PARAMS, NUM_CLASSES, fit_model, load_dataset, oversample_and_scale, split_dataset
+
+SEARCH_SPACE = {
+    "widths": [(32, 24, 16), (64, 32, 16), (32, 16), (16, 8)],
+    "dropout": [0.0, 0.2, 0.3],
+    "learning_rate": [0.0003, 0.001, 0.003],
+    "batch_size": [16, 32, 64]
+}
+
+SEED = 0
+
+# Per-worker data, loaded once by _init_worker
+_folds = None
+
+
+def candidate_params(search: str, trials: int = None, seed: int = SEED) -> list:
+    """Every grid point, or `trials` of them sampled without replacement (always including the current architecture)"""
+    keys = list(SEARCH_SPACE)
+    grid = [dict(zip(keys, values)) for values in itertools.product(*SEARCH_SPACE.values())]
+    if search == "random":
+        others = [params for params in grid if params != DEFAULT_PARAMS]
+        return [DEFAULT_PARAMS] + random.Random(seed).sample(others, min(max((trials or 20) - 1, 0), len(others)))
+    return grid
+
+
+def make_folds(csv_path: str, k: int):
+    """Stratified k folds over the train + validation part of the split, plus the held-out test set"""
+    X, y = load_dataset(csv_path)
+    X_train, X_val, X_test, y_train, y_val, y_test = split_dataset(X, y)
+    X_dev = np.concatenate([X_train, X_val])
+    y_dev = np.concatenate([y_train, y_val])
+    splits = StratifiedKFold(n_splits=k, shuffle=True, random_state=SEED).split(X_dev, y_dev)
+    folds = [(X_dev[train], y_dev[train], X_dev[val], y_dev[val]) for train, val in splits]
+    return folds, (X_dev, y_dev), (X_test, y_test)
+
+
+def _init_worker(csv_path: str, k: int):
+    """Load the folds once per worker and keep TensorFlow to one core, since workers already cover the CPUs"""
+    global _folds
+    os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(1)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+    _folds, _, _ = make_folds(csv_path, k)
+
+
+def _run_fold(trial: int, params: dict, fold: int, epochs: int) -> dict:
+    """Train on one fold and score its validation part"""
+    import tensorflow as tf
+
+    tf.keras.utils.set_random_seed(SEED + fold)
+    X_train, y_train, X_val, y_val = _folds[fold]
+    started = time.perf_counter()
+    X_train, y_train, scaler = oversample_and_scale(X_train, y_train)
+    X_val = scaler.transform(X_val)
+
+    model, history = fit_model(params, X_train, y_train, X_val, y_val, epochs=epochs)
+    val_loss, val_accuracy = model.evaluate(X_val, tf.keras.utils.to_categorical(y_val, NUM_CLASSES), verbose=0)
+    return {
+        "trial": trial,
+        "fold": fold,
+        "val_accuracy": float(val_accuracy),
+        "val_loss": float(val_loss),
+        "best_epoch": int(np.argmin(history.history['val_loss'])) + 1,
+        "seconds": time.perf_counter() - started
+    }
+
+
+def build_leaderboard(candidates: list, results: list) -> pd.DataFrame:
+    """Mean/std of the fold scores per trial, best mean accuracy first (lower loss breaks ties)"""
+    folds = pd.DataFrame(results)
+    scores = folds.groupby("trial").agg(
+        mean_val_accuracy=("val_accuracy", "mean"),
+        std_val_accuracy=("val_accuracy", "std"),
+        mean_val_loss=("val_loss", "mean"),
+        mean_best_epoch=("best_epoch", "mean"),
+        train_seconds=("seconds", "sum")
+    )
+    params = pd.DataFrame(candidates)
+    params["widths"] = params["widths"].map(lambda widths: "-".join(map(str, widths)))
+    leaderboard = params.join(scores, how="inner").sort_values(
+        ["mean_val_accuracy", "mean_val_loss"], ascending=[False, True]
+    )
+    leaderboard.index.name = "trial"
+    leaderboard = leaderboard.reset_index()
+    leaderboard.insert(0, "rank", range(1, len(leaderboard) + 1))
+    return leaderboard
+
+
+def run_search(candidates: list, csv_path: str, k: int, epochs: int, workers: int) -> list:
+    """Cross-validate every candidate, one (trial, fold) task per process"""
+    results = []
+    tasks = [(trial, params, fold) for trial, params in enumerate(candidates) for fold in range(k)]
+    # spawn: TensorFlow is not fork-safe once initialized
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_init_worker, initargs=(csv_path, k)) as pool:
+        futures = [pool.submit(_run_fold, trial, params, fold, epochs) for trial, params, fold in tasks]
+        for done, future in enumerate(as_completed(futures), start=1):
+            result = future.result()
+            results.append(result)
+            print(f"[{done}/{len(tasks)}] trial {result['trial']} fold {result['fold']}: "
+                  f"val_accuracy={result['val_accuracy']:.4f} ({result['seconds']:.1f}s)")
+    return results
+
+
+def train_best(params: dict, epochs: int, dev, test, output_dir: str) -> float:
+    """Retrain the winner on train + validation for the CV-chosen epoch count, save it and return test accuracy"""
+    import joblib
+    import tensorflow as tf
+    from export_numpy import export_numpy_artifact
+
+    tf.keras.utils.set_random_seed(SEED)
+    X_dev, y_dev, scaler = oversample_and_scale(*dev)
+    model, _ = fit_model(params, X_dev, y_dev, epochs=epochs)
+    X_test, y_test = test
+    _, test_accuracy = model.evaluate(scaler.transform(X_test), tf.keras.utils.to_categorical(y_test, NUM_CLASSES),
+                                      verbose=0)
+
+    model.save(os.path.join(output_dir, 'diabetes_model.h5'))
+    joblib.dump(scaler, os.path.join(output_dir, 'scaler.pkl'))
+    export_numpy_artifact(model, scaler, os.path.join(output_dir, 'diabetes_model.npz'))
+    return float(test_accuracy)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cross-validated hyperparameter search for the diabetes MLP")
+    parser.add_argument("--data", default="diabetes.csv", help="Training CSV")
+    parser.add_argument("--search", choices=["grid", "random"], default="random", help="Search strategy")
+    parser.add_argument("--trials", type=int, default=20, help="Configurations to sample for --search random")
+    parser.add_argument("--folds", type=int, default=5, help="Cross-validation folds")
+    parser.add_argument("--epochs", type=int, default=300, help="Max epochs per fold (early stopping, patience 20)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--output-dir", default="search", help="Where to write the leaderboard and best model")
+    args = parser.parse_args()
+
+    workers = args.workers or os.cpu_count() or 1
+    os.makedirs(args.output_dir, exist_ok=True)
+    candidates = candidate_params(args.search, args.trials)
+    print(f"🔍 {len(candidates)} configurations x {args.folds} folds on {workers} workers")
+
+    started = time.perf_counter()
+    results = run_search(candidates, args.data, args.folds, args.epochs, workers)
+    leaderboard = build_leaderboard(candidates, results)
+    leaderboard_path = os.path.join(args.output_dir, 'leaderboard.csv')
+    leaderboard.to_csv(leaderboard_path, index=False, float_format="%.4f")
+    print(f"\n🏆 Top configurations ({time.perf_counter() - started:.0f}s):")
+    print(leaderboard.head(5).to_string(index=False, float_format="%.4f"))
+
+    best = leaderboard.iloc[0]
+    params = candidates[int(best["trial"])]
+    epochs = max(1, int(round(best["mean_best_epoch"])))
+    _, dev, test = make_folds(args.data, args.folds)
+    test_accuracy = train_best(params, epochs, dev, test, args.output_dir)
+
+    with open(os.path.join(args.output_dir, 'best_params.json'), 'w', encoding='utf-8') as f:
+        json.dump({
+            **params,
+            "epochs": epochs,
+            "folds": args.folds,
+            "mean_val_accuracy": float(best["mean_val_accuracy"]),
+            "std_val_accuracy": float(best["std_val_accuracy"]) if pd.notna(best["std_val_accuracy"]) else None,
+            "test_accuracy": test_accuracy
+        }, f, indent=2)
+
+    print(f"\n✅ Leaderboard saved as '{leaderboard_path}'")
+    print(f"✅ Best model (test accuracy {test_accuracy * 100:.2f}%) saved to '{args.output_dir}/'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,401 @@
+"""
+Asyncio-native MongoDB repositories built on Motor.
+
+AsyncUserRepository and AsyncPredictionRepository mirror the method names and
+semantics of UserRepository and PredictionRepository in database.py, so async
+route handlers can `await` database work concurrently with inference:
+
+    prediction, user = await asyncio.gather(
+        async_prediction_repo.create_prediction(user_id, data),
+        async_user_repo.get_user_by_id(user_id),
+    )
+
+Motor clients are bound to the event loop they were created on, so one client
+is kept per (process, event loop). A loop's client is closed when the loop shuts
+down: `async_mongodb.run(main())` closes it as the loop finishes, code that
+manages its own loop calls `close_loop()` before stopping it, and clients of
+loops that were closed without it are closed the next time a client is created.
+"""
+
+import asyncio
+import os
+import threading
+from bson import ObjectId
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from metrics import stage
+from database import (
+    client_options, build_user_document, build_prediction_document, skip_duplicate_inserts,
+    prediction_count_updates, serialize_predictions, prediction_stats_pipeline,
+    summarize_prediction_stats, HISTORY_SORT, PREDICTION_PROJECTIONS, history_page_query,
+    build_history_page, STATS_RECENT_WINDOW, prediction_stats_updates, feature_stats_pipeline,
+    build_stats_document, export_query, STATS_REBUILD_ATTEMPTS, STATS_CLAIM_BACKOFF_SECONDS,
+    prediction_stats_claims, has_pending_writes
+)
+
+load_dotenv()
+
+def _motor_client(uri):
+    from motor.motor_asyncio import AsyncIOMotorClient
+    return AsyncIOMotorClient(uri, **client_options())
+
+class AsyncMongoDB:
+    """Per-process, per-event-loop Motor client holder"""
+
+    def __init__(self, client_factory=_motor_client):
+        self.client_factory = client_factory
+        self._clients = {}  # event loop -> client
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def get_db(self):
+        """Get the database for the running event loop, creating its client on first use"""
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop) if self._pid == os.getpid() else None
+        if client is None:
+            with self._lock:
+                if self._pid != os.getpid():
+                    # Clients inherited from the parent process are unusable after a fork
+                    self._clients = {}
+                    self._pid = os.getpid()
+                client = self._clients.get(loop)
+                if client is None:
+                    mongodb_uri = os.getenv('MONGODB_URI')
+                    if not mongodb_uri:
+                        raise ValueError("MONGODB_URI not found in environment variables")
+                    self._close_clients(lambda other: other.is_closed())
+                    client = self.client_factory(mongodb_uri)
+                    self._clients[loop] = client
+        return client[os.getenv('DB_NAME', 'glucopredict')]
+
+    def _close_clients(self, should_close):
+        """Close and forget the clients whose loop matches (lock held)"""
+        for loop in [loop for loop in self._clients if should_close(loop)]:
+            self._clients.pop(loop).close()
+
+    def close_loop(self):
+        """Close the running event loop's client; call before the loop shuts down"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._pid == os.getpid():
+                self._close_clients(lambda other: other is loop)
+
+    def run(self, main):
+        """asyncio.run(main), closing the loop's client before the loop shuts down"""
+        async def run_and_close():
+            try:
+                return await main
+            finally:
+                self.close_loop()
+        return asyncio.run(run_and_close())
+
+    def open_clients(self) -> int:
+        """Number of clients open in this process"""
+        return len(self._clients) if self._pid == os.getpid() else 0
+
+    def close_connection(self):
+        """Close every client opened by this process"""
+        with self._lock:
+            if self._pid == os.getpid():
+                self._close_clients(lambda loop: True)
+
+class AsyncUserRepository:
+    def __init__(self, mongodb: AsyncMongoDB = None):
+        self.mongodb = mongodb or async_mongodb
+
+    @property
+    def users(self):
+        return self.mongodb.get_db().users
+
+    async def create_user(self, email: str, password_hash: str, name: str = None) -> dict:
+        """Create a new user"""
+        try:
+            user_data = build_user_document(email, password_hash, name)
+
+            result = await self.users.insert_one(user_data)
+            user_data['_id'] = result.inserted_id
+
+            # Remove password hash from returned data
+            user_data.pop('password_hash', None)
+            return user_data
+
+        except DuplicateKeyError:
+            raise ValueError("User with this email already exists")
+        except Exception as e:
+            raise Exception(f"Failed to create user: {str(e)}")
+
+    async def get_user_by_email(self, email: str) -> dict:
+        """Get user by email"""
+        try:
+            return await self.users.find_one({"email": email.lower().strip()})
+        except Exception as e:
+            raise Exception(f"Failed to get user: {str(e)}")
+
+    async def get_user_by_id(self, user_id: str) -> dict:
+        """Get user by ID"""
+        try:
+            user = await self.users.find_one({"_id": ObjectId(user_id)})
+            if user:
+                user.pop('password_hash', None)  # Remove password hash
+            return user
+        except Exception as e:
+            raise Exception(f"Failed to get user: {str(e)}")
+
+    async def update_last_login(self, user_id: str):
+        """Update user's last login timestamp"""
+        try:
+            await self.users.update_one(
+                {"_id": ObjectId(user_id)},
+                {
+                    "$set": {"last_login": datetime.now(timezone.utc)},
+                    "$inc": {"login_count": 1}
+                }
+            )
+        except Exception as e:
+            print(f"Warning: Could not update last login: {e}")
+
+    async def update_password_hash(self, user_id: str, password_hash: str):
+        """Replace a user's stored password hash (e.g. after a bcrypt cost change)"""
+        try:
+            await self.users.update_one(
+                {"_id": ObjectId(user_id)},
+                {"$set": {"password_hash": password_hash, "updated_at": datetime.now(timezone.utc)}}
+            )
+        except Exception as e:
+            raise Exception(f"Failed to update password: {str(e)}")
+
+    async def update_profile(self, user_id: str, name: str) -> bool:
+        """Update user's editable profile fields"""
+        try:
+            result = await self.users.update_one(
+                {"_id": ObjectId(user_id)},
+                {"$set": {"name": name.strip() if name else None, "updated_at": datetime.now(timezone.utc)}}
+            )
+            return result.matched_count == 1
+        except Exception as e:
+            raise Exception(f"Failed to update profile: {str(e)}")
+
+    async def set_active(self, user_id: str, is_active: bool) -> bool:
+        """Activate or deactivate a user account"""
+        try:
+            result = await self.users.update_one(
+                {"_id": ObjectId(user_id)},
+                {"$set": {"is_active": is_active, "updated_at": datetime.now(timezone.utc)}}
+            )
+            return result.matched_count == 1
+        except Exception as e:
+            raise Exception(f"Failed to update account status: {str(e)}")
+
+    async def increment_prediction_count(self, user_id: str, amount: int = 1):
+        """Increment user's prediction count"""
+        try:
+            with stage('counter_update'):
+                await self.users.update_one(
+                    {"_id": ObjectId(user_id)},
+                    {"$inc": {"prediction_count": amount}}
+                )
+        except Exception as e:
+            print(f"Warning: Could not update prediction count: {e}")
+
+    async def increment_prediction_counts(self, counts: dict):
+        """Apply many per-user prediction count increments in one bulk write"""
+        if not counts:
+            return
+        with stage('counter_update'):
+            await self.users.bulk_write(prediction_count_updates(counts), ordered=False)
+
+class AsyncPredictionRepository:
+    def __init__(self, mongodb: AsyncMongoDB = None):
+        self.mongodb = mongodb or async_mongodb
+
+    @property
+    def predictions(self):
+        return self.mongodb.get_db().predictions
+
+    @property
+    def prediction_stats(self):
+        return self.mongodb.get_db().prediction_stats
+
+    def _build_prediction_document(self, user_id: str, prediction_data: dict) -> dict:
+        """Map an API prediction payload onto a prediction document"""
+        return build_prediction_document(user_id, prediction_data)
+
+    async def create_prediction(self, user_id: str, prediction_data: dict) -> dict:
+        """Create a new prediction record"""
+        try:
+            prediction = self._build_prediction_document(user_id, prediction_data)
+            claim = await self.claim_prediction_stats([user_id])
+
+            try:
+                with stage('mongo_insert'):
+                    result = await self.predictions.insert_one(prediction)
+            except Exception:
+                await self.update_prediction_stats([], claim)
+                raise
+            prediction['_id'] = result.inserted_id
+            await self.update_prediction_stats([prediction], claim)
+
+            return prediction
+
+        except Exception as e:
+            raise Exception(f"Failed to save prediction: {str(e)}")
+
+    async def create_predictions(self, user_id: str, predictions_data: list) -> list:
+        """Create many prediction records with a single insert_many round trip"""
+        if not predictions_data:
+            return []
+        try:
+            predictions = [
+                self._build_prediction_document(user_id, prediction_data)
+                for prediction_data in predictions_data
+            ]
+            claim = await self.claim_prediction_stats([user_id])
+
+            try:
+                with stage('mongo_insert'):
+                    result = await self.predictions.insert_many(predictions, ordered=False)
+            except Exception:
+                await self.update_prediction_stats([], claim)
+                raise
+            for prediction, inserted_id in zip(predictions, result.inserted_ids):
+                prediction['_id'] = inserted_id
+            await self.update_prediction_stats(predictions, claim)
+
+            return predictions
+
+        except Exception as e:
+            raise Exception(f"Failed to save predictions: {str(e)}")
+
+    async def insert_prediction_documents(self, predictions: list) -> list:
+        """Insert prebuilt documents with client-generated _ids, skipping ones already stored"""
+        if not predictions:
+            return []
+        claim = await self.claim_prediction_stats(prediction["user_id"] for prediction in predictions)
+        try:
+            with stage('mongo_insert'):
+                await self.predictions.insert_many(predictions, ordered=False)
+            inserted = predictions
+        except BulkWriteError as e:
+            inserted = skip_duplicate_inserts(predictions, e)
+        except Exception:
+            await self.update_prediction_stats([], claim)
+            raise
+        await self.update_prediction_stats(inserted, claim)
+        return inserted
+
+    async def claim_prediction_stats(self, user_ids) -> tuple:
+        """Announce an insert to its users' summary documents; returns the claim to release, or None"""
+        user_ids = list(user_ids)
+        claim_id = ObjectId()
+        try:
+            with stage('stats_claim'):
+                await self.prediction_stats.bulk_write(prediction_stats_claims(user_ids, claim_id), ordered=False)
+            return claim_id, user_ids
+        except Exception as e:
+            print(f"Warning: Could not claim prediction stats: {e}")
+            return None
+
+    async def update_prediction_stats(self, predictions: list, claim: tuple = None):
+        """Fold newly inserted predictions into their users' summary documents and release the claim"""
+        if not predictions and claim is None:
+            return
+        try:
+            with stage('stats_update'):
+                await self.prediction_stats.bulk_write(prediction_stats_updates(predictions, claim), ordered=False)
+        except Exception as e:
+            print(f"Warning: Could not update prediction stats: {e}")
+
+    async def get_user_predictions(self, user_id: str, limit: int = 50, skip: int = 0) -> list:
+        """Get user's prediction history"""
+        try:
+            cursor = (
+                self.predictions.find({"user_id": ObjectId(user_id)})
+                .sort(HISTORY_SORT)
+                .skip(skip)
+                .limit(limit)
+            )
+            predictions = await cursor.to_list(length=limit)
+
+            # Convert ObjectId to string for JSON serialization
+            return serialize_predictions(predictions)
+
+        except Exception as e:
+            raise Exception(f"Failed to get predictions: {str(e)}")
+
+    async def get_user_predictions_page(self, user_id: str, limit: int = 20, cursor: str = None,
+                                        fields: str = "full") -> tuple:
+        """Get one page of history by keyset pagination; returns (predictions, next_cursor)"""
+        if fields not in PREDICTION_PROJECTIONS:
+            raise ValueError(f"Unknown fields option: {fields}")
+        query = history_page_query(user_id, cursor)
+        try:
+            results = (
+                self.predictions.find(query, PREDICTION_PROJECTIONS[fields])
+                .sort(HISTORY_SORT)
+                .limit(limit + 1)
+            )
+            predictions = await results.to_list(length=limit + 1)
+            return build_history_page(predictions, limit)
+
+        except Exception as e:
+            raise Exception(f"Failed to get predictions: {str(e)}")
+
+    def iter_predictions(self, user_id: str = None, batch_size: int = 1000):
+        """Server-side cursor over a user's predictions, or every prediction; use `async for`"""
+        query, sort = export_query(user_id)
+        return self.predictions.find(query).sort(sort).batch_size(batch_size)
+
+    async def get_prediction_stats(self, user_id: str) -> dict:
+        """Get user's prediction statistics from their summary document"""
+        try:
+            summary = await self.prediction_stats.find_one({"_id": ObjectId(user_id)})
+            if summary is None or "backfilled_at" not in summary:
+                summary = await self.rebuild_prediction_stats(user_id)
+            return summarize_prediction_stats(summary)
+
+        except Exception as e:
+            raise Exception(f"Failed to get prediction stats: {str(e)}")
+
+    async def rebuild_prediction_stats(self, user_id: str) -> dict:
+        """Recompute a user's summary document from the raw predictions (same retry rules as the sync repository)"""
+        for attempt in range(STATS_REBUILD_ATTEMPTS):
+            current = await self.prediction_stats.find_one({"_id": ObjectId(user_id)}, {"revision": 1, "pending_writes": 1})
+            if has_pending_writes(current):
+                await asyncio.sleep(STATS_CLAIM_BACKOFF_SECONDS * 2 ** attempt)
+                continue
+            risk_results = await self.predictions.aggregate(prediction_stats_pipeline(user_id)).to_list(length=None)
+            feature_results = await self.predictions.aggregate(feature_stats_pipeline(user_id)).to_list(length=None)
+            recent = await (
+                self.predictions.find({"user_id": ObjectId(user_id)}, {"risk_level": 1, "created_at": 1})
+                .sort(HISTORY_SORT)
+                .limit(STATS_RECENT_WINDOW)
+            ).to_list(length=STATS_RECENT_WINDOW)
+            summary = build_stats_document(user_id, risk_results, feature_results, recent)
+            if current is None:
+                summary["revision"] = 0
+                try:
+                    await self.prediction_stats.insert_one(summary)
+                    return summary
+                except DuplicateKeyError:
+                    continue
+            summary["revision"] = current.get("revision", 0)
+            result = await self.prediction_stats.replace_one(
+                {"_id": summary["_id"], "revision": current.get("revision")}, summary
+            )
+            if result.matched_count:
+                return summary
+        raise Exception(f"Prediction stats of user {user_id} kept changing during the rebuild")
+
+    async def rebuild_all_prediction_stats(self) -> int:
+        """Recompute the summary document of every user with predictions"""
+        user_ids = await self.predictions.distinct("user_id")
+        for user_id in user_ids:
+            await self.rebuild_prediction_stats(str(user_id))
+        return len(user_ids)
+
+# Global instances
+async_mongodb = AsyncMongoDB()
+async_user_repo = AsyncUserRepository()
+async_prediction_repo = AsyncPredictionRepository()
@@ -1,22 +1,56 @@
 import jwt
-import bcrypt
 from datetime import datetime, timedelta, timezone
 from functools import wraps
 from flask import request, jsonify, current_app
 from database import user_repo
+from cache import LRUCache, RateCounter
+from hashing import create_password_hasher
+from metrics import stage
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Short-lived caches of verified tokens and user documents, so most authenticated
+# requests skip both the JWT signature check and the MongoDB user lookup.
+# Invalidation only reaches the current process, so user documents (which carry
+# is_active) get a shorter TTL: other workers notice a deactivation within it
+AUTH_CACHE_ENABLED = os.getenv('AUTH_CACHE_ENABLED', 'True').lower() == 'true'
+token_cache = LRUCache(
+    max_entries=int(os.getenv('AUTH_CACHE_MAX_ENTRIES', 10000)),
+    ttl_seconds=float(os.getenv('AUTH_CACHE_TTL_SECONDS', 60))
+)
+user_cache = LRUCache(
+    max_entries=int(os.getenv('AUTH_CACHE_MAX_ENTRIES', 10000)),
+    ttl_seconds=float(os.getenv('AUTH_USER_CACHE_TTL_SECONDS', 10))
+)
+saved_user_lookups = RateCounter()
+
+# bcrypt runs on its own bounded pool, off the request threads
+password_hasher = create_password_hasher()
+
+# Accounts allowed to use admin-only endpoints, besides users with is_admin set
+ADMIN_EMAILS = {
+    email.strip().lower() for email in os.getenv('ADMIN_EMAILS', '').split(',') if email.strip()
+}
+
+# Internal listener bound by gunicorn.conf.py on which /metrics needs no token
+METRICS_PORT = os.getenv('METRICS_PORT')
+
 def hash_password(password: str) -> str:
-    """Hash a password using bcrypt"""
-    salt = bcrypt.gensalt()
-    return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+    """Hash a password using bcrypt at the configured cost (BCRYPT_ROUNDS)"""
+    return password_hasher.hash(password)
 
 def verify_password(password: str, password_hash: str) -> bool:
     """Verify a password against its hash"""
-    return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+    return password_hasher.verify(password, password_hash)
+
+def upgrade_password_hash(user_id: str, password: str, password_hash: str):
+    """After a successful login, rehash in the background if the stored hash uses an outdated cost"""
+    if password_hasher.needs_rehash(password_hash):
+        password_hasher.rehash_in_background(
+            password, lambda new_hash: user_repo.update_password_hash(user_id, new_hash)
+        )
 
 def generate_token(user_id: str, email: str) -> str:
     """Generate a JWT token for user authentication"""
@@ -54,37 +88,132 @@ def verify_token(token: str) -> dict:
     except jwt.InvalidTokenError:
         raise Exception("Invalid token")
 
+def get_bearer_token():
+    """Extract the bearer token from the Authorization header, if any"""
+    auth_header = request.headers.get('Authorization')
+    if auth_header and auth_header.startswith('Bearer '):
+        return auth_header.split(' ')[1]
+    return None
+
+def get_token_payload(token: str) -> dict:
+    """Verify a token, reusing the decoded payload of recently seen tokens"""
+    payload = token_cache.get(token) if AUTH_CACHE_ENABLED else None
+    if payload is None:
+        payload = verify_token(token)
+        if AUTH_CACHE_ENABLED:
+            token_cache.set(token, payload)
+    elif payload['exp'] <= datetime.now(timezone.utc).timestamp():
+        token_cache.invalidate(token)
+        raise Exception("Token has expired")
+    return payload
+
+def get_cached_user(user_id: str):
+    """Get a user document, served from the cache while it is fresh"""
+    user = user_cache.get(user_id) if AUTH_CACHE_ENABLED else None
+    if user is not None:
+        saved_user_lookups.add()
+        return dict(user)
+
+    user = user_repo.get_user_by_id(user_id)
+    if user and AUTH_CACHE_ENABLED:
+        user_cache.set(user_id, dict(user))
+    return user
+
+def invalidate_user_cache(user_id: str):
+    """Drop a cached user document after login, deactivation or profile changes (this process only)"""
+    user_cache.invalidate(str(user_id))
+
+def auth_cache_stats() -> dict:
+    """Token/user cache counters and MongoDB lookups saved in the last minute"""
+    return {
+        "enabled": AUTH_CACHE_ENABLED,
+        "token_cache": token_cache.stats(),
+        "user_cache": user_cache.stats(),
+        "db_lookups_saved_total": user_cache.hits,
+        "db_lookups_saved_last_minute": saved_user_lookups.total()
+    }
+
+def authenticate_token(token: str):
+    """Resolve a token to an active user, returning (user, error_message)"""
+    try:
+        # Verify token
+        with stage('auth'):
+            payload = get_token_payload(token)
+        
+        # Get user from cache or database
+        with stage('user_lookup'):
+            user = get_cached_user(payload['user_id'])
+        if not user:
+            return None, 'User not found'
+        
+        if not user.get('is_active', True):
+            return None, 'Account is deactivated'
+        
+        return user, None
+        
+    except Exception as e:
+        return None, f'Token verification failed: {str(e)}'
+
 def require_auth(f):
     """Decorator to require authentication for routes"""
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        token = None
-        
         # Check for token in Authorization header
-        auth_header = request.headers.get('Authorization')
-        if auth_header and auth_header.startswith('Bearer '):
-            token = auth_header.split(' ')[1]
+        token = get_bearer_token()
         
         if not token:
             return jsonify({'error': 'Authentication token is missing'}), 401
         
-        try:
-            # Verify token
-            payload = verify_token(token)
-            
-            # Get user from database
-            user = user_repo.get_user_by_id(payload['user_id'])
-            if not user:
-                return jsonify({'error': 'User not found'}), 401
-            
-            if not user.get('is_active', True):
-                return jsonify({'error': 'Account is deactivated'}), 401
-            
-            # Add user info to request context
+        user, error = authenticate_token(token)
+        if error:
+            return jsonify({'error': error}), 401
+        
+        # Add user info to request context
+        request.current_user = user
+        
+        return f(*args, **kwargs)
+    
+    return decorated_function
+
+def is_admin(user: dict) -> bool:
+    """Whether the user may act on other users' data"""
+    return bool(user.get('is_admin')) or user.get('email', '').lower() in ADMIN_EMAILS
+
+def require_admin(f):
+    """Decorator for admin-only routes: authenticates like require_auth, then rejects non-admins"""
+    @wraps(f)
+    @require_auth
+    def decorated_function(*args, **kwargs):
+        if not is_admin(request.current_user):
+            return jsonify({'error': 'Admin access required'}), 403
+        return f(*args, **kwargs)
+    
+    return decorated_function
+
+def require_admin_or_internal(f):
+    """Decorator for scrape endpoints: open on the internal METRICS_PORT listener, admin-only on any other port"""
+    admin_only = require_admin(f)
+
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if METRICS_PORT and request.environ.get('SERVER_PORT') == METRICS_PORT:
+            return f(*args, **kwargs)
+        return admin_only(*args, **kwargs)
+    
+    return decorated_function
+
+def optional_auth(f):
+    """Decorator that authenticates the user when a token is sent, otherwise sets current_user to None"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        token = get_bearer_token()
+        request.current_user = None
+        
+        if token:
+            user, error = authenticate_token(token)
+            if error:
+                return jsonify({'error': error}), 401
             request.current_user = user
-            
-        except Exception as e:
-            return jsonify({'error': f'Token verification failed: {str(e)}'}), 401
         
         return f(*args, **kwargs)
     
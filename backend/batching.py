@@ -0,0 +1,152 @@
+import numpy as np
+import os
+import queue
+import threading
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Upper bounds (inclusive) of the batch-size histogram buckets
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+class _PendingPrediction:
+    """A single feature row waiting for its slot in a batch"""
+    __slots__ = ('features', 'enqueued_at', 'done', 'result', 'error')
+
+    def __init__(self, features):
+        self.features = features
+        self.enqueued_at = time.perf_counter()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class MicroBatcher:
+    """Coalesces concurrent single-row predictions into one batched forward pass"""
+
+    def __init__(self, predict_fn, max_batch_size: int = 32, max_wait_ms: float = 2.0,
+                 enabled: bool = True, result_timeout: float = 10.0):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.enabled = enabled
+        self.result_timeout = result_timeout
+
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self._batches = 0
+        self._requests = 0
+        self._batch_size_counts = {bucket: 0 for bucket in BATCH_SIZE_BUCKETS}
+        self._batch_size_counts['+Inf'] = 0
+        self._queue_wait_total = 0.0
+        self._queue_wait_max = 0.0
+        self._inference_total = 0.0
+
+    def _ensure_started(self):
+        """Start the worker thread lazily, and again in each forked worker process"""
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            self._queue = queue.Queue()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+            self._thread.start()
+
+    def submit(self, features) -> np.ndarray:
+        """Predict one feature row, sharing a forward pass with concurrent callers"""
+        if not self.enabled:
+            return self.predict_fn(np.asarray([features], dtype=np.float32))[0]
+
+        self._ensure_started()
+        pending = _PendingPrediction(features)
+        self._queue.put(pending)
+
+        if not pending.done.wait(self.result_timeout):
+            raise TimeoutError("Timed out waiting for batched inference")
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def _collect_batch(self):
+        """Block for the first row, then gather more until the batch is full or max_wait elapses"""
+        batch = [self._queue.get()]
+        deadline = batch[0].enqueued_at + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            started_at = time.perf_counter()
+
+            try:
+                probabilities = self.predict_fn(np.asarray([p.features for p in batch], dtype=np.float32))
+                for pending, row in zip(batch, probabilities):
+                    pending.result = row
+            except Exception as e:
+                for pending in batch:
+                    pending.error = e
+            finally:
+                finished_at = time.perf_counter()
+                for pending in batch:
+                    pending.done.set()
+                self._record_batch(batch, started_at, finished_at)
+
+    def _record_batch(self, batch, started_at, finished_at):
+        size = len(batch)
+        waits = [started_at - pending.enqueued_at for pending in batch]
+        bucket = next((b for b in BATCH_SIZE_BUCKETS if size <= b), '+Inf')
+
+        with self._stats_lock:
+            self._batches += 1
+            self._requests += size
+            self._batch_size_counts[bucket] += 1
+            self._queue_wait_total += sum(waits)
+            self._queue_wait_max = max(self._queue_wait_max, max(waits))
+            self._inference_total += finished_at - started_at
+
+    def stats(self) -> dict:
+        """Batch-size distribution and queue-wait/inference timings for tuning"""
+        with self._stats_lock:
+            batches = self._batches
+            requests = self._requests
+            return {
+                "enabled": self.enabled,
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000,
+                "batches": batches,
+                "requests": requests,
+                "avg_batch_size": round(requests / batches, 3) if batches else 0.0,
+                "batch_size_histogram": {str(k): v for k, v in self._batch_size_counts.items()},
+                "avg_queue_wait_ms": round(self._queue_wait_total / requests * 1000, 4) if requests else 0.0,
+                "max_queue_wait_ms": round(self._queue_wait_max * 1000, 4),
+                "avg_inference_ms": round(self._inference_total / batches * 1000, 4) if batches else 0.0,
+                "queue_depth": self._queue.qsize() if self._queue is not None else 0
+            }
+
+def create_batcher(predict_fn) -> MicroBatcher:
+    """Build a MicroBatcher configured from environment variables"""
+    return MicroBatcher(
+        predict_fn,
+        max_batch_size=int(os.getenv('MICRO_BATCH_MAX_SIZE', 32)),
+        max_wait_ms=float(os.getenv('MICRO_BATCH_MAX_WAIT_MS', 2)),
+        enabled=os.getenv('MICRO_BATCH_ENABLED', 'True').lower() == 'true'
+    )
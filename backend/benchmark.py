@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+GlucoPredict API Load Benchmark
+Drives API endpoints at a fixed concurrency and reports throughput, error rate
+and p50/p95/p99 latency. Runs against a server you started (--url), or spins
+the app up in a subprocess backed by an in-memory MongoDB stand-in (--local,
+needs mongomock) so runs are reproducible without a database. Results can be
+saved as JSON and compared against an earlier run to catch regressions.
+
+Usage:
+    python benchmark.py --local --output bench.json
+    python benchmark.py --local --compare bench.json --threshold 15
+    python benchmark.py --url http://localhost:8000 --endpoints predict_public predict
+    python benchmark.py --url http://localhost:8000 --path /predict/public   # one custom endpoint
+"""
+
+import argparse
+import http.client
+import json
+import math
+import os
+import platform
+import socket
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlparse
+
+SAMPLE_PATIENT = {
+    "pregnancies": 2,
+    "glucose": 110,
+    "bloodPressure": 75,
+    "skinThickness": 25,
+    "insulin": 80,
+    "bmi": 28.5,
+    "diabetesPedigree": 0.5,
+    "age": 35
+}
+
+BENCH_USER = {"email": "bench@glucopredict.local", "password": "bench12345", "name": "Benchmark"}
+
+# name -> (method, path, payload, needs auth token)
+SUITE = {
+    "predict_public": ("POST", "/predict/public", SAMPLE_PATIENT, False),
+    "predict": ("POST", "/predict", SAMPLE_PATIENT, True),
+    "auth_login": ("POST", "/auth/login", {"email": BENCH_USER["email"], "password": BENCH_USER["password"]}, False),
+    "predictions": ("GET", "/predictions?limit=20", None, True),
+    "predictions_stats": ("GET", "/predictions/stats", None, True),
+}
+
+# Metrics compared between runs: (path in result, True when higher is better)
+COMPARED_METRICS = (
+    (("requests_per_sec",), True),
+    (("latency_ms", "p50"), False),
+    (("latency_ms", "p95"), False),
+    (("latency_ms", "p99"), False),
+)
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+def run_load(base_url, path="/predict/public", method="POST", payload=None, headers=None,
+             concurrency=16, duration=10.0, vary_payload=True):
+    """Hammer one endpoint from `concurrency` keep-alive connections for `duration` seconds"""
+    target = urlparse(base_url)
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(worker_id):
+        connection = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=30)
+        local_latencies = []
+        local_errors = 0
+        request_number = 0
+        while time.perf_counter() < deadline:
+            body = None
+            if payload is not None:
+                data = dict(payload)
+                if vary_payload and "glucose" in data:
+                    # Distinct inputs so the prediction cache does not flatter the numbers
+                    data["glucose"] = 70 + (worker_id * 7919 + request_number) % 130
+                body = json.dumps(data)
+            request_number += 1
+
+            started = time.perf_counter()
+            try:
+                connection.request(method, path, body=body, headers={
+                    "Content-Type": "application/json", **(headers or {})
+                })
+                response = connection.getresponse()
+                response.read()
+                if response.status >= 400:
+                    local_errors += 1
+            except (OSError, http.client.HTTPException):
+                local_errors += 1
+                connection.close()
+                connection = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=30)
+            local_latencies.append(time.perf_counter() - started)
+        connection.close()
+
+        with lock:
+            latencies.extend(local_latencies)
+            errors[0] += local_errors
+
+    started_at = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started_at
+
+    latencies.sort()
+    total = len(latencies)
+    return {
+        "endpoint": f"{method} {path}",
+        "concurrency": concurrency,
+        "duration_s": round(elapsed, 2),
+        "requests": total,
+        "errors": errors[0],
+        "error_rate": round(errors[0] / total, 4) if total else 0.0,
+        "requests_per_sec": round(total / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 2),
+            "p95": round(percentile(latencies, 95) * 1000, 2),
+            "p99": round(percentile(latencies, 99) * 1000, 2),
+            "max": round(latencies[-1] * 1000, 2) if latencies else 0.0
+        }
+    }
+
+def _request(base_url, method, path, payload=None, headers=None):
+    """Single JSON request; returns (status, parsed body)"""
+    target = urlparse(base_url)
+    connection = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=30)
+    try:
+        connection.request(method, path, body=json.dumps(payload) if payload is not None else None,
+                           headers={"Content-Type": "application/json", **(headers or {})})
+        response = connection.getresponse()
+        body = response.read()
+        return response.status, json.loads(body) if body else None
+    finally:
+        connection.close()
+
+def prepare_user(base_url, seed_predictions=200):
+    """Register (or log in) the benchmark user and give it some history; returns auth headers"""
+    status, body = _request(base_url, "POST", "/auth/register", BENCH_USER)
+    if status != 201:
+        status, body = _request(base_url, "POST", "/auth/login", {
+            "email": BENCH_USER["email"], "password": BENCH_USER["password"]
+        })
+    if status != 200 and status != 201:
+        raise RuntimeError(f"Could not register or log in the benchmark user: {status} {body}")
+    headers = {"Authorization": f"Bearer {body['token']}"}
+
+    if seed_predictions:
+        records = [dict(SAMPLE_PATIENT, glucose=70 + i % 130) for i in range(seed_predictions)]
+        status, _ = _request(base_url, "POST", "/predict/batch", records, headers)
+        if status != 200:
+            raise RuntimeError(f"Seeding predictions failed: {status}")
+    return headers
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def serve_local(port):
+    """Run the app on a threaded WSGI server backed by mongomock (child process of --local)"""
+    import mongomock
+    import database
+    from werkzeug.serving import WSGIRequestHandler, make_server
+
+    class QuietHandler(WSGIRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, like gunicorn
+
+        def log_request(self, *args, **kwargs):
+            pass
+
+    database.MongoClient = mongomock.MongoClient
+    os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017")
+
+    import main
+    import migrate
+    migrate.create_indexes(database.mongodb.get_db())
+    main.model_manager.load()
+    make_server("127.0.0.1", port, main.app, threaded=True, request_handler=QuietHandler).serve_forever()
+
+def start_local_server(startup_timeout=60.0):
+    """Start serve_local in a subprocess and wait for /ready; returns (base_url, process)"""
+    port = _free_port()
+    process = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--serve-local", str(port)],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        stdout=subprocess.DEVNULL
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.perf_counter() + startup_timeout
+    while time.perf_counter() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("Local server exited during startup")
+        try:
+            if _request(base_url, "GET", "/ready")[0] == 200:
+                return base_url, process
+        except OSError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("Local server did not become ready in time")
+
+def run_suite(base_url, endpoints, concurrency, duration, seed_predictions=200):
+    """Run each named SUITE endpoint in turn; returns a list of run_load results"""
+    headers = prepare_user(base_url, seed_predictions) if any(SUITE[name][3] for name in endpoints) else {}
+    results = []
+    for name in endpoints:
+        method, path, payload, needs_auth = SUITE[name]
+        print(f"🚀 {name}: {method} {path} with {concurrency} connections for {duration}s...")
+        result = run_load(base_url, path, method, payload, headers if needs_auth else None,
+                          concurrency=concurrency, duration=duration,
+                          vary_payload=name != "auth_login")
+        results.append({"name": name, **result})
+    return results
+
+def run_metadata(args) -> dict:
+    """Where and how a run was made, so saved results can be compared fairly"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "target": "local (mongomock)" if args.local else args.url,
+        "concurrency": args.concurrency,
+        "duration_s": args.duration
+    }
+
+def compare_runs(baseline: dict, current: dict, threshold_pct: float) -> list:
+    """Per-endpoint metric changes vs a baseline run; returns the regressions beyond threshold_pct"""
+    baseline_results = {r["name"]: r for r in baseline["results"]}
+    regressions = []
+    print(f"\n📊 Compared with {baseline['meta'].get('git_commit') or 'baseline'} "
+          f"({baseline['meta'].get('timestamp')}), threshold {threshold_pct}%")
+    for result in current["results"]:
+        before = baseline_results.get(result["name"])
+        if before is None:
+            continue
+        for path, higher_is_better in COMPARED_METRICS:
+            old, new = before, result
+            for key in path:
+                old, new = old[key], new[key]
+            change = (new - old) / old * 100 if old else 0.0
+            regressed = (-change if higher_is_better else change) > threshold_pct
+            marker = "❌" if regressed else "✅"
+            label = ".".join(path)
+            print(f"{marker} {result['name']:<18} {label:<16} {old:>10} -> {new:>10} ({change:+.1f}%)")
+            if regressed:
+                regressions.append({"name": result["name"], "metric": label, "before": old,
+                                    "after": new, "change_pct": round(change, 1)})
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the GlucoPredict API")
+    parser.add_argument("--url", default="http://localhost:8000", help="Base URL of a running server")
+    parser.add_argument("--local", action="store_true", help="Start the app against an in-memory MongoDB stand-in")
+    parser.add_argument("--endpoints", nargs="+", choices=list(SUITE), default=list(SUITE), help="Suite endpoints to drive")
+    parser.add_argument("--path", help="Drive one custom POST endpoint with the sample patient instead of the suite")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent keep-alive connections")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to run each endpoint")
+    parser.add_argument("--seed", type=int, default=200, help="Predictions stored for the benchmark user first")
+    parser.add_argument("--output", help="Save results as JSON")
+    parser.add_argument("--compare", help="Baseline JSON from an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Regression threshold in percent")
+    parser.add_argument("--serve-local", type=int, metavar="PORT", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve_local:
+        serve_local(args.serve_local)
+        return
+
+    process = None
+    base_url = args.url
+    if args.local:
+        base_url, process = start_local_server()
+        print(f"🧪 Local server with in-memory MongoDB at {base_url}")
+
+    try:
+        if args.path:
+            print(f"🚀 Benchmarking POST {base_url}{args.path} with {args.concurrency} connections for {args.duration}s...")
+            results = [{"name": args.path, **run_load(base_url, args.path, payload=SAMPLE_PATIENT,
+                                                      concurrency=args.concurrency, duration=args.duration)}]
+        else:
+            results = run_suite(base_url, args.endpoints, args.concurrency, args.duration, args.seed)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+
+    report = {"meta": run_metadata(args), "results": results}
+    print(json.dumps(results, indent=2))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Results saved to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_runs(baseline, report, args.threshold)
+        if regressions:
+            print(f"❌ {len(regressions)} metric(s) regressed by more than {args.threshold}%")
+            sys.exit(1)
+        print("✅ No regressions")
+
+if __name__ == "__main__":
+    main()
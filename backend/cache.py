@@ -0,0 +1,196 @@
+import numpy as np
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dotenv import load_dotenv
+
+load_dotenv()
+
+def estimate_size(key, value) -> int:
+    """Rough in-memory footprint of a cache entry in bytes"""
+    size = sys.getsizeof(key) + sys.getsizeof(value)
+    for part in (key, value):
+        if isinstance(part, (tuple, list)):
+            size += sum(sys.getsizeof(item) for item in part)
+        elif isinstance(part, dict):
+            size += sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in part.items())
+    return size
+
+class RateCounter:
+    """Events in a sliding window (default 60 s), kept in one-second buckets (constant memory)"""
+
+    def __init__(self, window_seconds: int = 60):
+        self.window_seconds = window_seconds
+        self._buckets = [0] * window_seconds
+        self._bucket_times = [0] * window_seconds
+        self._lock = threading.Lock()
+
+    def add(self, count: int = 1):
+        now = int(time.monotonic())
+        slot = now % self.window_seconds
+        with self._lock:
+            if self._bucket_times[slot] != now:
+                self._bucket_times[slot] = now
+                self._buckets[slot] = 0
+            self._buckets[slot] += count
+
+    def total(self) -> int:
+        """Events recorded within the window"""
+        now = int(time.monotonic())
+        with self._lock:
+            return sum(
+                count for count, at in zip(self._buckets, self._bucket_times)
+                if now - at < self.window_seconds
+            )
+
+class LRUCache:
+    """Thread-safe LRU cache with a per-entry TTL and entry-count/memory caps"""
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 300, max_bytes: int = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (value, expires_at, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        """Return the cached value, or None on a miss or expired entry"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, expires_at, size = entry
+            if expires_at < time.monotonic():
+                self._remove(key, size)
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        """Insert or refresh an entry, evicting least recently used entries over the caps"""
+        size = estimate_size(key, value)
+        with self._lock:
+            existing = self._entries.pop(key, None)
+            if existing is not None:
+                self._bytes -= existing[2]
+
+            self._entries[key] = (value, time.monotonic() + self.ttl_seconds, size)
+            self._bytes += size
+
+            while self._entries and (
+                len(self._entries) > self.max_entries
+                or (self.max_bytes is not None and self._bytes > self.max_bytes)
+            ):
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def invalidate(self, key) -> bool:
+        """Drop a single entry; returns whether it was present"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False
+            self._remove(key, entry[2])
+            self.invalidations += 1
+            return True
+
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, key, size):
+        del self._entries[key]
+        self._bytes -= size
+
+    def stats(self) -> dict:
+        """Hit/miss/eviction counters and current occupancy"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations
+            }
+
+class PredictionCache:
+    """LRU cache of class probabilities keyed on the canonical feature vector and model version"""
+
+    def __init__(self, cache: LRUCache, enabled: bool = True):
+        self.cache = cache
+        self.enabled = enabled
+        self.model_version = None
+        self._version_lock = threading.Lock()
+
+    @staticmethod
+    def make_key(features) -> tuple:
+        """Canonicalize features the way the engine sees them (float32, -0.0 folded into 0.0)"""
+        return tuple(float(value) + 0.0 for value in np.asarray(features, dtype=np.float32))
+
+    def _check_version(self, model_version):
+        """Flush every entry the first time a new model version is seen"""
+        if model_version == self.model_version:
+            return
+        with self._version_lock:
+            if model_version != self.model_version:
+                if self.model_version is not None:
+                    print(f"🔄 Model version changed ({self.model_version} -> {model_version}), clearing prediction cache")
+                self.cache.clear()
+                self.model_version = model_version
+
+    def get(self, features, model_version):
+        """Return cached probabilities for these features, or None"""
+        if not self.enabled:
+            return None
+        self._check_version(model_version)
+        probabilities = self.cache.get((model_version, self.make_key(features)))
+        return np.asarray(probabilities, dtype=np.float32) if probabilities is not None else None
+
+    def set(self, features, model_version, probabilities):
+        """Store the probabilities computed for these features"""
+        if not self.enabled:
+            return
+        self._check_version(model_version)
+        self.cache.set(
+            (model_version, self.make_key(features)),
+            tuple(float(p) for p in probabilities)
+        )
+
+    def stats(self) -> dict:
+        return {"enabled": self.enabled, "model_version": self.model_version, **self.cache.stats()}
+
+def create_prediction_cache() -> PredictionCache:
+    """Build a PredictionCache configured from environment variables"""
+    return PredictionCache(
+        LRUCache(
+            max_entries=int(os.getenv('PREDICTION_CACHE_MAX_ENTRIES', 10000)),
+            ttl_seconds=float(os.getenv('PREDICTION_CACHE_TTL_SECONDS', 3600)),
+            max_bytes=int(os.getenv('PREDICTION_CACHE_MAX_BYTES', 8 * 1024 * 1024))
+        ),
+        enabled=os.getenv('PREDICTION_CACHE_ENABLED', 'True').lower() == 'true'
+    )
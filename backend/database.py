@@ -1,92 +1,532 @@
-from pymongo import MongoClient
-from pymongo.errors import DuplicateKeyError, PyMongoError
+from pymongo import MongoClient, UpdateOne, monitoring
+from pymongo.errors import BulkWriteError, DuplicateKeyError, PyMongoError
 from bson import ObjectId
+from bson.errors import InvalidId
 from datetime import datetime, timezone
+import base64
+import json
+import math
 import os
+import threading
+import time
+from collections import Counter, defaultdict
 from dotenv import load_dotenv
-import logging
+
+from metrics import observe_stage, stage
 
 load_dotenv()
 
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """Connection pool counters for /metrics; checkout waits are timed as the mongo_checkout stage"""
+    
+    def __init__(self):
+        self.reset()
+    
+    def reset(self):
+        """Zero the counters (a forked worker starts with no connections of its own)"""
+        self._lock = threading.Lock()
+        self.open_connections = 0
+        self.checked_out = 0
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.pools_cleared = 0
+    
+    def _add(self, field, amount=1):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + amount)
+    
+    def connection_created(self, event):
+        self._add('open_connections')
+    
+    def connection_closed(self, event):
+        self._add('open_connections', -1)
+    
+    def connection_checked_out(self, event):
+        self._add('checked_out')
+        self._add('checkouts')
+        observe_stage('mongo_checkout', event.duration)
+    
+    def connection_checked_in(self, event):
+        self._add('checked_out', -1)
+    
+    def connection_check_out_failed(self, event):
+        self._add('checkout_failures')
+    
+    def pool_cleared(self, event):
+        self._add('pools_cleared')
+    
+    # Events that don't change the counters
+    def pool_created(self, event):
+        pass
+    
+    def pool_ready(self, event):
+        pass
+    
+    def pool_closed(self, event):
+        pass
+    
+    def connection_ready(self, event):
+        pass
+    
+    def connection_check_out_started(self, event):
+        pass
+    
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_pool_size": int(os.getenv('MONGODB_MAX_POOL_SIZE', 100)),
+                "open_connections": self.open_connections,
+                "checked_out": self.checked_out,
+                "checkouts": self.checkouts,
+                "checkout_failures": self.checkout_failures,
+                "pools_cleared": self.pools_cleared
+            }
+
+pool_stats = PoolStatsListener()
+
+def client_options() -> dict:
+    """MongoClient pool, timeout, compression and read preference settings from the environment"""
+    options = {
+        # Don't open sockets or start server monitoring until the first operation
+        "connect": False,
+        "maxPoolSize": int(os.getenv('MONGODB_MAX_POOL_SIZE', 100)),
+        "minPoolSize": int(os.getenv('MONGODB_MIN_POOL_SIZE', 0)),
+        "maxConnecting": int(os.getenv('MONGODB_MAX_CONNECTING', 2)),
+        "connectTimeoutMS": int(os.getenv('MONGODB_CONNECT_TIMEOUT_MS', 5000)),
+        "serverSelectionTimeoutMS": int(os.getenv('MONGODB_SERVER_SELECTION_TIMEOUT_MS', 5000)),
+        "readPreference": os.getenv('MONGODB_READ_PREFERENCE', 'primary'),
+        "appname": os.getenv('MONGODB_APP_NAME', 'glucopredict-api'),
+        "event_listeners": [pool_stats]
+    }
+    
+    optional_int_settings = {
+        "socketTimeoutMS": 'MONGODB_SOCKET_TIMEOUT_MS',
+        "maxIdleTimeMS": 'MONGODB_MAX_IDLE_TIME_MS',
+        "waitQueueTimeoutMS": 'MONGODB_WAIT_QUEUE_TIMEOUT_MS'
+    }
+    for option, env_var in optional_int_settings.items():
+        if os.getenv(env_var):
+            options[option] = int(os.getenv(env_var))
+    
+    # e.g. "zstd,snappy,zlib" (zstd/snappy need the zstandard/python-snappy packages)
+    if os.getenv('MONGODB_COMPRESSORS'):
+        options["compressors"] = os.getenv('MONGODB_COMPRESSORS')
+    
+    return options
+
 class MongoDB:
+    """Per-process MongoDB connection holder.
+    
+    The client is created lazily on first use and re-created after a fork, because
+    MongoClient instances must not be shared between a parent and its worker processes.
+    Creating the client does not touch the network; indexes are managed by migrate.py.
+    """
     _instance = None
     _db = None
+    _pid = None
     
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(MongoDB, cls).__new__(cls)
+            cls._instance._lock = threading.Lock()
         return cls._instance
     
-    def __init__(self):
-        if self._db is None:
-            self.connect()
-    
     def connect(self):
-        """Connect to MongoDB Atlas"""
+        """Create the MongoDB Atlas client (sockets are opened on first operation)"""
         try:
             mongodb_uri = os.getenv('MONGODB_URI')
             if not mongodb_uri:
                 raise ValueError("MONGODB_URI not found in environment variables")
             
-            self.client = MongoClient(mongodb_uri)
-            self._db = self.client.glucopredict
+            self.client = MongoClient(mongodb_uri, **client_options())
+            self._db = self.client[os.getenv('DB_NAME', 'glucopredict')]
+            self._pid = os.getpid()
             
-            # Test connection
-            self.client.admin.command('ping')
-            print("✅ Connected to MongoDB Atlas successfully")
-            
-            # Create indexes for better performance
-            self._create_indexes()
+            print(f"✅ MongoDB client created (pid {self._pid})")
             
         except Exception as e:
             print(f"❌ Failed to connect to MongoDB: {e}")
             raise e
     
-    def _create_indexes(self):
-        """Create database indexes for better performance"""
-        try:
-            # Users collection indexes
-            self._db.users.create_index("email", unique=True)
-            self._db.users.create_index("created_at")
-            
-            # Predictions collection indexes
-            self._db.predictions.create_index([("user_id", 1), ("created_at", -1)])
-            self._db.predictions.create_index("created_at")
-            
-            print("✅ Database indexes created successfully")
-        except Exception as e:
-            print(f"⚠️ Warning: Could not create indexes: {e}")
-    
     def get_db(self):
-        """Get database instance"""
-        if self._db is None:
-            self.connect()
+        """Get database instance, connecting on first use in this process"""
+        if self._db is None or self._pid != os.getpid():
+            with self._lock:
+                if self._db is None or self._pid != os.getpid():
+                    self.connect()
         return self._db
     
+    def reset_after_fork(self):
+        """Forget the parent's client in a freshly forked worker (a new one is created on first use)"""
+        self._lock = threading.Lock()
+        self._db = None
+        self._pid = None
+        pool_stats.reset()
+        if hasattr(self, 'client'):
+            del self.client
+    
     def close_connection(self):
         """Close database connection"""
         if hasattr(self, 'client'):
             self.client.close()
             print("🔌 Database connection closed")
 
+# Document builders and result helpers shared by the sync and async repositories
+def build_user_document(email: str, password_hash: str, name: str = None) -> dict:
+    """Build a new user document"""
+    return {
+        "email": email.lower().strip(),
+        "password_hash": password_hash,
+        "name": name.strip() if name else None,
+        "created_at": datetime.now(timezone.utc),
+        "updated_at": datetime.now(timezone.utc),
+        "is_active": True,
+        "prediction_count": 0,
+        "last_login": None
+    }
+
+def build_prediction_document(user_id: str, prediction_data: dict) -> dict:
+    """Map an API prediction payload onto a prediction document"""
+    return {
+        "user_id": ObjectId(user_id),
+        "pregnancies": prediction_data.get("pregnancies"),
+        "glucose": prediction_data.get("glucose"),
+        "blood_pressure": prediction_data.get("bloodPressure"),
+        "skin_thickness": prediction_data.get("skinThickness"),
+        "insulin": prediction_data.get("insulin"),
+        "bmi": prediction_data.get("bmi"),
+        "diabetes_pedigree": prediction_data.get("diabetesPedigree"),
+        "age": prediction_data.get("age"),
+        "risk_level": prediction_data.get("risk"),
+        "risk_message": prediction_data.get("message"),
+        "probabilities": prediction_data.get("probabilities", {}),
+        "predicted_class": prediction_data.get("predicted_class"),
+        "model_version": prediction_data.get("model_version"),
+        "model_accuracy": prediction_data.get("model_accuracy"),
+        "response_time_ms": prediction_data.get("response_time_ms"),
+        "created_at": datetime.now(timezone.utc)
+    }
+
+def skip_duplicate_inserts(predictions: list, error: BulkWriteError) -> list:
+    """Return the documents of a failed insert_many that were inserted, if only duplicate _ids failed"""
+    write_errors = error.details.get("writeErrors", [])
+    if any(e.get("code") != 11000 for e in write_errors):
+        raise error
+    duplicates = {e["index"] for e in write_errors}
+    return [p for i, p in enumerate(predictions) if i not in duplicates]
+
+def prediction_count_updates(counts: dict) -> list:
+    """Bulk $inc operations for a {user_id: amount} mapping"""
+    return [
+        UpdateOne({"_id": ObjectId(user_id)}, {"$inc": {"prediction_count": amount}})
+        for user_id, amount in counts.items()
+    ]
+
+def serialize_predictions(predictions: list) -> list:
+    """Convert ObjectIds to strings for JSON serialization"""
+    for pred in predictions:
+        pred['_id'] = str(pred['_id'])
+        pred['user_id'] = str(pred['user_id'])
+    return predictions
+
+# Sort order for history pages; (created_at, _id) is unique, so pages never overlap
+HISTORY_SORT = [("created_at", -1), ("_id", -1)]
+
+# Field projections for history list views
+PREDICTION_PROJECTIONS = {
+    "full": None,
+    "summary": {"probabilities": 0, "risk_message": 0, "model_accuracy": 0, "response_time_ms": 0}
+}
+
+def encode_cursor(prediction: dict) -> str:
+    """Opaque keyset cursor pointing just after this prediction"""
+    created_at = prediction["created_at"]
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    position = {"t": int(created_at.timestamp() * 1000), "id": str(prediction["_id"])}
+    return base64.urlsafe_b64encode(json.dumps(position, separators=(',', ':')).encode()).decode().rstrip('=')
+
+def decode_cursor(cursor: str) -> tuple:
+    """Decode a cursor into (created_at, _id); raises ValueError if it is malformed"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        created_at = datetime.fromtimestamp(position["t"] / 1000, tz=timezone.utc)
+        return created_at, ObjectId(position["id"])
+    except (ValueError, KeyError, TypeError, InvalidId) as e:
+        raise ValueError("Invalid cursor") from e
+
+def history_page_query(user_id: str, cursor: str = None) -> dict:
+    """Query for the predictions that sort after the cursor position"""
+    query = {"user_id": ObjectId(user_id)}
+    if cursor:
+        created_at, last_id = decode_cursor(cursor)
+        query["$or"] = [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "_id": {"$lt": last_id}}
+        ]
+    return query
+
+def build_history_page(predictions: list, limit: int) -> tuple:
+    """Trim the limit+1 lookahead row and derive next_cursor from the last row kept"""
+    has_more = len(predictions) > limit
+    predictions = predictions[:limit]
+    next_cursor = encode_cursor(predictions[-1]) if has_more and predictions else None
+    return serialize_predictions(predictions), next_cursor
+
+def export_query(user_id: str = None) -> tuple:
+    """Filter and sort for exporting one user's predictions (oldest first) or the whole collection"""
+    if user_id:
+        return {"user_id": ObjectId(user_id)}, [("created_at", 1), ("_id", 1)]
+    return {}, [("_id", 1)]
+
+def prediction_stats_pipeline(user_id: str) -> list:
+    """Aggregation pipeline grouping a user's predictions by risk level"""
+    return [
+        {"$match": {"user_id": ObjectId(user_id)}},
+        {
+            "$group": {
+                "_id": "$risk_level",
+                "count": {"$sum": 1},
+                "latest": {"$max": "$created_at"}
+            }
+        }
+    ]
+
+# Input features tracked in the per-user summary documents
+STATS_FEATURES = (
+    "pregnancies", "glucose", "blood_pressure", "skin_thickness",
+    "insulin", "bmi", "diabetes_pedigree", "age"
+)
+
+# Number of most recent risk levels kept per user for trends
+STATS_RECENT_WINDOW = int(os.getenv('STATS_RECENT_WINDOW', 20))
+
+# Attempts a rebuild makes before giving up when predictions keep arriving for the user
+STATS_REBUILD_ATTEMPTS = 5
+
+# First wait of a rebuild that finds inserts still to be folded in; doubled on every attempt
+STATS_CLAIM_BACKOFF_SECONDS = 0.05
+
+# Age after which a stats claim is treated as abandoned by a writer that died mid-insert
+STATS_CLAIM_TIMEOUT_SECONDS = float(os.getenv('STATS_CLAIM_TIMEOUT_SECONDS', 60))
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+def prediction_stats_claims(user_ids, claim_id: ObjectId) -> list:
+    """One upserting update per user announcing an insert whose increments are still to come.
+
+    A rebuild that finds a live claim waits for it to be released, and one that
+    read the summary before the claim fails its revision check, so a prediction
+    is never both aggregated by a rebuild and incremented after it.
+    """
+    claim = {"claim_id": claim_id, "claimed_at": time.time()}
+    return [
+        UpdateOne(
+            {"_id": ObjectId(user_id)},
+            {"$push": {"pending_writes": claim}, "$inc": {"revision": 1}},
+            upsert=True
+        )
+        for user_id in {ObjectId(user_id) for user_id in user_ids}
+    ]
+
+def has_pending_writes(summary: dict) -> bool:
+    """Whether a claimed insert may still fold its increments into this summary document"""
+    cutoff = time.time() - STATS_CLAIM_TIMEOUT_SECONDS
+    return any(claim.get("claimed_at", 0) > cutoff for claim in (summary or {}).get("pending_writes", []))
+
+def prediction_stats_updates(documents: list, claim: tuple = None) -> list:
+    """One upserting $inc/$max/$push per user that folds new predictions into its summary document.
+    
+    `claim` is the (claim_id, user_ids) registered by prediction_stats_claims before the
+    insert; it is released for every claimed user, including ones whose documents were
+    all duplicates.
+    """
+    by_user = defaultdict(list)
+    for document in documents:
+        by_user[ObjectId(document["user_id"])].append(document)
+
+    updates = []
+    release = {}
+    if claim is not None:
+        claim_id, claimed_user_ids = claim
+        release = {"pending_writes": {"claim_id": claim_id}}
+        for user_id in {ObjectId(user_id) for user_id in claimed_user_ids} - set(by_user):
+            updates.append(UpdateOne({"_id": user_id}, {"$pull": release}))
+    for user_id, user_documents in by_user.items():
+        user_documents.sort(key=lambda d: d["created_at"])
+        # revision lets a concurrent rebuild detect that it would overwrite these increments
+        increments = {"total": len(user_documents), "revision": 1}
+        for risk, count in Counter(d.get("risk_level") or "unknown" for d in user_documents).items():
+            increments[f"risk_counts.{risk}"] = count
+        for feature in STATS_FEATURES:
+            values = [d.get(feature) for d in user_documents if _is_number(d.get(feature))]
+            if values:
+                increments[f"features.{feature}.n"] = len(values)
+                increments[f"features.{feature}.sum"] = float(sum(values))
+                increments[f"features.{feature}.sum_sq"] = float(sum(v * v for v in values))
+
+        update = {
+            "$inc": increments,
+            "$max": {"latest_prediction": user_documents[-1]["created_at"]},
+            "$push": {"recent_risks": {
+                "$each": [
+                    {"risk_level": d.get("risk_level"), "created_at": d["created_at"]}
+                    for d in user_documents
+                ],
+                "$slice": -STATS_RECENT_WINDOW
+            }},
+            "$set": {"updated_at": datetime.now(timezone.utc)}
+        }
+        if release:
+            update["$pull"] = release
+        updates.append(UpdateOne({"_id": user_id}, update, upsert=True))
+    return updates
+
+def feature_stats_pipeline(user_id: str) -> list:
+    """Aggregation pipeline computing count, sum and sum of squares for each feature"""
+    group = {"_id": None}
+    for feature in STATS_FEATURES:
+        # Records saved before input validation may hold strings; they are skipped like missing values
+        is_number = {"$isNumber": f"${feature}"}
+        group[f"{feature}__n"] = {"$sum": {"$cond": [is_number, 1, 0]}}
+        group[f"{feature}__sum"] = {"$sum": {"$cond": [is_number, f"${feature}", 0]}}
+        group[f"{feature}__sum_sq"] = {"$sum": {"$cond": [is_number, {"$multiply": [f"${feature}", f"${feature}"]}, 0]}}
+    return [{"$match": {"user_id": ObjectId(user_id)}}, {"$group": group}]
+
+def build_stats_document(user_id: str, risk_results: list, feature_results: list, recent: list) -> dict:
+    """Summary document recomputed from the raw predictions (the rebuild path)"""
+    features = {}
+    for row in feature_results:
+        for feature in STATS_FEATURES:
+            if row[f"{feature}__n"]:
+                features[feature] = {
+                    "n": row[f"{feature}__n"],
+                    "sum": float(row[f"{feature}__sum"]),
+                    "sum_sq": float(row[f"{feature}__sum_sq"])
+                }
+
+    now = datetime.now(timezone.utc)
+    return {
+        "_id": ObjectId(user_id),
+        "total": sum(r["count"] for r in risk_results),
+        "risk_counts": {(r["_id"] or "unknown"): r["count"] for r in risk_results},
+        "latest_prediction": max((r["latest"] for r in risk_results), default=None),
+        "features": features,
+        "recent_risks": [
+            {"risk_level": r.get("risk_level"), "created_at": r["created_at"]}
+            for r in reversed(recent)
+        ],
+        "updated_at": now,
+        "backfilled_at": now
+    }
+
+def summarize_prediction_stats(summary: dict) -> dict:
+    """Shape a per-user summary document for the API"""
+    feature_stats = {}
+    for feature, moments in summary.get("features", {}).items():
+        n = moments["n"]
+        mean = moments["sum"] / n
+        variance = max(moments["sum_sq"] / n - mean * mean, 0.0)
+        feature_stats[feature] = {
+            "count": n,
+            "mean": round(mean, 4),
+            "variance": round(variance, 4),
+            "std": round(math.sqrt(variance), 4)
+        }
+
+    recent = [r["risk_level"] for r in summary.get("recent_risks", [])]
+    return {
+        "total_predictions": summary.get("total", 0),
+        "risk_distribution": summary.get("risk_counts", {}),
+        "latest_prediction": summary.get("latest_prediction"),
+        "feature_stats": feature_stats,
+        "recent_trend": {
+            "window": len(recent),
+            "risk_levels": recent,
+            "risk_distribution": dict(Counter(recent))
+        }
+    }
+
+def shadow_summary_pipeline(match: dict) -> list:
+    """Aggregation pipeline summarizing shadow/canary comparisons per candidate version"""
+    return [
+        {"$match": match},
+        {
+            "$group": {
+                "_id": {"candidate_version": "$candidate_version", "primary_version": "$primary_version"},
+                "count": {"$sum": 1},
+                "agreements": {"$sum": {"$cond": ["$agree", 1, 0]}},
+                "served_by_candidate": {"$sum": {"$cond": [{"$eq": ["$served_by", "candidate"]}, 1, 0]}},
+                "mean_max_abs_delta": {"$avg": "$max_abs_delta"},
+                "max_abs_delta": {"$max": "$max_abs_delta"},
+                "mean_primary_latency_ms": {"$avg": "$primary_latency_ms"},
+                "mean_candidate_latency_ms": {"$avg": "$candidate_latency_ms"},
+                "mean_served_latency_ms": {"$avg": "$served_latency_ms"},
+                "first": {"$min": "$created_at"},
+                "latest": {"$max": "$created_at"}
+            }
+        },
+        {"$sort": {"latest": -1}}
+    ]
+
+def shadow_confusion_pipeline(match: dict) -> list:
+    """Aggregation pipeline counting (primary class, candidate class) pairs per (candidate, primary) version pair"""
+    return [
+        {"$match": match},
+        {
+            "$group": {
+                "_id": {
+                    "candidate_version": "$candidate_version",
+                    "primary_version": "$primary_version",
+                    "primary_class": "$primary_class",
+                    "candidate_class": "$candidate_class"
+                },
+                "count": {"$sum": 1}
+            }
+        }
+    ]
+
+def build_shadow_summary(summary_results: list, confusion_results: list, num_classes: int = 3) -> list:
+    """One report per (candidate, primary) version pair, with a primary x candidate class confusion matrix"""
+    confusion = {}
+    for result in confusion_results:
+        key = result["_id"]
+        versions = (key.get("candidate_version"), key.get("primary_version"))
+        matrix = confusion.setdefault(versions, [[0] * num_classes for _ in range(num_classes)])
+        if key.get("primary_class") in range(num_classes) and key.get("candidate_class") in range(num_classes):
+            matrix[key["primary_class"]][key["candidate_class"]] += result["count"]
+
+    reports = []
+    for result in summary_results:
+        versions = (result["_id"].get("candidate_version"), result["_id"].get("primary_version"))
+        reports.append({
+            "candidate_version": versions[0],
+            "primary_version": versions[1],
+            "count": result["count"],
+            "agreement_rate": round(result["agreements"] / result["count"], 4) if result["count"] else None,
+            "served_by_candidate": result["served_by_candidate"],
+            "mean_max_abs_delta": result["mean_max_abs_delta"],
+            "max_abs_delta": result["max_abs_delta"],
+            "mean_primary_latency_ms": result["mean_primary_latency_ms"],
+            "mean_candidate_latency_ms": result["mean_candidate_latency_ms"],
+            "mean_served_latency_ms": result["mean_served_latency_ms"],
+            "first": result["first"].isoformat() if result.get("first") else None,
+            "latest": result["latest"].isoformat() if result.get("latest") else None,
+            "confusion": confusion.get(versions)
+        })
+    return reports
+
 class UserRepository:
-    def __init__(self):
-        self.db = MongoDB().get_db()
-        self.users = self.db.users
+    @property
+    def users(self):
+        return MongoDB().get_db().users
     
     def create_user(self, email: str, password_hash: str, name: str = None) -> dict:
         """Create a new user"""
         try:
-            user_data = {
-                "email": email.lower().strip(),
-                "password_hash": password_hash,
-                "name": name.strip() if name else None,
-                "created_at": datetime.now(timezone.utc),
-                "updated_at": datetime.now(timezone.utc),
-                "is_active": True,
-                "prediction_count": 0,
-                "last_login": None
-            }
+            user_data = build_user_document(email, password_hash, name)
             
             result = self.users.insert_one(user_data)
             user_data['_id'] = result.inserted_id
@@ -131,99 +571,295 @@ class UserRepository:
         except Exception as e:
             print(f"Warning: Could not update last login: {e}")
     
-    def increment_prediction_count(self, user_id: str):
-        """Increment user's prediction count"""
+    def update_password_hash(self, user_id: str, password_hash: str):
+        """Replace a user's stored password hash (e.g. after a bcrypt cost change)"""
         try:
             self.users.update_one(
                 {"_id": ObjectId(user_id)},
-                {"$inc": {"prediction_count": 1}}
+                {"$set": {"password_hash": password_hash, "updated_at": datetime.now(timezone.utc)}}
+            )
+        except Exception as e:
+            raise Exception(f"Failed to update password: {str(e)}")
+    
+    def update_profile(self, user_id: str, name: str) -> bool:
+        """Update user's editable profile fields"""
+        try:
+            result = self.users.update_one(
+                {"_id": ObjectId(user_id)},
+                {"$set": {"name": name.strip() if name else None, "updated_at": datetime.now(timezone.utc)}}
+            )
+            return result.matched_count == 1
+        except Exception as e:
+            raise Exception(f"Failed to update profile: {str(e)}")
+    
+    def set_active(self, user_id: str, is_active: bool) -> bool:
+        """Activate or deactivate a user account"""
+        try:
+            result = self.users.update_one(
+                {"_id": ObjectId(user_id)},
+                {"$set": {"is_active": is_active, "updated_at": datetime.now(timezone.utc)}}
             )
+            return result.matched_count == 1
+        except Exception as e:
+            raise Exception(f"Failed to update account status: {str(e)}")
+    
+    def increment_prediction_count(self, user_id: str, amount: int = 1):
+        """Increment user's prediction count"""
+        try:
+            with stage('counter_update'):
+                self.users.update_one(
+                    {"_id": ObjectId(user_id)},
+                    {"$inc": {"prediction_count": amount}}
+                )
         except Exception as e:
             print(f"Warning: Could not update prediction count: {e}")
+    
+    def increment_prediction_counts(self, counts: dict):
+        """Apply many per-user prediction count increments in one bulk write"""
+        if not counts:
+            return
+        with stage('counter_update'):
+            self.users.bulk_write(prediction_count_updates(counts), ordered=False)
 
 class PredictionRepository:
-    def __init__(self):
-        self.db = MongoDB().get_db()
-        self.predictions = self.db.predictions
+    @property
+    def predictions(self):
+        return MongoDB().get_db().predictions
+    
+    @property
+    def prediction_stats(self):
+        return MongoDB().get_db().prediction_stats
+    
+    def _build_prediction_document(self, user_id: str, prediction_data: dict) -> dict:
+        """Map an API prediction payload onto a prediction document"""
+        return build_prediction_document(user_id, prediction_data)
     
     def create_prediction(self, user_id: str, prediction_data: dict) -> dict:
         """Create a new prediction record"""
         try:
-            prediction = {
-                "user_id": ObjectId(user_id),
-                "pregnancies": prediction_data.get("pregnancies"),
-                "glucose": prediction_data.get("glucose"),
-                "blood_pressure": prediction_data.get("bloodPressure"),
-                "skin_thickness": prediction_data.get("skinThickness"),
-                "insulin": prediction_data.get("insulin"),
-                "bmi": prediction_data.get("bmi"),
-                "diabetes_pedigree": prediction_data.get("diabetesPedigree"),
-                "age": prediction_data.get("age"),
-                "risk_level": prediction_data.get("risk"),
-                "risk_message": prediction_data.get("message"),
-                "probabilities": prediction_data.get("probabilities", {}),
-                "predicted_class": prediction_data.get("predicted_class"),
-                "model_accuracy": prediction_data.get("model_accuracy"),
-                "response_time_ms": prediction_data.get("response_time_ms"),
-                "created_at": datetime.now(timezone.utc)
-            }
+            prediction = self._build_prediction_document(user_id, prediction_data)
+            claim = self.claim_prediction_stats([user_id])
             
-            result = self.predictions.insert_one(prediction)
+            try:
+                with stage('mongo_insert'):
+                    result = self.predictions.insert_one(prediction)
+            except Exception:
+                self.update_prediction_stats([], claim)
+                raise
             prediction['_id'] = result.inserted_id
+            self.update_prediction_stats([prediction], claim)
             
             return prediction
             
         except Exception as e:
             raise Exception(f"Failed to save prediction: {str(e)}")
     
+    def create_predictions(self, user_id: str, predictions_data: list) -> list:
+        """Create many prediction records with a single insert_many round trip"""
+        if not predictions_data:
+            return []
+        try:
+            predictions = [
+                self._build_prediction_document(user_id, prediction_data)
+                for prediction_data in predictions_data
+            ]
+            claim = self.claim_prediction_stats([user_id])
+            
+            try:
+                with stage('mongo_insert'):
+                    result = self.predictions.insert_many(predictions, ordered=False)
+            except Exception:
+                self.update_prediction_stats([], claim)
+                raise
+            for prediction, inserted_id in zip(predictions, result.inserted_ids):
+                prediction['_id'] = inserted_id
+            self.update_prediction_stats(predictions, claim)
+            
+            return predictions
+            
+        except Exception as e:
+            raise Exception(f"Failed to save predictions: {str(e)}")
+    
+    def insert_prediction_documents(self, predictions: list) -> list:
+        """Insert prebuilt documents with client-generated _ids, skipping ones already stored.
+        
+        Returns the documents that were newly inserted, so retries are idempotent.
+        """
+        if not predictions:
+            return []
+        claim = self.claim_prediction_stats(prediction["user_id"] for prediction in predictions)
+        try:
+            with stage('mongo_insert'):
+                self.predictions.insert_many(predictions, ordered=False)
+            inserted = predictions
+        except BulkWriteError as e:
+            inserted = skip_duplicate_inserts(predictions, e)
+        except Exception:
+            self.update_prediction_stats([], claim)
+            raise
+        self.update_prediction_stats(inserted, claim)
+        return inserted
+    
+    def claim_prediction_stats(self, user_ids) -> tuple:
+        """Announce an insert to its users' summary documents; returns the claim to release, or None"""
+        user_ids = list(user_ids)
+        claim_id = ObjectId()
+        try:
+            with stage('stats_claim'):
+                self.prediction_stats.bulk_write(prediction_stats_claims(user_ids, claim_id), ordered=False)
+            return claim_id, user_ids
+        except Exception as e:
+            print(f"Warning: Could not claim prediction stats: {e}")
+            return None
+    
+    def update_prediction_stats(self, predictions: list, claim: tuple = None):
+        """Fold newly inserted predictions into their users' summary documents and release the claim"""
+        if not predictions and claim is None:
+            return
+        try:
+            with stage('stats_update'):
+                self.prediction_stats.bulk_write(prediction_stats_updates(predictions, claim), ordered=False)
+        except Exception as e:
+            # The summary self-heals on the next `migrate.py rebuild-stats`
+            print(f"Warning: Could not update prediction stats: {e}")
+    
     def get_user_predictions(self, user_id: str, limit: int = 50, skip: int = 0) -> list:
         """Get user's prediction history"""
         try:
             predictions = list(
                 self.predictions.find({"user_id": ObjectId(user_id)})
-                .sort("created_at", -1)
+                .sort(HISTORY_SORT)
                 .skip(skip)
                 .limit(limit)
             )
             
             # Convert ObjectId to string for JSON serialization
-            for pred in predictions:
-                pred['_id'] = str(pred['_id'])
-                pred['user_id'] = str(pred['user_id'])
+            return serialize_predictions(predictions)
             
-            return predictions
+        except Exception as e:
+            raise Exception(f"Failed to get predictions: {str(e)}")
+    
+    def get_user_predictions_page(self, user_id: str, limit: int = 20, cursor: str = None,
+                                  fields: str = "full") -> tuple:
+        """Get one page of history by keyset pagination; returns (predictions, next_cursor)"""
+        if fields not in PREDICTION_PROJECTIONS:
+            raise ValueError(f"Unknown fields option: {fields}")
+        query = history_page_query(user_id, cursor)
+        try:
+            predictions = list(
+                self.predictions.find(query, PREDICTION_PROJECTIONS[fields])
+                .sort(HISTORY_SORT)
+                .limit(limit + 1)
+            )
+            return build_history_page(predictions, limit)
             
         except Exception as e:
             raise Exception(f"Failed to get predictions: {str(e)}")
     
+    def iter_predictions(self, user_id: str = None, batch_size: int = 1000):
+        """Server-side cursor over a user's predictions, or every prediction when user_id is None"""
+        query, sort = export_query(user_id)
+        return self.predictions.find(query).sort(sort).batch_size(batch_size)
+    
     def get_prediction_stats(self, user_id: str) -> dict:
-        """Get user's prediction statistics"""
+        """Get user's prediction statistics from their summary document"""
         try:
-            pipeline = [
-                {"$match": {"user_id": ObjectId(user_id)}},
-                {
-                    "$group": {
-                        "_id": "$risk_level",
-                        "count": {"$sum": 1},
-                        "latest": {"$max": "$created_at"}
-                    }
-                }
-            ]
-            
-            results = list(self.predictions.aggregate(pipeline))
-            
-            stats = {
-                "total_predictions": sum(r["count"] for r in results),
-                "risk_distribution": {r["_id"]: r["count"] for r in results},
-                "latest_prediction": max((r["latest"] for r in results), default=None)
-            }
-            
-            return stats
+            summary = self.prediction_stats.find_one({"_id": ObjectId(user_id)})
+            if summary is None or "backfilled_at" not in summary:
+                # First read for this user since summaries were introduced
+                summary = self.rebuild_prediction_stats(user_id)
+            return summarize_prediction_stats(summary)
             
         except Exception as e:
             raise Exception(f"Failed to get prediction stats: {str(e)}")
+    
+    def rebuild_prediction_stats(self, user_id: str) -> dict:
+        """Recompute a user's summary document from the raw predictions.
+        
+        The rebuild waits while an insert has claimed the summary and not yet
+        folded in its increments, and the replace only succeeds if no claim or
+        incremental update bumped the summary's revision while the aggregation
+        ran; otherwise it starts over. Increments from predictions saved
+        concurrently are thus neither overwritten nor counted twice.
+        """
+        for attempt in range(STATS_REBUILD_ATTEMPTS):
+            current = self.prediction_stats.find_one({"_id": ObjectId(user_id)}, {"revision": 1, "pending_writes": 1})
+            if has_pending_writes(current):
+                time.sleep(STATS_CLAIM_BACKOFF_SECONDS * 2 ** attempt)
+                continue
+            risk_results = list(self.predictions.aggregate(prediction_stats_pipeline(user_id)))
+            feature_results = list(self.predictions.aggregate(feature_stats_pipeline(user_id)))
+            recent = list(
+                self.predictions.find({"user_id": ObjectId(user_id)}, {"risk_level": 1, "created_at": 1})
+                .sort(HISTORY_SORT)
+                .limit(STATS_RECENT_WINDOW)
+            )
+            summary = build_stats_document(user_id, risk_results, feature_results, recent)
+            if current is None:
+                summary["revision"] = 0
+                try:
+                    self.prediction_stats.insert_one(summary)
+                    return summary
+                except DuplicateKeyError:
+                    continue
+            summary["revision"] = current.get("revision", 0)
+            result = self.prediction_stats.replace_one(
+                {"_id": summary["_id"], "revision": current.get("revision")}, summary
+            )
+            if result.matched_count:
+                return summary
+        raise Exception(f"Prediction stats of user {user_id} kept changing during the rebuild")
+    
+    def rebuild_all_prediction_stats(self) -> int:
+        """Recompute the summary document of every user with predictions"""
+        user_ids = self.predictions.distinct("user_id")
+        for user_id in user_ids:
+            self.rebuild_prediction_stats(str(user_id))
+        return len(user_ids)
+
+class ShadowEvaluationRepository:
+    @property
+    def evaluations(self):
+        return MongoDB().get_db().shadow_evaluations
+    
+    def insert_evaluations(self, documents: list):
+        """Store one comparison document per mirrored or canary request"""
+        if documents:
+            self.evaluations.insert_many(documents, ordered=False)
+    
+    def get_summary(self, candidate_version: str = None, since: datetime = None) -> list:
+        """Agreement, probability delta and latency report per candidate version, newest first"""
+        match = {}
+        if candidate_version:
+            match["candidate_version"] = candidate_version
+        if since:
+            match["created_at"] = {"$gte": since}
+        summary_results = list(self.evaluations.aggregate(shadow_summary_pipeline(match)))
+        confusion_results = list(self.evaluations.aggregate(shadow_confusion_pipeline(match)))
+        return build_shadow_summary(summary_results, confusion_results)
+
+class DriftSnapshotRepository:
+    @property
+    def snapshots(self):
+        return MongoDB().get_db().drift_snapshots
+    
+    def inc_buckets(self, increments: dict):
+        """Add per-bucket drift counts ({bucket start: $inc document}); workers' counts add up"""
+        self.snapshots.bulk_write([
+            UpdateOne({"_id": start}, {"$inc": inc, "$setOnInsert": {"start": start}}, upsert=True)
+            for start, inc in increments.items()
+        ], ordered=False)
+    
+    def load_buckets(self, since: float) -> list:
+        """Bucket documents starting at or after an epoch time"""
+        return list(self.snapshots.find({"start": {"$gte": since}}))
+    
+    def delete_buckets_before(self, before: float):
+        self.snapshots.delete_many({"start": {"$lt": before}})
 
 # Global instances
 mongodb = MongoDB()
 user_repo = UserRepository()
-prediction_repo = PredictionRepository()
\ No newline at end of file
+prediction_repo = PredictionRepository()
+shadow_repo = ShadowEvaluationRepository()
+drift_repo = DriftSnapshotRepository()
\ No newline at end of file
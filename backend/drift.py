@@ -0,0 +1,492 @@
+#!/usr/bin/env python3
+"""
+GlucoPredict Input Drift Monitor
+Tracks how the patients sent to the prediction endpoints compare with the
+training data (Model/diabetes.csv).
+
+The monitor keeps a sliding window (DRIFT_WINDOW_SECONDS) as a ring of
+DRIFT_BUCKETS time buckets. Each bucket holds, per feature, a histogram over the
+training decile edges and a quantile sketch, plus counts of the predicted
+classes, so memory stays constant however much traffic arrives. Reports merge
+the live buckets and compare them with the training reference:
+
+    psi   Population Stability Index over the decile bins (< 0.1 stable,
+          0.1-0.25 moderate shift, > 0.25 significant shift)
+    ks    Kolmogorov-Smirnov distance between the window's CDF (from the sketch)
+          and the training CDF, flagged when above the 5% critical value
+
+The in-memory window covers this worker's traffic only. Every
+DRIFT_SNAPSHOT_SECONDS the counts it added since the last snapshot are merged into
+per-bucket documents in the drift_snapshots collection, which therefore hold the
+whole deployment's window; cluster reports are built from those documents, so
+they survive worker restarts.
+
+Usage:
+    python drift.py build-reference ../Model/diabetes.csv   # writes drift_reference.json
+"""
+
+import argparse
+import atexit
+import bisect
+import json
+import math
+import os
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+from dotenv import load_dotenv
+
+from validation import FEATURE_FIELDS
+
+load_dotenv()
+
+# Model/diabetes.csv columns, in FEATURE_FIELDS order
+TRAINING_COLUMNS = ("Pregnancies", "Glucose", "BloodPressure", "SkinThickness", "Insulin", "BMI",
+                    "DiabetesPedigreeFunction", "Age")
+NUM_CLASSES = 3
+REFERENCE_PATH = "drift_reference.json"
+REFERENCE_QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+PSI_MODERATE = 0.1
+PSI_SIGNIFICANT = 0.25
+KS_ALPHA_COEFFICIENT = 1.36  # critical value c(alpha) of the two-sample KS test at alpha = 0.05
+PSI_EPSILON = 1e-4           # floor for empty bins, so PSI stays finite
+
+class QuantileSketch:
+    """Mergeable quantile sketch with relative accuracy (DDSketch with logarithmic bins).
+
+    Values at or below `min_value` share one bin; every feature is non-negative, and
+    the validated ranges bound the number of bins to a few hundred.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.005, min_value: float = 1e-3):
+        self.relative_accuracy = relative_accuracy
+        self.min_value = min_value
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self._inverse_log_gamma = 1 / self._log_gamma
+        self.bins = Counter()
+        self.zero_count = 0
+        self.count = 0
+
+    def key(self, value: float):
+        """Bin of a value; None for the shared bin of values <= min_value"""
+        if value <= self.min_value:
+            return None
+        return math.ceil(math.log(value) * self._inverse_log_gamma)
+
+    def add_key(self, key, count: int = 1):
+        if key is None:
+            self.zero_count += count
+        else:
+            self.bins[key] += count
+        self.count += count
+
+    def add(self, value: float, count: int = 1):
+        self.add_key(self.key(value), count)
+
+    def add_many(self, values: np.ndarray):
+        values = np.asarray(values, dtype=np.float64)
+        small = values <= self.min_value
+        self.zero_count += int(small.sum())
+        keys, counts = np.unique(np.ceil(np.log(values[~small]) / self._log_gamma).astype(np.int64),
+                                 return_counts=True)
+        for key, count in zip(keys.tolist(), counts.tolist()):
+            self.bins[key] += count
+        self.count += len(values)
+
+    def merge(self, other: 'QuantileSketch'):
+        self.bins.update(other.bins)
+        self.zero_count += other.zero_count
+        self.count += other.count
+
+    def value(self, key: int) -> float:
+        """Representative value of a bin (within relative_accuracy of every value in it)"""
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def quantile(self, q: float):
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if rank < seen:
+                return self.value(key)
+        return self.value(max(self.bins))
+
+    def cdf(self, points) -> np.ndarray:
+        """Fraction of values <= each point; a point counts its whole bin, so repeated exact values are included"""
+        points = np.asarray(points, dtype=np.float64)
+        if self.count == 0:
+            return np.zeros(len(points))
+        keys = np.array(sorted(self.bins), dtype=np.int64)
+        cumulative = np.cumsum([self.zero_count] + [self.bins[key] for key in keys.tolist()])
+        point_keys = np.ceil(np.log(np.maximum(points, self.min_value)) / self._log_gamma)
+        index = np.where(points <= self.min_value, 0, np.searchsorted(keys, point_keys, side='right'))
+        return cumulative[index] / self.count
+
+class _Bucket:
+    """Counts of one time slice of the window (plain lists: cheaper than NumPy for one-row updates)"""
+
+    def __init__(self, index: int, n_bins: list):
+        self.index = index
+        self.count = 0
+        self.histograms = [[0] * n for n in n_bins]
+        self.sketches = [QuantileSketch() for _ in n_bins]
+        self.classes = [0] * NUM_CLASSES
+
+    def is_empty(self) -> bool:
+        return self.count == 0 and not any(self.classes)
+
+    def merge(self, other: '_Bucket'):
+        self.count += other.count
+        for histogram, counts in zip(self.histograms, other.histograms):
+            for bin_index, count in enumerate(counts):
+                histogram[bin_index] += count
+        for sketch, other_sketch in zip(self.sketches, other.sketches):
+            sketch.merge(other_sketch)
+        for predicted_class, count in enumerate(other.classes):
+            self.classes[predicted_class] += count
+
+def population_stability_index(expected, actual) -> float:
+    expected = np.maximum(np.asarray(expected, dtype=np.float64), PSI_EPSILON)
+    actual = np.maximum(np.asarray(actual, dtype=np.float64), PSI_EPSILON)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+def psi_status(psi: float) -> str:
+    if psi >= PSI_SIGNIFICANT:
+        return "significant"
+    if psi >= PSI_MODERATE:
+        return "moderate"
+    return "stable"
+
+def ks_critical_value(n: int, m: int) -> float:
+    return KS_ALPHA_COEFFICIENT * math.sqrt((n + m) / (n * m))
+
+def build_reference(csv_path: str) -> dict:
+    """Decile bins, a CDF grid, quantiles and class priors of the training data"""
+    import pandas as pd
+
+    df = pd.read_csv(csv_path)
+    features = {}
+    for field, column in zip(FEATURE_FIELDS, TRAINING_COLUMNS):
+        values = np.sort(df[column].to_numpy(dtype=np.float64))
+        # Inner decile edges; ties (e.g. many zero insulin readings) collapse into one bin
+        edges = np.unique(np.quantile(values, np.linspace(0.1, 0.9, 9)))
+        bins = np.searchsorted(edges, values, side='right')
+        # CDF grid for KS: 201 quantiles (observed values, not interpolated ones) keep the reference small
+        grid = np.unique(np.quantile(values, np.linspace(0, 1, 201), method='lower'))
+        features[field] = {
+            "edges": edges.tolist(),
+            "proportions": (np.bincount(bins, minlength=len(edges) + 1) / len(values)).tolist(),
+            "grid": grid.tolist(),
+            "cdf": (np.searchsorted(values, grid, side='right') / len(values)).tolist(),
+            "quantiles": {f"p{round(q * 100):02d}": float(np.quantile(values, q)) for q in REFERENCE_QUANTILES},
+            "mean": float(values.mean())
+        }
+
+    # Same rule as three_class_labels in Model/training.py
+    labels = np.select([df['Outcome'] == 1, df['Glucose'] < 100, df['Glucose'] <= 125], [2, 0, 1], default=2)
+    return {
+        "source": os.path.basename(csv_path),
+        "rows": int(len(df)),
+        "features": features,
+        "class_priors": (np.bincount(labels, minlength=NUM_CLASSES) / len(labels)).tolist()
+    }
+
+class DriftMonitor:
+    """Sliding-window feature and predicted-class statistics compared with the training reference"""
+
+    def __init__(self, reference: dict, repo=None, window_seconds: float = 3600, n_buckets: int = 12,
+                 snapshot_interval: float = 60, enabled: bool = True):
+        self.reference = reference
+        self.repo = repo
+        self.window_seconds = window_seconds
+        self.n_buckets = max(1, n_buckets)
+        self.bucket_seconds = window_seconds / self.n_buckets
+        self.snapshot_interval = snapshot_interval
+        self.enabled = enabled
+
+        # Compare at float32 precision, like the validated feature rows
+        self._edges = [np.asarray(reference["features"][field]["edges"], dtype=np.float32).tolist()
+                       for field in FEATURE_FIELDS]
+        self._n_bins = [len(edges) + 1 for edges in self._edges]
+        self._sketch_key = QuantileSketch().key
+        self._buckets = [None] * self.n_buckets
+        self._pending = {}  # bucket index -> counts not yet snapshotted
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+        self.observed = 0
+        self.snapshots = 0
+        self.failed_snapshots = 0
+
+    def _ensure_started(self):
+        """Start the snapshot thread lazily, and again in each forked worker process"""
+        if self.repo is None or (self._pid == os.getpid() and self._thread is not None):
+            return
+        with self._start_lock:
+            if self._pid == os.getpid() and self._thread is not None:
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="drift-snapshot", daemon=True)
+            self._thread.start()
+
+    def _current_buckets(self, index: int):
+        """Live and pending buckets for a bucket index, recycling the slot of an expired one (lock held)"""
+        slot = index % self.n_buckets
+        bucket = self._buckets[slot]
+        if bucket is None or bucket.index != index:
+            bucket = self._buckets[slot] = _Bucket(index, self._n_bins)
+        if self.repo is None:
+            return (bucket,)
+        pending = self._pending.get(index)
+        if pending is None:
+            pending = self._pending[index] = _Bucket(index, self._n_bins)
+        return bucket, pending
+
+    def observe(self, features, predicted_class: int):
+        """Record one validated feature row and its predicted class"""
+        if not self.enabled:
+            return
+        self._ensure_started()
+        values = features.tolist()
+        bins = [bisect.bisect_right(edges, value) for edges, value in zip(self._edges, values)]
+        keys = [self._sketch_key(value) for value in values]
+        with self._lock:
+            for bucket in self._current_buckets(int(time.time() // self.bucket_seconds)):
+                bucket.count += 1
+                for histogram, sketch, bin_index, key in zip(bucket.histograms, bucket.sketches, bins, keys):
+                    histogram[bin_index] += 1
+                    sketch.add_key(key)
+                bucket.classes[predicted_class] += 1
+            self.observed += 1
+
+    def observe_many(self, matrix, predicted_classes):
+        """Record a batch of validated rows at once"""
+        if not self.enabled or not len(matrix):
+            return
+        self._ensure_started()
+        columns = np.asarray(matrix, dtype=np.float64).T
+        batch = _Bucket(None, self._n_bins)
+        batch.count = len(matrix)
+        batch.histograms = [np.bincount(np.searchsorted(edges, column, side='right'), minlength=n_bins).tolist()
+                            for edges, column, n_bins in zip(self._edges, columns, self._n_bins)]
+        for sketch, column in zip(batch.sketches, columns):
+            sketch.add_many(column)
+        batch.classes = np.bincount(np.asarray(predicted_classes), minlength=NUM_CLASSES).tolist()
+        with self._lock:
+            for bucket in self._current_buckets(int(time.time() // self.bucket_seconds)):
+                bucket.merge(batch)
+            self.observed += len(matrix)
+
+    def _window(self):
+        """Merged histograms, sketches and class counts of the buckets inside the window"""
+        merged = _Bucket(None, self._n_bins)
+        oldest = int(time.time() // self.bucket_seconds) - self.n_buckets + 1
+        with self._lock:
+            for bucket in self._buckets:
+                if bucket is None or bucket.index < oldest:
+                    continue
+                merged.merge(bucket)
+        return merged
+
+    def _cluster_window(self):
+        """Merged bucket documents of every worker inside the window plus this worker's unsnapshotted counts
+
+        Read-only: snapshots are left to the background thread and the worker_exit hook.
+        The documents are read before the pending counts, so a snapshot running at the
+        same time can leave its counts out of one report but never counts them twice.
+        """
+        oldest = int(time.time() // self.bucket_seconds) - self.n_buckets + 1
+        merged = _Bucket(None, self._n_bins)
+        for document in self.repo.load_buckets(oldest * self.bucket_seconds):
+            if int(round(document["start"] / self.bucket_seconds)) >= oldest:
+                self._merge_document(merged, document)
+        with self._lock:
+            for index, bucket in self._pending.items():
+                if index >= oldest:
+                    merged.merge(bucket)
+        return merged
+
+    def report(self, cluster: bool = False) -> dict:
+        """PSI and KS of every feature and the predicted-class PSI for the current window
+
+        With `cluster` (and a repository) the window is every worker's snapshotted
+        counts plus this worker's newer ones; other workers' last
+        DRIFT_SNAPSHOT_SECONDS may not be included yet. Nothing is written to MongoDB.
+        Otherwise it is this worker's in-memory window.
+        """
+        if not self.enabled:
+            return {"enabled": False}
+        cluster = cluster and self.repo is not None
+        window = self._cluster_window() if cluster else self._window()
+        reference_rows = self.reference["rows"]
+        features = {}
+        for field, histogram, sketch in zip(FEATURE_FIELDS, window.histograms, window.sketches):
+            reference = self.reference["features"][field]
+            entry = {"count": int(window.count), "reference_quantiles": reference["quantiles"]}
+            if window.count:
+                psi = population_stability_index(reference["proportions"], np.asarray(histogram) / window.count)
+                ks = float(np.max(np.abs(sketch.cdf(reference["grid"]) - np.asarray(reference["cdf"]))))
+                critical = ks_critical_value(window.count, reference_rows)
+                entry.update({
+                    "psi": round(psi, 4),
+                    "psi_status": psi_status(psi),
+                    "ks": round(ks, 4),
+                    "ks_critical": round(critical, 4),
+                    "ks_drift": ks > critical,
+                    "quantiles": {f"p{round(q * 100):02d}": sketch.quantile(q) for q in REFERENCE_QUANTILES}
+                })
+            features[field] = entry
+
+        classes = {"counts": window.classes, "reference_priors": self.reference["class_priors"]}
+        class_total = sum(window.classes)
+        if class_total:
+            proportions = np.asarray(window.classes) / class_total
+            psi = population_stability_index(self.reference["class_priors"], proportions)
+            classes.update({
+                "proportions": proportions.round(4).tolist(),
+                "psi": round(psi, 4),
+                "psi_status": psi_status(psi)
+            })
+
+        psis = [entry["psi"] for entry in features.values() if "psi" in entry]
+        return {
+            "enabled": True,
+            "scope": "cluster" if cluster else "worker",
+            "window_seconds": self.window_seconds,
+            "bucket_seconds": self.bucket_seconds,
+            "count": int(window.count),
+            "reference": {"source": self.reference.get("source"), "rows": reference_rows},
+            "max_psi": max(psis) if psis else None,
+            "drifting_features": [field for field, entry in features.items()
+                                  if entry.get("psi_status") == "significant" or entry.get("ks_drift")],
+            "features": features,
+            "predicted_classes": classes
+        }
+
+    def snapshot(self):
+        """Merge the counts added since the last snapshot into MongoDB and drop expired bucket documents"""
+        if self.repo is None:
+            return
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        increments = {bucket.index * self.bucket_seconds: self._bucket_increments(bucket)
+                      for bucket in pending.values() if not bucket.is_empty()}
+        if not increments:
+            return
+        try:
+            self.repo.inc_buckets(increments)
+            self.repo.delete_buckets_before(time.time() - self.window_seconds - self.bucket_seconds)
+            self.snapshots += 1
+        except Exception as e:
+            # Keep the counts of buckets still inside the window for the next attempt
+            oldest = int(time.time() // self.bucket_seconds) - self.n_buckets + 1
+            with self._lock:
+                for index, bucket in pending.items():
+                    if index >= oldest:
+                        self._pending.setdefault(index, _Bucket(index, self._n_bins)).merge(bucket)
+            self.failed_snapshots += 1
+            print(f"⚠️ Drift snapshot failed: {e}")
+
+    def _run(self):
+        while True:
+            time.sleep(self.snapshot_interval)
+            self.snapshot()
+
+    def _bucket_increments(self, bucket) -> dict:
+        """$inc document for one bucket (dotted paths, so concurrent workers add up)"""
+        increments = {"count": int(bucket.count)}
+        for field, histogram, sketch in zip(FEATURE_FIELDS, bucket.histograms, bucket.sketches):
+            for bin_index, count in enumerate(histogram):
+                if count:
+                    increments[f"histograms.{field}.{bin_index}"] = count
+            if sketch.zero_count:
+                increments[f"sketches.{field}.zero"] = sketch.zero_count
+            for key, count in sketch.bins.items():
+                increments[f"sketches.{field}.bins.{key}"] = count
+        for predicted_class, count in enumerate(bucket.classes):
+            if count:
+                increments[f"classes.{predicted_class}"] = count
+        return increments
+
+    def _merge_document(self, bucket, document):
+        bucket.count += document.get("count", 0)
+        for field, histogram, sketch in zip(FEATURE_FIELDS, bucket.histograms, bucket.sketches):
+            for bin_index, count in document.get("histograms", {}).get(field, {}).items():
+                if int(bin_index) < len(histogram):  # bins of a different reference are ignored
+                    histogram[int(bin_index)] += count
+            saved = document.get("sketches", {}).get(field, {})
+            sketch.zero_count += saved.get("zero", 0)
+            for key, count in saved.get("bins", {}).items():
+                sketch.bins[int(key)] += count
+            sketch.count += saved.get("zero", 0) + sum(saved.get("bins", {}).values())
+        for predicted_class, count in document.get("classes", {}).items():
+            bucket.classes[int(predicted_class)] += count
+
+    def stats(self) -> dict:
+        """This worker's window size, PSI per feature and snapshot counters"""
+        if not self.enabled:
+            return {"enabled": False}
+        report = self.report()
+        return {
+            "enabled": self.enabled,
+            "observed": self.observed,
+            "window_count": report["count"],
+            "max_psi": report["max_psi"] or 0.0,
+            "psi": {field: entry.get("psi", 0.0) for field, entry in report["features"].items()},
+            "class_psi": report["predicted_classes"].get("psi", 0.0),
+            "drifting_features": len(report["drifting_features"]),
+            "snapshots": self.snapshots,
+            "failed_snapshots": self.failed_snapshots
+        }
+
+def load_reference(path: str = REFERENCE_PATH) -> dict:
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def create_drift_monitor(repo) -> DriftMonitor:
+    """Build a DriftMonitor configured from environment variables; disabled if the reference is missing"""
+    enabled = os.getenv('DRIFT_MONITOR_ENABLED', 'True').lower() == 'true'
+    reference_path = os.getenv('DRIFT_REFERENCE_PATH', REFERENCE_PATH)
+    try:
+        reference = load_reference(reference_path)
+    except FileNotFoundError:
+        print(f"⚠️ Drift reference '{reference_path}' not found, drift monitoring disabled")
+        reference = {"rows": 0, "features": {field: {"edges": []} for field in FEATURE_FIELDS}, "class_priors": []}
+        enabled = False
+
+    monitor = DriftMonitor(
+        reference,
+        repo,
+        window_seconds=float(os.getenv('DRIFT_WINDOW_SECONDS', 3600)),
+        n_buckets=int(os.getenv('DRIFT_BUCKETS', 12)),
+        snapshot_interval=float(os.getenv('DRIFT_SNAPSHOT_SECONDS', 60)),
+        enabled=enabled
+    )
+    if enabled:
+        atexit.register(monitor.snapshot)
+    return monitor
+
+def main():
+    parser = argparse.ArgumentParser(description="GlucoPredict drift monitoring")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build-reference", help="Summarize the training CSV for drift comparisons")
+    build.add_argument("csv", nargs="?", default=os.path.join("..", "Model", "diabetes.csv"))
+    build.add_argument("--output", default=REFERENCE_PATH)
+    args = parser.parse_args()
+
+    reference = build_reference(args.csv)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(reference, f, indent=1)
+    print(f"✅ Drift reference of {reference['rows']} rows saved as '{args.output}'")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+GlucoPredict Prediction Export
+Streams prediction history out of MongoDB through a server-side cursor in
+constant memory: NDJSON or CSV chunks (used by GET /predictions/export), or
+Parquet row groups written to disk.
+
+Usage:
+    python export.py --format parquet --output predictions.parquet
+    python export.py --format csv --output - --user <user_id>
+"""
+
+import argparse
+import contextlib
+import csv
+import io
+import json
+import os
+import sys
+import time
+from datetime import timezone
+from dotenv import load_dotenv
+
+from database import STATS_FEATURES
+
+load_dotenv()
+
+# Documents fetched per cursor round trip, and rows per HTTP chunk / Parquet row group
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', 1000))
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet"
+}
+
+PROBABILITY_CLASSES = ("normal", "borderline", "high")
+
+EXPORT_COLUMNS = (
+    ["_id", "user_id", "created_at", *STATS_FEATURES, "risk_level", "predicted_class"]
+    + [f"prob_{name}" for name in PROBABILITY_CLASSES]
+    + ["model_version", "model_accuracy", "response_time_ms"]
+)
+
+def flatten_prediction(document: dict) -> dict:
+    """One flat export row per prediction document (probabilities become prob_* columns)"""
+    row = {column: document.get(column) for column in EXPORT_COLUMNS}
+    row["_id"] = str(document["_id"])
+    row["user_id"] = str(document["user_id"])
+    probabilities = document.get("probabilities") or {}
+    for name in PROBABILITY_CLASSES:
+        row[f"prob_{name}"] = probabilities.get(name)
+    return row
+
+def _isoformat(value):
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.isoformat()
+
+def _chunks(documents, rows_per_chunk):
+    """Group flattened rows into lists of rows_per_chunk"""
+    chunk = []
+    for document in documents:
+        chunk.append(flatten_prediction(document))
+        if len(chunk) >= rows_per_chunk:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def ndjson_chunks(documents, rows_per_chunk: int = EXPORT_BATCH_SIZE):
+    """Yield NDJSON text, one chunk of rows at a time"""
+    for chunk in _chunks(documents, rows_per_chunk):
+        lines = []
+        for row in chunk:
+            row["created_at"] = _isoformat(row["created_at"])
+            lines.append(json.dumps(row, separators=(',', ':')))
+        yield '\n'.join(lines) + '\n'
+
+def csv_chunks(documents, rows_per_chunk: int = EXPORT_BATCH_SIZE):
+    """Yield CSV text (header first), one chunk of rows at a time"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+    yield buffer.getvalue()
+
+    for chunk in _chunks(documents, rows_per_chunk):
+        buffer.seek(0)
+        buffer.truncate()
+        for row in chunk:
+            row["created_at"] = _isoformat(row["created_at"])
+            writer.writerow(row)
+        yield buffer.getvalue()
+
+def parquet_schema():
+    import pyarrow as pa
+
+    fields = [
+        ("_id", pa.string()),
+        ("user_id", pa.string()),
+        ("created_at", pa.timestamp("ms", tz="UTC")),
+        *[(feature, pa.float64()) for feature in STATS_FEATURES],
+        ("risk_level", pa.string()),
+        ("predicted_class", pa.int64()),
+        *[(f"prob_{name}", pa.float64()) for name in PROBABILITY_CLASSES],
+        ("model_version", pa.string()),
+        ("model_accuracy", pa.float64()),
+        ("response_time_ms", pa.float64())
+    ]
+    return pa.schema(fields)
+
+def write_parquet(documents, path: str, rows_per_group: int = EXPORT_BATCH_SIZE) -> int:
+    """Write documents to a Parquet file one row group at a time; returns the row count"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet export requires pyarrow: pip install -r requirements-export.txt")
+
+    schema = parquet_schema()
+    rows = 0
+    with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+        for chunk in _chunks(documents, rows_per_group):
+            for row in chunk:
+                for feature in STATS_FEATURES:
+                    if row[feature] is not None:
+                        row[feature] = float(row[feature])
+            writer.write_table(pa.Table.from_pylist(chunk, schema=schema))
+            rows += len(chunk)
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Export GlucoPredict predictions")
+    parser.add_argument("--format", choices=sorted(EXPORT_FORMATS), default="ndjson", help="Output format")
+    parser.add_argument("--output", default="-", help="Output file ('-' for stdout; Parquet needs a file)")
+    parser.add_argument("--user", help="Only export this user's predictions (default: every user)")
+    parser.add_argument("--batch-size", type=int, default=EXPORT_BATCH_SIZE, help="Cursor batch size")
+    args = parser.parse_args()
+
+    from database import mongodb, prediction_repo
+
+    if args.format == "parquet" and args.output == "-":
+        parser.error("--output is required for Parquet")
+
+    started = time.perf_counter()
+    # Connection messages go to stderr so stdout exports stay clean
+    with contextlib.redirect_stdout(sys.stderr):
+        documents = prediction_repo.iter_predictions(args.user, batch_size=args.batch_size)
+    rows = 0
+
+    def counted(cursor):
+        nonlocal rows
+        for document in cursor:
+            rows += 1
+            yield document
+
+    try:
+        if args.format == "parquet":
+            write_parquet(counted(documents), args.output, args.batch_size)
+        else:
+            chunks = ndjson_chunks if args.format == "ndjson" else csv_chunks
+            out = sys.stdout if args.output == "-" else open(args.output, 'w', encoding='utf-8', newline='')
+            try:
+                for chunk in chunks(counted(documents), args.batch_size):
+                    out.write(chunk)
+            finally:
+                if out is not sys.stdout:
+                    out.close()
+    except Exception as e:
+        print(f"❌ Export failed: {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        documents.close()
+        with contextlib.redirect_stdout(sys.stderr):
+            mongodb.close_connection()
+
+    elapsed = time.perf_counter() - started
+    rate = rows / elapsed if elapsed else 0.0
+    print(f"✅ Exported {rows} predictions as {args.format} in {elapsed:.1f}s ({rate:.0f} rows/s)", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
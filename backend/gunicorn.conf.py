@@ -0,0 +1,61 @@
+"""
+Gunicorn configuration for the GlucoPredict API.
+
+Every setting can be overridden from the environment, e.g.
+WEB_CONCURRENCY=4 GUNICORN_THREADS=8 gunicorn -c gunicorn.conf.py wsgi:app
+"""
+
+import multiprocessing
+import os
+
+bind = [f"0.0.0.0:{os.getenv('PORT', 8000)}"]
+# Internal listener serving /metrics to Prometheus without a token; keep it off the public network
+if os.getenv('METRICS_PORT'):
+    bind.append(f"{os.getenv('METRICS_HOST', '127.0.0.1')}:{os.getenv('METRICS_PORT')}")
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+worker_class = 'gthread'
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 0))
+
+# Import the app (and load the model) in the master so workers share it copy-on-write
+preload_app = True
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', None)
+errorlog = '-'
+
+# /metrics merges every worker's histograms from this directory; start each run
+# empty (this file is read before the app is preloaded)
+metrics_dir = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+if metrics_dir:
+    os.makedirs(metrics_dir, exist_ok=True)
+    for name in os.listdir(metrics_dir):
+        os.remove(os.path.join(metrics_dir, name))
+
+
+def post_fork(server, worker):
+    """Give each worker its own MongoClient; PyMongo clients are not fork-safe"""
+    from database import mongodb
+    mongodb.reset_after_fork()
+
+
+def post_worker_init(worker):
+    """Let `kill -HUP <worker pid>` swap in the registry's active model (gunicorn resets worker signals first)"""
+    from inference import model_manager
+    model_manager.install_signal_handler()
+
+
+def worker_exit(server, worker):
+    """Flush queued prediction writes and unsaved drift counts before the worker goes away"""
+    from main import drift_monitor, prediction_writer
+    prediction_writer.drain()
+    drift_monitor.snapshot()
+
+
+def child_exit(server, worker):
+    """Drop a dead worker's live gauges from the merged /metrics output"""
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,159 @@
+import bcrypt
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+
+load_dotenv()
+
+class HashingPoolFull(Exception):
+    """Raised when the password pool already has max_pending jobs queued or running"""
+
+class PasswordHasher:
+    """Runs bcrypt on a small dedicated thread pool so login bursts cannot occupy every request thread.
+
+    bcrypt releases the GIL while hashing, so `max_workers` caps the CPU cores spent on
+    password work; `max_pending` bounds the queue and sheds load beyond it.
+    """
+
+    def __init__(self, rounds: int = 12, max_workers: int = 2, max_pending: int = 32,
+                 result_timeout: float = 10.0):
+        self.rounds = rounds
+        self.max_workers = max(1, max_workers)
+        self.max_pending = max(self.max_workers, max_pending)
+        self.result_timeout = result_timeout
+
+        self._executor = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._pending = 0
+        self._active = 0
+        self._completed = 0
+        self._rejected = 0
+        self._failed = 0
+        self._rehashed = 0
+        self._max_pending_seen = 0
+        self._queue_wait_total = 0.0
+        self._queue_wait_max = 0.0
+        self._work_total = 0.0
+
+    def _ensure_started(self):
+        """Create the pool lazily, and again in each forked worker process"""
+        if self._pid == os.getpid() and self._executor is not None:
+            return
+        with self._start_lock:
+            if self._pid == os.getpid() and self._executor is not None:
+                return
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="bcrypt")
+            self._pid = os.getpid()
+
+    def _submit(self, fn, *args):
+        """Queue fn on the pool, or raise HashingPoolFull if max_pending jobs are outstanding"""
+        self._ensure_started()
+        with self._stats_lock:
+            if self._pending >= self.max_pending:
+                self._rejected += 1
+                raise HashingPoolFull("Password hashing queue is full")
+            self._pending += 1
+            self._max_pending_seen = max(self._max_pending_seen, self._pending)
+
+        enqueued_at = time.perf_counter()
+
+        def run():
+            started_at = time.perf_counter()
+            with self._stats_lock:
+                self._active += 1
+            try:
+                return fn(*args)
+            except Exception:
+                with self._stats_lock:
+                    self._failed += 1
+                raise
+            finally:
+                finished_at = time.perf_counter()
+                with self._stats_lock:
+                    self._active -= 1
+                    self._pending -= 1
+                    self._completed += 1
+                    wait = started_at - enqueued_at
+                    self._queue_wait_total += wait
+                    self._queue_wait_max = max(self._queue_wait_max, wait)
+                    self._work_total += finished_at - started_at
+
+        try:
+            return self._executor.submit(run)
+        except RuntimeError:
+            with self._stats_lock:
+                self._pending -= 1
+            raise
+
+    def _hash(self, password: str) -> str:
+        salt = bcrypt.gensalt(rounds=self.rounds)
+        return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+
+    @staticmethod
+    def _verify(password: str, password_hash: str) -> bool:
+        return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+
+    def hash(self, password: str) -> str:
+        """Hash a password at the configured cost"""
+        return self._submit(self._hash, password).result(self.result_timeout)
+
+    def verify(self, password: str, password_hash: str) -> bool:
+        """Verify a password against its hash"""
+        return self._submit(self._verify, password, password_hash).result(self.result_timeout)
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        """Whether a stored hash was made with a different cost than the configured one"""
+        try:
+            return int(password_hash.split('$')[2]) != self.rounds
+        except (IndexError, ValueError):
+            return False
+
+    def rehash_in_background(self, password: str, on_hashed):
+        """Hash at the current cost without waiting, then call on_hashed(new_hash); skipped if the pool is full"""
+        def rehash():
+            on_hashed(self._hash(password))
+            with self._stats_lock:
+                self._rehashed += 1
+
+        def report(future):
+            if future.exception() is not None:
+                print(f"Warning: Could not rehash password: {future.exception()}")
+
+        try:
+            self._submit(rehash).add_done_callback(report)
+        except HashingPoolFull:
+            pass  # Retried on a later login
+
+    def stats(self) -> dict:
+        """Pool occupancy, rejections and queue-wait/bcrypt timings"""
+        with self._stats_lock:
+            completed = self._completed
+            return {
+                "rounds": self.rounds,
+                "max_workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "pending": self._pending,
+                "active": self._active,
+                "queue_depth": self._pending - self._active,
+                "max_pending_seen": self._max_pending_seen,
+                "completed": completed,
+                "rejected": self._rejected,
+                "failed": self._failed,
+                "rehashed": self._rehashed,
+                "avg_queue_wait_ms": round(self._queue_wait_total / completed * 1000, 4) if completed else 0.0,
+                "max_queue_wait_ms": round(self._queue_wait_max * 1000, 4),
+                "avg_bcrypt_ms": round(self._work_total / completed * 1000, 4) if completed else 0.0
+            }
+
+def create_password_hasher() -> PasswordHasher:
+    """Build a PasswordHasher configured from environment variables"""
+    return PasswordHasher(
+        rounds=int(os.getenv('BCRYPT_ROUNDS', 12)),
+        max_workers=int(os.getenv('BCRYPT_POOL_SIZE', 2)),
+        max_pending=int(os.getenv('BCRYPT_MAX_PENDING', 32)),
+        result_timeout=float(os.getenv('BCRYPT_TIMEOUT_SECONDS', 10))
+    )
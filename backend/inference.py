@@ -0,0 +1,329 @@
+import hashlib
+import numpy as np
+import os
+import signal
+import threading
+import time
+from dotenv import load_dotenv
+
+from registry import model_registry
+
+load_dotenv()
+
+# Output classes of the model, in probability column order
+CLASS_NAMES = ['normal', 'borderline', 'high']
+
+def file_sha256(*paths) -> str:
+    """Short content hash of one or more artifact files, used as the model version"""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+class NumpyInferenceEngine:
+    """Forward pass of the exported MLP using only NumPy"""
+    backend = 'numpy'
+
+    def __init__(self, artifact_path: str):
+        self.version = file_sha256(artifact_path)
+        with np.load(artifact_path, allow_pickle=False) as artifact:
+            self.precision = str(artifact['precision']) if 'precision' in artifact.files else 'float32'
+            # Variants with the scaler folded into the first layer take raw features
+            self.scaler_folded = 'scaler_mean' not in artifact.files
+            if not self.scaler_folded:
+                self.scaler_mean = artifact['scaler_mean'].astype(np.float32)
+                self.scaler_scale = artifact['scaler_scale'].astype(np.float32)
+            activations = [str(name) for name in artifact['activations']]
+            # Reduced-precision kernels are expanded once here; the forward pass always runs in float32
+            self.layers = [
+                (self._load_kernel(artifact, i), artifact[f'bias_{i}'].astype(np.float32), activation)
+                for i, activation in enumerate(activations)
+            ]
+
+        for _, _, activation in self.layers:
+            if activation not in ('relu', 'softmax', 'linear'):
+                raise ValueError(f"Unsupported activation in artifact: {activation}")
+
+    @staticmethod
+    def _load_kernel(artifact, index: int) -> np.ndarray:
+        kernel = artifact[f'kernel_{index}']
+        if kernel.dtype == np.int8:
+            return kernel.astype(np.float32) * artifact[f'kernel_scale_{index}'].astype(np.float32)
+        return kernel.astype(np.float32)
+
+    def transform(self, features) -> np.ndarray:
+        """Standardize raw features with the training scaler (a no-op when it is folded into the weights)"""
+        if self.scaler_folded:
+            return np.asarray(features, dtype=np.float32)
+        return (np.asarray(features, dtype=np.float32) - self.scaler_mean) / self.scaler_scale
+
+    def predict_proba(self, features) -> np.ndarray:
+        """Return class probabilities for a (n_samples, n_features) matrix of raw features"""
+        return self.predict_scaled(self.transform(features))
+
+    def predict_scaled(self, x) -> np.ndarray:
+        """Forward pass over the output of transform()"""
+        for kernel, bias, activation in self.layers:
+            x = x @ kernel + bias
+            if activation == 'relu':
+                np.maximum(x, 0, out=x)
+            elif activation == 'softmax':
+                x -= x.max(axis=1, keepdims=True)
+                np.exp(x, out=x)
+                x /= x.sum(axis=1, keepdims=True)
+
+        return x
+
+class KerasInferenceEngine:
+    """TensorFlow/Keras model, with the sklearn scaler unless it is folded into the model (optional fallback)"""
+    backend = 'tensorflow'
+    precision = 'float32'
+
+    def __init__(self, model_path: str, scaler_path: str = None):
+        import tensorflow as tf
+        self.model = tf.keras.models.load_model(model_path)
+        # Models exported by Model/export_numpy.py --keras take raw features
+        self.scaler_folded = self.model.name.endswith('_scaler_folded')
+        if self.scaler_folded:
+            self.version = file_sha256(model_path)
+            self.scaler = None
+        else:
+            if scaler_path is None:
+                raise ValueError(f"Keras model '{model_path}' expects scaled features; set SCALER_PATH")
+            import joblib
+            self.version = file_sha256(model_path, scaler_path)
+            self.scaler = joblib.load(scaler_path)
+
+    def transform(self, features) -> np.ndarray:
+        """Standardize raw features with the training scaler (a no-op when it is folded into the model)"""
+        if self.scaler_folded:
+            return np.asarray(features, dtype=np.float32)
+        return self.scaler.transform(np.asarray(features, dtype=np.float64))
+
+    def predict_proba(self, features) -> np.ndarray:
+        """Return class probabilities for a (n_samples, n_features) matrix of raw features"""
+        return self.predict_scaled(self.transform(features))
+
+    def predict_scaled(self, features_scaled) -> np.ndarray:
+        """Forward pass over the output of transform()"""
+        return self.model.predict(features_scaled, batch_size=max(len(features_scaled), 1), verbose=0)
+
+# NumPy artifacts per MODEL_VARIANT (written by Model/export_numpy.py)
+MODEL_VARIANTS = {
+    'float32': 'diabetes_model.npz',
+    'float16': 'diabetes_model.fp16.npz',
+    'int8': 'diabetes_model.int8.npz'
+}
+
+def model_variant() -> str:
+    variant = os.getenv('MODEL_VARIANT', 'float32').lower()
+    if variant not in MODEL_VARIANTS:
+        raise ValueError(f"Unknown MODEL_VARIANT: {variant} (expected one of {', '.join(MODEL_VARIANTS)})")
+    return variant
+
+def artifact_path_for_variant() -> str:
+    """NumPy artifact to serve: MODEL_ARTIFACT_PATH if set, otherwise the MODEL_VARIANT default"""
+    default_path = MODEL_VARIANTS[model_variant()]
+    return os.getenv('MODEL_ARTIFACT_PATH') or default_path
+
+def load_registry_engine(version: str, backend: str):
+    """Engine for a registry version (files verified against the manifest), versioned by its registry id"""
+    model_registry.verify(version)
+    if backend == 'numpy':
+        artifact_path = model_registry.artifact_path(version, MODEL_VARIANTS[model_variant()])
+        if artifact_path is None:
+            raise ValueError(f"Model version {version} has no {model_variant()} artifact")
+        engine = NumpyInferenceEngine(artifact_path)
+    else:
+        model_path = model_registry.artifact_path(version, 'diabetes_model.folded.h5')
+        if model_path is None:
+            model_path = model_registry.artifact_path(version, 'diabetes_model.h5')
+            scaler_path = model_registry.artifact_path(version, 'scaler.pkl')
+            if model_path is None or scaler_path is None:
+                raise ValueError(f"Model version {version} has no Keras model")
+            engine = KerasInferenceEngine(model_path, scaler_path)
+        else:
+            engine = KerasInferenceEngine(model_path)
+    engine.version = version
+    return engine
+
+def load_engine(version: str = None):
+    """Load the configured inference engine, falling back to TensorFlow if the NumPy artifact is missing
+
+    Serves the given registry version, else the registry's active one, else the bundled
+    artifacts; MODEL_ARTIFACT_PATH pins a file and bypasses the registry.
+    """
+    backend = os.getenv('INFERENCE_BACKEND', 'numpy').lower()
+    if backend not in ('numpy', 'tensorflow'):
+        raise ValueError(f"Unknown INFERENCE_BACKEND: {backend}")
+
+    if version is None and not os.getenv('MODEL_ARTIFACT_PATH'):
+        version = model_registry.current_version()
+    if version is not None:
+        return load_registry_engine(version, backend)
+
+    artifact_path = artifact_path_for_variant()
+    model_path = os.getenv('MODEL_PATH', 'diabetes_model.folded.h5')
+    scaler_path = os.getenv('SCALER_PATH', 'scaler.pkl')  # only used by models without the folded scaler
+
+    if backend == 'numpy':
+        if os.path.exists(artifact_path):
+            return NumpyInferenceEngine(artifact_path)
+        print(f"⚠️ NumPy artifact '{artifact_path}' not found, falling back to TensorFlow")
+
+    return KerasInferenceEngine(model_path, scaler_path)
+
+class ModelManager:
+    """Thread-safe owner of the inference engine with eager loading and warm-up"""
+
+    def __init__(self):
+        self._engine = None
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self.load_error = None
+        self.load_time_ms = None
+        self.swaps = 0
+        self.poll_seconds = float(os.getenv('MODEL_REGISTRY_POLL_SECONDS', 5))
+        self._reload_requested = threading.Event()
+        self._failed_version = None
+        self._registry_mtime = None
+        self._watcher_pid = None
+        self._watcher_lock = threading.Lock()
+
+    def load(self):
+        """Load and warm up the engine exactly once, even when called from several threads"""
+        with self._lock:
+            if self._engine is not None:
+                return self._engine
+
+            print("Loading model and scaler...")
+            start_time = time.time()
+            try:
+                engine = load_engine()
+                self._warm_up(engine)
+            except Exception as e:
+                self.load_error = str(e)
+                print(f"❌ Failed to load model: {e}")
+                raise
+
+            self.load_time_ms = round((time.time() - start_time) * 1000, 2)
+            self.load_error = None
+            self._engine = engine
+            self._ready.set()
+            print(f"Model and scaler loaded successfully! (backend: {engine.backend}, {engine.precision}, {self.load_time_ms} ms)")
+            return engine
+
+    def _warm_up(self, engine):
+        """Run dummy inferences so the first real request does not pay one-off setup costs"""
+        dummy = np.zeros((1, 8), dtype=np.float32)
+        engine.predict_proba(dummy)
+        engine.predict_proba(np.repeat(dummy, 8, axis=0))
+
+    def start_background_load(self):
+        """Start loading in a daemon thread so the server can answer /health meanwhile"""
+        def run():
+            try:
+                self.load()
+            except Exception:
+                pass  # load_error is reported by /ready; requests retry the load lazily
+
+        thread = threading.Thread(target=run, name="model-loader", daemon=True)
+        thread.start()
+        return thread
+
+    def get_engine(self):
+        """Return the loaded engine, loading it on demand if startup loading has not finished"""
+        self._ensure_watching()
+        engine = self._engine
+        if engine is None:
+            engine = self.load()
+        return engine
+
+    def reload(self, version: str = None):
+        """Load a version (default: the registry's active one) next to the serving engine and swap it in
+
+        The swap is a single reference assignment: requests that already hold the old
+        engine finish on it, later ones get the new one. On failure the old engine
+        keeps serving and the error is raised.
+        """
+        with self._lock:
+            print(f"Loading model version {version or 'from registry'}...")
+            start_time = time.time()
+            try:
+                engine = load_engine(version)
+                self._warm_up(engine)
+            except Exception as e:
+                print(f"❌ Failed to load model version {version}: {e}")
+                raise
+
+            previous = self._engine
+            self._engine = engine
+            self.load_time_ms = round((time.time() - start_time) * 1000, 2)
+            self.load_error = None
+            self.swaps += 1
+            self._ready.set()
+            print(f"🔄 Swapped model {previous.version if previous else None} -> {engine.version} ({self.load_time_ms} ms)")
+            return engine
+
+    def request_reload(self):
+        """Ask the watcher to re-read the registry now; safe to call from a signal handler"""
+        self._reload_requested.set()
+
+    def install_signal_handler(self, signum=signal.SIGHUP):
+        """Reload the active registry version on `signum` (main thread only)"""
+        signal.signal(signum, lambda received, frame: self.request_reload())
+        self._ensure_watching()
+
+    def _ensure_watching(self):
+        """Start the registry watcher in this process (again after a fork)"""
+        if self._watcher_pid == os.getpid():
+            return
+        with self._watcher_lock:
+            if self._watcher_pid == os.getpid():
+                return
+            thread = threading.Thread(target=self._watch, name="model-watcher", daemon=True)
+            thread.start()
+            self._watcher_pid = os.getpid()
+
+    def _watch(self):
+        """Swap in the registry's active version whenever it changes (polled, or on request_reload)"""
+        timeout = self.poll_seconds if self.poll_seconds > 0 else None
+        while True:
+            requested = self._reload_requested.wait(timeout)
+            self._reload_requested.clear()
+            if os.getenv('MODEL_ARTIFACT_PATH') or self._engine is None:
+                continue
+            # CURRENT is replaced atomically on activation, so an unchanged mtime means an unchanged version
+            mtime = model_registry.current_mtime()
+            if not requested and mtime == self._registry_mtime:
+                continue
+            self._registry_mtime = mtime
+            current = model_registry.current_version()
+            if current is None or current == self.version or current == self._failed_version:
+                continue
+            try:
+                self.reload(current)
+                self._failed_version = None
+            except Exception:
+                self._failed_version = current  # retried once CURRENT changes again
+
+    def is_ready(self) -> bool:
+        """Whether the engine is loaded and warmed up"""
+        return self._ready.is_set()
+
+    @property
+    def backend(self):
+        return self._engine.backend if self._engine is not None else None
+
+    @property
+    def version(self):
+        return self._engine.version if self._engine is not None else None
+
+    @property
+    def precision(self):
+        return self._engine.precision if self._engine is not None else None
+
+# Global instance
+model_manager = ModelManager()
@@ -1,39 +1,126 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 import numpy as np
+import atexit
+import json
 import os
+import signal
+import sys
 from dotenv import load_dotenv
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 
 # Import our custom modules
-from database import user_repo, prediction_repo, mongodb
+from database import user_repo, prediction_repo, shadow_repo, drift_repo, mongodb, pool_stats
+from inference import model_manager, CLASS_NAMES
+from registry import model_registry, ModelVersionNotFound
+from batching import create_batcher
+from cache import create_prediction_cache
+from persistence import create_write_behind_queue
+from shadow import create_shadow_evaluator
+from drift import create_drift_monitor
+from export import EXPORT_FORMATS, EXPORT_BATCH_SIZE, ndjson_chunks, csv_chunks
 from auth import (
     hash_password, verify_password, generate_token, 
-    require_auth, validate_email, validate_password
+    require_auth, require_admin, require_admin_or_internal, optional_auth, validate_email, validate_password,
+    invalidate_user_cache, auth_cache_stats, is_admin, upgrade_password_hash, password_hasher
 )
+from hashing import HashingPoolFull
+from validation import FEATURE_FIELDS, N_FEATURES, ValidationError, parse_features
+import metrics
+from metrics import stage, stats_collector, render_metrics
 
 # Load environment variables
 load_dotenv()
 
 app = Flask(__name__)
+metrics.init_app(app)
 
 # Configure CORS
 cors_origins = os.getenv('CORS_ORIGINS', 'http://localhost:5173').split(',')
 CORS(app, origins=cors_origins)
 
-# Global variables for model and scaler
-model = None
-scaler = None
-
-def load_model():
-    global model, scaler
-    if model is None:
-        print("Loading model and scaler...")
-        import tensorflow as tf
-        import joblib
-        model = tf.keras.models.load_model('diabetes_model.h5')
-        scaler = joblib.load('scaler.pkl')
-        print("Model and scaler loaded successfully!")
+# Batch prediction configuration
+MAX_BATCH_SIZE = int(os.getenv('MAX_BATCH_SIZE', 1000))
+NDJSON_MIMETYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonlines')
+RISK_MESSAGES = {
+    0: "Normal - Low Risk of Diabetes",
+    1: "Borderline/Pre-diabetic - Moderate Risk of Diabetes",
+    2: "High Risk of Diabetes"
+}
+MODEL_ACCURACY = float(os.getenv('MODEL_ACCURACY', 86.4))
+PUBLIC_NOTE = "Sign up to save your prediction history!"
+
+# Per-class parts of a prediction response, built once instead of per request
+RESULT_FRAGMENTS = [
+    {
+        "risk": name,
+        "message": RISK_MESSAGES[index],
+        "predicted_class": index,
+        "model_accuracy": MODEL_ACCURACY
+    }
+    for index, name in enumerate(CLASS_NAMES)
+]
+
+# Load and warm up the model at startup instead of on the first request
+if os.getenv('EAGER_MODEL_LOAD', 'True').lower() == 'true':
+    model_manager.start_background_load()
+
+def run_model(features):
+    """Scale and score a feature matrix, timing each step; returns (probabilities, model version)
+
+    The engine is read once, so a hot swap mid-call never mixes two model versions.
+    """
+    engine = model_manager.get_engine()
+    with stage('scaling'):
+        scaled = engine.transform(features)
+    with stage('inference'):
+        return engine.predict_scaled(scaled), engine.version
+
+def run_model_rows(features):
+    """run_model for the micro-batcher: one (probabilities, model version) pair per row"""
+    prediction_probs, model_version = run_model(features)
+    return [(prediction_prob, model_version) for prediction_prob in prediction_probs]
+
+# Coalesce concurrent single-row predictions into one batched forward pass
+batcher = create_batcher(run_model_rows)
+
+# Repeat inputs (retries, demo presets) skip inference entirely
+prediction_cache = create_prediction_cache()
+
+# Prediction records are persisted off the request path by a background flusher
+prediction_writer = create_write_behind_queue(prediction_repo, user_repo)
+atexit.register(prediction_writer.drain)
+
+# Optional candidate model compared against the serving one on live traffic
+shadow_evaluator = create_shadow_evaluator(shadow_repo, model_manager.get_engine)
+
+# Sliding-window input and predicted-class distributions vs. the training data
+drift_monitor = create_drift_monitor(drift_repo)
+
+# Component counters exported as gauges on /metrics
+stats_collector.register('model', lambda: {
+    "ready": model_manager.is_ready(),
+    "load_time_ms": model_manager.load_time_ms or 0.0,
+    "swaps": model_manager.swaps
+})
+stats_collector.register('micro_batching', batcher.stats)
+stats_collector.register('prediction_cache', prediction_cache.stats)
+stats_collector.register('write_behind', prediction_writer.stats)
+stats_collector.register('shadow', shadow_evaluator.stats)
+stats_collector.register('drift', drift_monitor.stats)
+stats_collector.register('auth_cache', auth_cache_stats)
+stats_collector.register('password_hashing', password_hasher.stats)
+stats_collector.register('mongo_pool', pool_stats.stats)
+
+def predict_single(features):
+    """Predict one feature row through the prediction cache and the micro-batcher; returns (probabilities, model version)"""
+    model_version = model_manager.get_engine().version
+    prediction_prob = prediction_cache.get(features, model_version)
+    if prediction_prob is None:
+        with stage('batch_queue'):
+            prediction_prob, model_version = batcher.submit(features)
+        prediction_cache.set(features, model_version, prediction_prob)
+    return prediction_prob, model_version
 
 @app.route("/")
 def root():
@@ -41,8 +128,10 @@ def root():
         "message": "GlucoPredict API - Version 3.0",
         "features": ["User Authentication", "MongoDB Integration", "Prediction History"],
         "endpoints": {
-            "auth": ["/auth/register", "/auth/login", "/auth/profile"],
-            "predictions": ["/predict", "/predictions", "/predictions/stats"]
+            "auth": ["/auth/register", "/auth/login", "/auth/profile", "/auth/deactivate"],
+            "predictions": ["/predict", "/predict/batch", "/predictions", "/predictions/export", "/predictions/stats"],
+            "admin": ["/admin/models", "/admin/models/activate", "/admin/models/reload", "/admin/shadow/summary",
+                      "/admin/drift"]
         }
     }
 
@@ -62,6 +151,119 @@ def health():
         "timestamp": datetime.now(timezone.utc).isoformat()
     }
 
+@app.route("/inference/stats")
+@require_admin
+def inference_stats():
+    """Micro-batching and prediction cache metrics for tuning throughput against latency"""
+    return jsonify({
+        "model_ready": model_manager.is_ready(),
+        "model_version": model_manager.version,
+        "micro_batching": batcher.stats(),
+        "prediction_cache": prediction_cache.stats(),
+        "write_behind": prediction_writer.stats()
+    }), 200
+
+@app.route("/metrics")
+@require_admin_or_internal
+def prometheus_metrics():
+    """Prometheus scrape endpoint: request/stage latency histograms and component gauges"""
+    body, content_type = render_metrics()
+    return app.response_class(body, content_type=content_type)
+
+@app.route("/ready")
+def ready():
+    """Readiness probe: 503 until the model is loaded and warmed up"""
+    if not model_manager.is_ready():
+        body = {"status": "loading" if model_manager.load_error is None else "error"}
+        if model_manager.load_error:
+            body["error"] = model_manager.load_error
+        return jsonify(body), 503
+
+    return jsonify({
+        "status": "ready",
+        "model_backend": model_manager.backend,
+        "model_precision": model_manager.precision,
+        "model_version": model_manager.version,
+        "model_load_time_ms": model_manager.load_time_ms
+    }), 200
+
+# Model registry administration
+@app.route("/admin/models", methods=["GET"])
+@require_admin
+def list_models():
+    """Registered model versions, the active one and the one this worker serves"""
+    return jsonify({
+        "active": model_registry.current_version(),
+        "loaded": model_manager.version,
+        "versions": model_registry.list_versions()
+    }), 200
+
+@app.route("/admin/models/activate", methods=["POST"])
+@require_admin
+def activate_model():
+    """Make a registered version the active one and swap it into this worker
+
+    Other workers pick it up from the registry within MODEL_REGISTRY_POLL_SECONDS.
+    """
+    data = request.get_json(silent=True) or {}
+    version = data.get('version')
+    if not isinstance(version, str) or not version:
+        return jsonify({"error": "version is required"}), 400
+
+    try:
+        manifest = model_registry.activate(version)
+        model_manager.reload(version)
+    except ModelVersionNotFound as e:
+        return jsonify({"error": str(e)}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print(f"Model activation error: {e}")
+        return jsonify({"error": f"Failed to load model version {version}: {str(e)}"}), 500
+
+    return jsonify({"message": f"Model version {version} activated", "model": manifest}), 200
+
+@app.route("/admin/models/reload", methods=["POST"])
+@require_admin
+def reload_model():
+    """Reload the active registry version into this worker (e.g. after activating it from the CLI)"""
+    try:
+        model_manager.reload()
+    except Exception as e:
+        print(f"Model reload error: {e}")
+        return jsonify({"error": f"Model reload failed: {str(e)}"}), 500
+    return jsonify({"message": "Model reloaded", "model_version": model_manager.version}), 200
+
+@app.route("/admin/shadow/summary", methods=["GET"])
+@require_admin
+def shadow_summary():
+    """Agreement, probability deltas and latency of candidate models vs. the serving one"""
+    try:
+        candidate_version = request.args.get('candidate_version')
+        since = None
+        if request.args.get('hours'):
+            since = datetime.now(timezone.utc) - timedelta(hours=float(request.args['hours']))
+    except ValueError:
+        return jsonify({"error": "hours must be a number"}), 400
+
+    try:
+        reports = shadow_repo.get_summary(candidate_version, since)
+    except Exception as e:
+        print(f"Shadow summary error: {e}")
+        return jsonify({"error": "Failed to build the shadow evaluation summary"}), 500
+
+    return jsonify({"live": shadow_evaluator.stats(), "candidates": reports}), 200
+
+@app.route("/admin/drift", methods=["GET"])
+@require_admin
+def drift_report():
+    """PSI/KS drift of all workers' recent inputs and predicted classes vs. the training data"""
+    try:
+        return jsonify(drift_monitor.report(cluster=True)), 200
+    except Exception as e:
+        print(f"Drift report error: {e}")
+        return jsonify({"error": "Failed to build the drift report"}), 500
+
 # Authentication Routes
 @app.route("/auth/register", methods=["POST"])
 def register():
@@ -109,6 +311,8 @@ def register():
         
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
+    except HashingPoolFull:
+        return jsonify({"error": "Too many sign-ups in progress, please retry"}), 503, {"Retry-After": "1"}
     except Exception as e:
         print(f"Registration error: {e}")
         return jsonify({"error": "Registration failed. Please try again."}), 500
@@ -136,8 +340,11 @@ def login():
         if not user.get('is_active', True):
             return jsonify({"error": "Account is deactivated"}), 401
         
+        upgrade_password_hash(str(user['_id']), password, user['password_hash'])
+        
         # Update last login
         user_repo.update_last_login(str(user['_id']))
+        invalidate_user_cache(user['_id'])
         
         # Generate authentication token
         token = generate_token(str(user['_id']), user['email'])
@@ -153,6 +360,8 @@ def login():
             "token": token
         }), 200
         
+    except HashingPoolFull:
+        return jsonify({"error": "Too many sign-in attempts in progress, please retry"}), 503, {"Retry-After": "1"}
     except Exception as e:
         print(f"Login error: {e}")
         return jsonify({"error": "Login failed. Please try again."}), 500
@@ -161,7 +370,8 @@ def login():
 @require_auth
 def get_profile():
     try:
-        user = request.current_user
+        # Read fresh so counters are not served from the auth cache
+        user = user_repo.get_user_by_id(str(request.current_user['_id'])) or request.current_user
         return jsonify({
             "user": {
                 "id": str(user['_id']),
@@ -175,6 +385,48 @@ def get_profile():
     except Exception as e:
         return jsonify({"error": "Failed to get profile"}), 500
 
+@app.route("/auth/profile", methods=["PUT"])
+@require_auth
+def update_profile():
+    try:
+        data = request.get_json()
+        if not data or 'name' not in data:
+            return jsonify({"error": "Name is required"}), 400
+        
+        user_id = str(request.current_user['_id'])
+        user_repo.update_profile(user_id, str(data['name']))
+        invalidate_user_cache(user_id)
+        
+        return jsonify({"message": "Profile updated successfully"}), 200
+    except Exception as e:
+        print(f"Update profile error: {e}")
+        return jsonify({"error": "Failed to update profile"}), 500
+
+@app.route("/auth/deactivate", methods=["POST"])
+@require_auth
+def deactivate_account():
+    try:
+        user_id = str(request.current_user['_id'])
+        user_repo.set_active(user_id, False)
+        invalidate_user_cache(user_id)
+        
+        return jsonify({"message": "Account deactivated"}), 200
+    except Exception as e:
+        print(f"Deactivate account error: {e}")
+        return jsonify({"error": "Failed to deactivate account"}), 500
+
+@app.route("/auth/hashing/stats", methods=["GET"])
+@require_admin
+def get_hashing_stats():
+    """Password hashing pool occupancy, rejections and timings"""
+    return jsonify(password_hasher.stats()), 200
+
+@app.route("/auth/cache/stats", methods=["GET"])
+@require_admin
+def get_auth_cache_stats():
+    """Token/user cache counters, including MongoDB lookups saved per minute"""
+    return jsonify(auth_cache_stats()), 200
+
 # Prediction Routes
 @app.route("/predict", methods=["POST"])
 @require_auth
@@ -183,87 +435,37 @@ def predict_diabetes():
     start_time = time.time()
 
     try:
-        data = request.get_json()
+        data = request.get_json(silent=True)
         user = request.current_user
 
-        # Validate required fields
-        required_fields = ["pregnancies", "glucose", "bloodPressure", "skinThickness", "insulin", "bmi", "diabetesPedigree", "age"]
-        for field in required_fields:
-            if field not in data:
-                return jsonify({"error": f"Missing field: {field}"}), 400
-
-        # Load model if not already loaded
-        load_model()
-
-        # Convert to the order expected by the model
-        features = [
-            float(data["pregnancies"]),
-            float(data["glucose"]),
-            float(data["bloodPressure"]),
-            float(data["skinThickness"]),
-            float(data["insulin"]),
-            float(data["bmi"]),
-            float(data["diabetesPedigree"]),
-            float(data["age"])
-        ]
-
-        # Scale the features
-        features_scaled = scaler.transform([features])
-
-        # Make prediction
-        prediction_prob = model.predict(features_scaled, verbose=0)[0]
-        prediction_class = int(np.argmax(prediction_prob))
-
-        # Calculate response time
-        response_time = time.time() - start_time
-
-        # Determine risk level based on 3-class prediction
-        class_names = ['normal', 'borderline', 'high']
-        risk_messages = {
-            0: "Normal - Low Risk of Diabetes",
-            1: "Borderline/Pre-diabetic - Moderate Risk of Diabetes",
-            2: "High Risk of Diabetes"
-        }
-
-        risk = class_names[prediction_class]
-        message = risk_messages[prediction_class]
+        try:
+            with stage('validation'):
+                features = parse_features(data)
+        except ValidationError as e:
+            return jsonify(e.to_dict()), 400
 
-        # Format probabilities
-        probabilities = {
-            "normal": float(prediction_prob[0]),
-            "borderline": float(prediction_prob[1]),
-            "high": float(prediction_prob[2])
-        }
+        # Scale the features and make prediction (cached, micro-batched with concurrent requests)
+        prediction_prob, model_version = shadow_evaluator.predict(features, predict_single)
 
         # Prepare prediction result
-        prediction_result = {
-            "risk": risk,
-            "message": message,
-            "probabilities": probabilities,
-            "predicted_class": prediction_class,
-            "model_accuracy": float(os.getenv('MODEL_ACCURACY', 86.4)),
-            "response_time_ms": round(response_time * 1000, 2)
-        }
+        prediction_result = build_prediction_result(prediction_prob, model_version)
+        drift_monitor.observe(features, prediction_result["predicted_class"])
+        prediction_result["response_time_ms"] = round((time.time() - start_time) * 1000, 2)
 
-        # Save prediction to database
+        # Queue prediction for write-behind persistence (the ID is assigned up front)
         try:
-            prediction_data = {**data, **prediction_result}
-            saved_prediction = prediction_repo.create_prediction(
-                str(user['_id']), 
-                prediction_data
-            )
-            
-            # Update user's prediction count
-            user_repo.increment_prediction_count(str(user['_id']))
+            prediction_data = {**dict(zip(FEATURE_FIELDS, map(float, features))), **prediction_result}
+            prediction_id = prediction_writer.enqueue(str(user['_id']), prediction_data)
             
             # Add prediction ID to response
-            prediction_result['prediction_id'] = str(saved_prediction['_id'])
+            prediction_result['prediction_id'] = str(prediction_id)
             
         except Exception as db_error:
             print(f"Failed to save prediction to database: {db_error}")
             # Continue without failing the prediction
 
-        return jsonify(prediction_result)
+        with stage('serialization'):
+            return jsonify(prediction_result)
 
     except Exception as e:
         print(f"Prediction error: {e}")
@@ -278,25 +480,78 @@ def get_predictions():
         # Get query parameters
         limit = min(int(request.args.get('limit', 20)), 100)  # Max 100 records
         skip = int(request.args.get('skip', 0))
+        cursor = request.args.get('cursor')
+        fields = request.args.get('fields', 'full')
         
-        # Get user's predictions
-        predictions = prediction_repo.get_user_predictions(
-            str(user['_id']), 
-            limit=limit, 
-            skip=skip
-        )
+        if skip > 0 and not cursor:
+            # Legacy offset paging; cost grows with skip, prefer cursor
+            predictions = prediction_repo.get_user_predictions(
+                str(user['_id']), 
+                limit=limit, 
+                skip=skip
+            )
+            return jsonify({
+                "predictions": predictions,
+                "count": len(predictions),
+                "limit": limit,
+                "skip": skip
+            }), 200
+        
+        # Keyset paging: each page is an index seek from the last row seen
+        try:
+            predictions, next_cursor = prediction_repo.get_user_predictions_page(
+                str(user['_id']),
+                limit=limit,
+                cursor=cursor,
+                fields=fields
+            )
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         
         return jsonify({
             "predictions": predictions,
             "count": len(predictions),
             "limit": limit,
-            "skip": skip
+            "skip": 0,
+            "next_cursor": next_cursor
         }), 200
         
     except Exception as e:
         print(f"Get predictions error: {e}")
         return jsonify({"error": "Failed to fetch predictions"}), 500
 
+@app.route("/predictions/export", methods=["GET"])
+@require_auth
+def export_predictions():
+    """Stream prediction history as NDJSON or CSV; admins may pass scope=all"""
+    user = request.current_user
+    export_format = request.args.get('format', 'ndjson')
+    scope = request.args.get('scope', 'mine')
+    
+    if export_format not in ('ndjson', 'csv'):
+        return jsonify({"error": "format must be ndjson or csv (use export.py for Parquet)"}), 400
+    if scope not in ('mine', 'all'):
+        return jsonify({"error": "scope must be mine or all"}), 400
+    if scope == 'all' and not is_admin(user):
+        return jsonify({"error": "Admin access required"}), 403
+    
+    user_id = None if scope == 'all' else str(user['_id'])
+    chunks = ndjson_chunks if export_format == 'ndjson' else csv_chunks
+    
+    def generate():
+        cursor = prediction_repo.iter_predictions(user_id, batch_size=EXPORT_BATCH_SIZE)
+        try:
+            yield from chunks(cursor, EXPORT_BATCH_SIZE)
+        finally:
+            cursor.close()
+    
+    filename = f"predictions-{scope}-{datetime.now(timezone.utc):%Y%m%d}.{export_format}"
+    return Response(
+        stream_with_context(generate()),
+        mimetype=EXPORT_FORMATS[export_format],
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
 @app.route("/predictions/stats", methods=["GET"])
 @require_auth
 def get_prediction_stats():
@@ -318,71 +573,154 @@ def predict_diabetes_public():
     start_time = time.time()
 
     try:
-        data = request.get_json()
+        data = request.get_json(silent=True)
 
-        # Validate required fields
-        required_fields = ["pregnancies", "glucose", "bloodPressure", "skinThickness", "insulin", "bmi", "diabetesPedigree", "age"]
-        for field in required_fields:
-            if field not in data:
-                return jsonify({"error": f"Missing field: {field}"}), 400
-
-        # Load model if not already loaded
-        load_model()
-
-        # Convert to the order expected by the model
-        features = [
-            float(data["pregnancies"]),
-            float(data["glucose"]),
-            float(data["bloodPressure"]),
-            float(data["skinThickness"]),
-            float(data["insulin"]),
-            float(data["bmi"]),
-            float(data["diabetesPedigree"]),
-            float(data["age"])
-        ]
-
-        # Scale the features
-        features_scaled = scaler.transform([features])
-
-        # Make prediction
-        prediction_prob = model.predict(features_scaled, verbose=0)[0]
-        prediction_class = int(np.argmax(prediction_prob))
-
-        # Calculate response time
-        response_time = time.time() - start_time
-
-        # Determine risk level based on 3-class prediction
-        class_names = ['normal', 'borderline', 'high']
-        risk_messages = {
-            0: "Normal - Low Risk of Diabetes",
-            1: "Borderline/Pre-diabetic - Moderate Risk of Diabetes",
-            2: "High Risk of Diabetes"
-        }
+        try:
+            with stage('validation'):
+                features = parse_features(data)
+        except ValidationError as e:
+            return jsonify(e.to_dict()), 400
 
-        risk = class_names[prediction_class]
-        message = risk_messages[prediction_class]
+        # Scale the features and make prediction (cached, micro-batched with concurrent requests)
+        prediction_prob, model_version = shadow_evaluator.predict(features, predict_single)
 
-        # Format probabilities
-        probabilities = {
-            "normal": float(prediction_prob[0]),
-            "borderline": float(prediction_prob[1]),
-            "high": float(prediction_prob[2])
-        }
+        prediction_result = build_prediction_result(prediction_prob, model_version)
+        drift_monitor.observe(features, prediction_result["predicted_class"])
+        prediction_result["response_time_ms"] = round((time.time() - start_time) * 1000, 2)
+        prediction_result["note"] = PUBLIC_NOTE
 
-        return jsonify({
-            "risk": risk,
-            "message": message,
-            "probabilities": probabilities,
-            "predicted_class": prediction_class,
-            "model_accuracy": float(os.getenv('MODEL_ACCURACY', 86.4)),
-            "response_time_ms": round(response_time * 1000, 2),
-            "note": "Sign up to save your prediction history!"
-        })
+        with stage('serialization'):
+            return jsonify(prediction_result)
 
     except Exception as e:
         print(f"Public prediction error: {e}")
         return jsonify({"error": f"Prediction failed: {str(e)}"}), 500
 
+# Batch prediction endpoint (authentication optional)
+def read_batch_records():
+    """Read patient records from a JSON array body or an NDJSON stream"""
+    records = []
+    parse_errors = {}
+
+    if request.mimetype in NDJSON_MIMETYPES:
+        for line in request.stream:
+            line = line.strip()
+            if not line:
+                continue
+            if len(records) >= MAX_BATCH_SIZE:
+                raise OverflowError(f"Batch exceeds the maximum of {MAX_BATCH_SIZE} records")
+            try:
+                records.append(json.loads(line))
+            except ValueError as e:
+                parse_errors[len(records)] = f"Invalid JSON: {e}"
+                records.append(None)
+        return records, parse_errors
+
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get('records')
+    if not isinstance(data, list):
+        raise ValueError("Request body must be a JSON array of patient records or an object with a 'records' array")
+    if len(data) > MAX_BATCH_SIZE:
+        raise OverflowError(f"Batch exceeds the maximum of {MAX_BATCH_SIZE} records")
+    return data, parse_errors
+
+def build_feature_matrix(records, errors):
+    """Validate all records into one feature matrix, recording per-row errors in place"""
+    matrix = np.zeros((len(records), N_FEATURES), dtype=np.float32)
+
+    for index, record in enumerate(records):
+        if index in errors:
+            continue
+        if not isinstance(record, dict):
+            errors[index] = "Record must be a JSON object"
+            continue
+        try:
+            parse_features(record, out=matrix[index])
+        except ValidationError as e:
+            errors[index] = str(e)
+
+    valid_rows = np.array([index not in errors for index in range(len(records))], dtype=bool)
+    return matrix, valid_rows
+
+def build_prediction_result(prediction_prob, model_version):
+    """Build the API response body for one row of class probabilities"""
+    prediction_class = int(np.argmax(prediction_prob))
+    return {
+        **RESULT_FRAGMENTS[prediction_class],
+        "probabilities": dict(zip(CLASS_NAMES, prediction_prob.tolist())),
+        "model_version": model_version
+    }
+
+@app.route("/predict/batch", methods=["POST"])
+@optional_auth
+def predict_diabetes_batch():
+    """Score many patient records with a single vectorized forward pass"""
+    import time
+    start_time = time.time()
+
+    try:
+        try:
+            records, errors = read_batch_records()
+        except OverflowError as e:
+            return jsonify({"error": str(e)}), 413
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        if not records:
+            return jsonify({"error": "Batch must contain at least one record"}), 400
+
+        with stage('validation'):
+            matrix, valid_rows = build_feature_matrix(records, errors)
+            valid_indices = np.flatnonzero(valid_rows)
+
+        results = [None] * len(records)
+        if len(valid_indices):
+            # Scale and predict every valid row in a single vectorized call
+            # (waits for startup loading if still in progress)
+            prediction_probs, model_version = run_model(matrix[valid_indices])
+            drift_monitor.observe_many(matrix[valid_indices], prediction_probs.argmax(axis=1))
+
+            response_time_ms = round((time.time() - start_time) * 1000, 2)
+            for index, prediction_prob in zip(valid_indices, prediction_probs):
+                results[index] = {
+                    "index": int(index),
+                    **build_prediction_result(prediction_prob, model_version),
+                    "response_time_ms": response_time_ms
+                }
+
+        for index, message in errors.items():
+            results[index] = {"index": index, "error": message}
+
+        # Queue successful rows of authenticated users for one bulk insert and one $inc
+        user = request.current_user
+        if user and len(valid_indices):
+            try:
+                prediction_ids = prediction_writer.enqueue_many(
+                    str(user['_id']),
+                    [{**dict(zip(FEATURE_FIELDS, map(float, matrix[index]))), **results[index]} for index in valid_indices]
+                )
+
+                for index, prediction_id in zip(valid_indices, prediction_ids):
+                    results[index]['prediction_id'] = str(prediction_id)
+
+            except Exception as db_error:
+                print(f"Failed to save batch predictions to database: {db_error}")
+                # Continue without failing the prediction
+
+        with stage('serialization'):
+            return jsonify({
+                "results": results,
+                "count": len(records),
+                "succeeded": int(len(valid_indices)),
+                "failed": len(errors),
+                "response_time_ms": round((time.time() - start_time) * 1000, 2)
+            })
+
+    except Exception as e:
+        print(f"Batch prediction error: {e}")
+        return jsonify({"error": f"Batch prediction failed: {str(e)}"}), 500
+
 # Error handlers
 @app.errorhandler(404)
 def not_found(error):
@@ -399,6 +737,11 @@ def close_db(error):
         print(f"App context error: {error}")
 
 if __name__ == "__main__":
+    # Turn SIGTERM into a normal exit so the write-behind queue drains via atexit
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    # SIGHUP swaps in the registry's active model version without a restart
+    model_manager.install_signal_handler()
+
     try:
         port = int(os.environ.get("PORT", 8000))
         debug_mode = os.getenv('DEBUG', 'False').lower() == 'true'
@@ -411,6 +754,7 @@ if __name__ == "__main__":
         app.run(host="0.0.0.0", port=port, debug=debug_mode)
     except KeyboardInterrupt:
         print("\n👋 Shutting down gracefully...")
+        prediction_writer.drain()
         mongodb.close_connection()
     except Exception as e:
         print(f"❌ Failed to start server: {e}")
\ No newline at end of file
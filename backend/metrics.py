@@ -0,0 +1,119 @@
+import os
+import time
+from contextlib import contextmanager
+from dotenv import load_dotenv
+from flask import g, has_request_context, request
+from prometheus_client import (
+    CollectorRegistry, Histogram, REGISTRY, CONTENT_TYPE_LATEST, generate_latest
+)
+from prometheus_client.core import GaugeMetricFamily
+
+load_dotenv()
+
+# Request-handling stages timed with `stage()`
+STAGES = (
+    "auth", "user_lookup", "validation", "batch_queue", "scaling", "inference",
+    "mongo_insert", "counter_update", "stats_claim", "stats_update", "mongo_checkout", "serialization"
+)
+
+# Per-stage durations in a Server-Timing response header; off by default, as they
+# tell clients how long auth, user lookups and database writes take
+SERVER_TIMING_ENABLED = os.getenv('SERVER_TIMING_ENABLED', 'False').lower() == 'true'
+
+# Seconds; stages range from microseconds (cache hits) to database round trips
+STAGE_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+REQUEST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+STAGE_SECONDS = Histogram(
+    'glucopredict_stage_duration_seconds', 'Time spent in each request-handling stage',
+    ['stage'], buckets=STAGE_BUCKETS
+)
+for _name in STAGES:
+    STAGE_SECONDS.labels(_name)  # export every stage from the first scrape
+
+REQUEST_SECONDS = Histogram(
+    'glucopredict_http_request_duration_seconds', 'End-to-end request latency, including serialization',
+    ['method', 'endpoint', 'status'], buckets=REQUEST_BUCKETS
+)
+
+def observe_stage(name: str, seconds: float):
+    """Record one stage duration, and add it to the current request's stage timings"""
+    STAGE_SECONDS.labels(name).observe(seconds)
+    if has_request_context():
+        timings = g.setdefault('stage_timings', {})
+        timings[name] = timings.get(name, 0.0) + seconds
+
+@contextmanager
+def stage(name: str):
+    """Time the enclosed block as one stage"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(name, time.perf_counter() - started)
+
+class StatsCollector:
+    """Exposes the numeric fields of components' stats() dicts as gauges of this worker process"""
+
+    def __init__(self):
+        self._sources = {}
+
+    def register(self, component: str, stats_fn):
+        self._sources[component] = stats_fn
+
+    def collect(self):
+        for component, stats_fn in self._sources.items():
+            try:
+                stats = stats_fn()
+            except Exception as e:
+                print(f"Warning: Could not collect {component} stats: {e}")
+                continue
+            for key, value in _flatten(stats):
+                name = f"glucopredict_{component}_{key}"
+                yield GaugeMetricFamily(name, f"{component} {key.replace('_', ' ')}", value=value)
+
+def _flatten(stats: dict, prefix: str = ''):
+    """(key, number) pairs of a nested stats dict; non-numeric values are skipped"""
+    for key, value in stats.items():
+        key = f"{prefix}{key}".replace('+', 'plus_').replace('.', '_').replace('-', '_')
+        if isinstance(value, dict):
+            yield from _flatten(value, f"{key}_")
+        elif isinstance(value, bool):
+            yield key, float(value)
+        elif isinstance(value, (int, float)):
+            yield key, float(value)
+
+stats_collector = StatsCollector()
+REGISTRY.register(stats_collector)
+
+def render_metrics():
+    """Prometheus text exposition; merges every gunicorn worker's histograms in multiprocess mode"""
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(stats_collector)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+def init_app(app):
+    """Time every request, reporting per-stage durations in a Server-Timing header if enabled"""
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        started = g.pop('request_started', None)
+        if started is not None:
+            endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+            REQUEST_SECONDS.labels(request.method, endpoint, str(response.status_code)).observe(
+                time.perf_counter() - started
+            )
+        timings = g.get('stage_timings')
+        if timings and SERVER_TIMING_ENABLED:
+            response.headers['Server-Timing'] = ', '.join(
+                f"{name};dur={seconds * 1000:.3f}" for name, seconds in timings.items()
+            )
+        return response
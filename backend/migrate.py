@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+GlucoPredict Database Migrations
+One-off maintenance commands, run at deploy time instead of on every worker start.
+
+Usage:
+    python migrate.py indexes          # create/verify all indexes (idempotent)
+    python migrate.py indexes --list   # show the indexes that currently exist
+    python migrate.py rebuild-stats    # recompute every per-user prediction summary
+    python migrate.py rebuild-stats --user <id>
+"""
+
+import argparse
+import sys
+
+from pymongo import ASCENDING, DESCENDING
+
+from database import mongodb, prediction_repo
+
+# collection -> list of (keys, options)
+INDEXES = {
+    "users": [
+        ([("email", ASCENDING)], {"unique": True}),
+        ([("created_at", ASCENDING)], {}),
+    ],
+    "predictions": [
+        # Serves history pages sorted by (created_at, _id) and per-user $match
+        ([("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)], {}),
+        ([("created_at", ASCENDING)], {}),
+    ],
+    "shadow_evaluations": [
+        # Serves /admin/shadow/summary filtered by candidate and time window
+        ([("candidate_version", ASCENDING), ("created_at", DESCENDING)], {}),
+    ],
+    "drift_snapshots": [
+        # Restores the current window and prunes expired buckets
+        ([("start", ASCENDING)], {}),
+    ],
+}
+
+# Indexes made redundant by a wider one above: collection -> index names
+SUPERSEDED_INDEXES = {
+    "predictions": ["user_id_1_created_at_-1"],
+}
+
+def create_indexes(db):
+    """Create every index in INDEXES (create_index is a no-op for existing ones)"""
+    for collection, indexes in INDEXES.items():
+        for keys, options in indexes:
+            name = db[collection].create_index(keys, **options)
+            print(f"✅ {collection}.{name}")
+
+    for collection, names in SUPERSEDED_INDEXES.items():
+        existing = {index['name'] for index in db[collection].list_indexes()}
+        for name in names:
+            if name in existing:
+                db[collection].drop_index(name)
+                print(f"🗑️ Dropped superseded index {collection}.{name}")
+
+def list_indexes(db):
+    """Print the indexes that exist on each managed collection"""
+    for collection in INDEXES:
+        for index in db[collection].list_indexes():
+            print(f"📇 {collection}.{index['name']}: {dict(index['key'])}")
+
+def main():
+    parser = argparse.ArgumentParser(description="GlucoPredict database migrations")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    indexes_parser = subparsers.add_parser("indexes", help="Create database indexes")
+    indexes_parser.add_argument("--list", action="store_true", help="Only list existing indexes")
+
+    stats_parser = subparsers.add_parser("rebuild-stats", help="Recompute per-user prediction summaries")
+    stats_parser.add_argument("--user", help="Only rebuild this user's summary")
+
+    args = parser.parse_args()
+    db = mongodb.get_db()
+
+    try:
+        if args.command == "indexes":
+            if args.list:
+                list_indexes(db)
+            else:
+                create_indexes(db)
+                print("✅ Database indexes created successfully")
+        elif args.command == "rebuild-stats":
+            if args.user:
+                prediction_repo.rebuild_prediction_stats(args.user)
+                print(f"✅ Rebuilt prediction stats for user {args.user}")
+            else:
+                count = prediction_repo.rebuild_all_prediction_stats()
+                print(f"✅ Rebuilt prediction stats for {count} users")
+    except Exception as e:
+        print(f"❌ Migration failed: {e}")
+        sys.exit(1)
+    finally:
+        mongodb.close_connection()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+import glob
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from bson import ObjectId, json_util
+from dotenv import load_dotenv
+
+from database import build_prediction_document
+
+load_dotenv()
+
+_STOP = object()
+REPLAYING_SUFFIX = '.replaying-'  # spill files being replayed are renamed to <file>.replaying-<pid>
+
+class WriteBehindQueue:
+    """Buffers prediction documents in memory and persists them to MongoDB from a background thread.
+
+    Documents get a client-generated ObjectId when queued, so the API can respond
+    immediately. The flusher groups them into insert_many batches and coalesces the
+    per-user prediction_count increments into one bulk $inc write. When MongoDB is
+    unreachable (or the queue is full) documents are appended to NDJSON spill files
+    and replayed later; replays are idempotent because the _ids are already fixed.
+    """
+
+    def __init__(self, prediction_repo, user_repo, max_pending: int = 10000, batch_size: int = 500,
+                 flush_interval: float = 0.5, spill_dir: str = 'spill', replay_interval: float = 30.0,
+                 enabled: bool = True):
+        self.prediction_repo = prediction_repo
+        self.user_repo = user_repo
+        self.max_pending = max_pending
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.spill_dir = spill_dir
+        self.replay_interval = replay_interval
+        self.enabled = enabled
+
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self._spill_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._last_replay_attempt = 0.0
+
+        self.enqueued = 0
+        self.flushed = 0
+        self.flush_batches = 0
+        self.spilled = 0
+        self.replayed = 0
+        self.failed_flushes = 0
+
+    def _ensure_started(self):
+        """Start the flusher lazily, and again in each forked worker process"""
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            self._queue = queue.Queue(maxsize=self.max_pending)
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+            self._thread.start()
+
+    def enqueue(self, user_id: str, prediction_data: dict) -> ObjectId:
+        """Queue one prediction for persistence and return its pre-assigned _id"""
+        return self.enqueue_many(user_id, [prediction_data])[0]
+
+    def enqueue_many(self, user_id: str, predictions_data: list) -> list:
+        """Queue several predictions for one user and return their pre-assigned _ids"""
+        if not self.enabled:
+            saved = self.prediction_repo.create_predictions(user_id, predictions_data)
+            self.user_repo.increment_prediction_count(user_id, amount=len(saved))
+            return [prediction['_id'] for prediction in saved]
+
+        self._ensure_started()
+        documents = []
+        overflow = []
+        for prediction_data in predictions_data:
+            document = build_prediction_document(user_id, prediction_data)
+            document['_id'] = ObjectId()
+            documents.append(document)
+            try:
+                self._queue.put_nowait(document)
+            except queue.Full:
+                overflow.append(document)
+
+        with self._stats_lock:
+            self.enqueued += len(documents)
+        if overflow:
+            # Keep memory bounded: anything beyond max_pending goes straight to disk
+            self._spill(overflow)
+        return [document['_id'] for document in documents]
+
+    def _collect_batch(self):
+        """Wait up to flush_interval for documents; returns (batch, stop_requested)"""
+        try:
+            first = self._queue.get(timeout=self.flush_interval)
+        except queue.Empty:
+            return [], False
+        if first is _STOP:
+            return [], True
+
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self):
+        while True:
+            batch, stop = self._collect_batch()
+            if batch:
+                self._flush(batch)
+            # Checked every iteration so steady traffic cannot starve replays
+            if time.monotonic() - self._last_replay_attempt >= self.replay_interval:
+                self._replay_spill()
+            if stop:
+                return
+
+    def _persist(self, documents):
+        """Insert documents and apply one coalesced $inc per user for those newly inserted"""
+        inserted = self.prediction_repo.insert_prediction_documents(documents)
+        counts = Counter(str(document['user_id']) for document in inserted)
+        try:
+            self.user_repo.increment_prediction_counts(counts)
+        except Exception as e:
+            print(f"Warning: Could not update prediction counts: {e}")
+        return inserted
+
+    def _flush(self, documents):
+        try:
+            self._persist(documents)
+            with self._stats_lock:
+                self.flushed += len(documents)
+                self.flush_batches += 1
+        except Exception as e:
+            with self._stats_lock:
+                self.failed_flushes += 1
+            print(f"⚠️ Write-behind flush failed, spilling {len(documents)} predictions to disk: {e}")
+            self._spill(documents)
+
+    def _spill(self, documents):
+        """Append documents to this process's NDJSON spill file"""
+        with self._spill_lock:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            path = os.path.join(self.spill_dir, f"predictions-{os.getpid()}.ndjson")
+            with open(path, 'a', encoding='utf-8') as f:
+                for document in documents:
+                    f.write(json_util.dumps(document) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+        with self._stats_lock:
+            self.spilled += len(documents)
+
+    @staticmethod
+    def _owns_spill_file(path) -> bool:
+        """Replay our own spill files, and files written or half-replayed by processes that have exited"""
+        name = os.path.basename(path)
+        if REPLAYING_SUFFIX in name:
+            pid = int(name.rsplit(REPLAYING_SUFFIX, 1)[1])
+        else:
+            pid = int(name[len('predictions-'):-len('.ndjson')])
+        if pid == os.getpid():
+            return True
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return True
+        except OSError:
+            pass
+        return False
+
+    def _replay_spill(self):
+        """Re-insert spilled documents once MongoDB is reachable again"""
+        self._last_replay_attempt = time.monotonic()
+        # Finish files already claimed before claiming new ones under the same name
+        paths = sorted(glob.glob(os.path.join(self.spill_dir, f'predictions-*.ndjson{REPLAYING_SUFFIX}*')))
+        paths += sorted(glob.glob(os.path.join(self.spill_dir, 'predictions-*.ndjson')))
+        for path in paths:
+            if not self._owns_spill_file(path):
+                continue
+
+            # Claim the file so concurrent workers do not replay it too. A claimed file
+            # stays claimed until it is fully replayed: if this process dies first, the
+            # next process finds it by the dead pid in its name
+            claimed = f"{path.split(REPLAYING_SUFFIX)[0]}{REPLAYING_SUFFIX}{os.getpid()}"
+            if path != claimed:
+                with self._spill_lock:
+                    if os.path.exists(claimed):
+                        continue
+                    try:
+                        os.rename(path, claimed)
+                    except OSError:
+                        continue
+
+            try:
+                with open(claimed, encoding='utf-8') as f:
+                    documents = [json_util.loads(line) for line in f if line.strip()]
+                for start in range(0, len(documents), self.batch_size):
+                    self._persist(documents[start:start + self.batch_size])
+                os.remove(claimed)
+                with self._stats_lock:
+                    self.replayed += len(documents)
+                print(f"✅ Replayed {len(documents)} spilled predictions from {os.path.basename(path)}")
+            except Exception as e:
+                # Retried on the next attempt; already-inserted _ids are skipped then
+                print(f"⚠️ Could not replay spilled predictions yet: {e}")
+                return
+
+    def drain(self, timeout: float = 10.0):
+        """Flush everything still queued before shutdown; leftovers are spilled to disk"""
+        if self._pid != os.getpid() or self._thread is None:
+            return
+        if self._thread.is_alive():
+            try:
+                self._queue.put(_STOP, timeout=timeout)
+            except queue.Full:
+                pass
+            self._thread.join(timeout)
+
+        leftovers = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                leftovers.append(item)
+        if leftovers:
+            self._flush(leftovers)
+        self._thread = None
+        print(f"💾 Write-behind queue drained ({self.flushed} flushed, {self.spilled} spilled)")
+
+    def stats(self) -> dict:
+        """Queue depth and flush/spill counters"""
+        with self._stats_lock:
+            return {
+                "enabled": self.enabled,
+                "pending": self._queue.qsize() if self._queue is not None else 0,
+                "max_pending": self.max_pending,
+                "enqueued": self.enqueued,
+                "flushed": self.flushed,
+                "flush_batches": self.flush_batches,
+                "failed_flushes": self.failed_flushes,
+                "spilled": self.spilled,
+                "replayed": self.replayed
+            }
+
+def create_write_behind_queue(prediction_repo, user_repo) -> WriteBehindQueue:
+    """Build a WriteBehindQueue configured from environment variables"""
+    return WriteBehindQueue(
+        prediction_repo,
+        user_repo,
+        max_pending=int(os.getenv('WRITE_BEHIND_MAX_PENDING', 10000)),
+        batch_size=int(os.getenv('WRITE_BEHIND_BATCH_SIZE', 500)),
+        flush_interval=float(os.getenv('WRITE_BEHIND_FLUSH_INTERVAL', 0.5)),
+        spill_dir=os.getenv('WRITE_BEHIND_SPILL_DIR', 'spill'),
+        enabled=os.getenv('WRITE_BEHIND_ENABLED', 'True').lower() == 'true'
+    )
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+GlucoPredict Model Registry
+File-backed store of versioned model artifacts. Each version is an immutable
+directory with the serving artifacts and a manifest (version id, content
+hash, per-file hashes, training metrics, creation time); a CURRENT file names
+the active version. Workers watch CURRENT and hot-swap to a newly activated
+version without restarting.
+
+Layout:
+    registry/
+        CURRENT
+        versions/<version>/manifest.json
+        versions/<version>/diabetes_model.npz, diabetes_model.int8.npz, ...
+
+Usage:
+    python registry.py publish ../Model/diabetes_model*.npz ../Model/diabetes_model.folded.h5 \
+        --metrics metrics.json --activate
+    python registry.py list
+    python registry.py activate 20261017T120000-1a2b3c4d
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+
+load_dotenv()
+
+MANIFEST = "manifest.json"
+
+class ModelVersionNotFound(LookupError):
+    """Raised for a version id that is not in the registry"""
+
+def sha256_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def content_hash(file_hashes: dict) -> str:
+    """Hash over every (file name, file hash) pair, independent of publish order"""
+    digest = hashlib.sha256()
+    for name in sorted(file_hashes):
+        digest.update(f"{name}\0{file_hashes[name]}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+def _write_atomic(path: str, text: str):
+    """Write a small file so readers see either the old or the new content, never a partial one"""
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+class ModelRegistry:
+    """Versioned model artifacts on the local filesystem"""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.versions_dir = os.path.join(root, 'versions')
+        self.current_path = os.path.join(root, 'CURRENT')
+
+    def version_dir(self, version: str) -> str:
+        if not version or os.sep in version or version.startswith('.'):
+            raise ValueError(f"Invalid model version: {version!r}")
+        return os.path.join(self.versions_dir, version)
+
+    def current_version(self):
+        try:
+            with open(self.current_path, encoding='utf-8') as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def current_mtime(self):
+        """Cheap change check for watchers: a stat instead of opening and reading CURRENT"""
+        try:
+            return os.stat(self.current_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def get(self, version: str) -> dict:
+        """Manifest of a version; raises ModelVersionNotFound if it is not registered"""
+        try:
+            with open(os.path.join(self.version_dir(version), MANIFEST), encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise ModelVersionNotFound(f"Unknown model version: {version}")
+
+    def list_versions(self) -> list:
+        """Manifests of every version, newest first"""
+        if not os.path.isdir(self.versions_dir):
+            return []
+        manifests = []
+        for name in os.listdir(self.versions_dir):
+            if name.startswith('.'):
+                continue
+            try:
+                manifests.append(self.get(name))
+            except (ModelVersionNotFound, ValueError):
+                continue
+        return sorted(manifests, key=lambda manifest: manifest["created_at"], reverse=True)
+
+    def publish(self, paths: list, metrics: dict = None, params: dict = None, activate: bool = False) -> dict:
+        """Copy artifacts into a new immutable version; identical content returns the existing version"""
+        if not paths:
+            raise ValueError("Nothing to publish")
+        names = [os.path.basename(path) for path in paths]
+        if len(set(names)) != len(names):
+            raise ValueError("Artifact file names must be unique")
+
+        file_hashes = {os.path.basename(path): sha256_file(path) for path in paths}
+        digest = content_hash(file_hashes)
+        for manifest in self.list_versions():
+            if manifest["content_hash"] == digest:
+                print(f"ℹ️ Artifacts already registered as {manifest['version']}")
+                if activate:
+                    self.activate(manifest["version"])
+                return manifest
+
+        created_at = datetime.now(timezone.utc)
+        version = f"{created_at:%Y%m%dT%H%M%S}-{digest[:8]}"
+        manifest = {
+            "version": version,
+            "content_hash": digest,
+            "files": file_hashes,
+            "metrics": metrics or {},
+            "params": params or {},
+            "created_at": created_at.isoformat()
+        }
+
+        # Stage in a hidden directory and rename, so a version is never visible half-written
+        os.makedirs(self.versions_dir, exist_ok=True)
+        staging = tempfile.mkdtemp(dir=self.versions_dir, prefix='.publish-')
+        try:
+            for path in paths:
+                shutil.copy2(path, os.path.join(staging, os.path.basename(path)))
+            with open(os.path.join(staging, MANIFEST), 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, indent=2)
+            os.rename(staging, self.version_dir(version))
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        print(f"✅ Published model version {version} ({len(paths)} files)")
+        if activate:
+            self.activate(version)
+        return manifest
+
+    def activate(self, version: str) -> dict:
+        """Point CURRENT at a registered version after checking its files"""
+        manifest = self.verify(version)
+        _write_atomic(self.current_path, version + '\n')
+        print(f"✅ Activated model version {version}")
+        return manifest
+
+    def verify(self, version: str) -> dict:
+        """Manifest of a version whose files still match their recorded hashes; raises ValueError otherwise"""
+        manifest = self.get(version)
+        directory = self.version_dir(version)
+        for name, expected in manifest["files"].items():
+            path = os.path.join(directory, name)
+            if not os.path.exists(path) or sha256_file(path) != expected:
+                raise ValueError(f"Model version {version} is corrupt: {name} does not match its hash")
+        return manifest
+
+    def artifact_path(self, version: str, name: str):
+        """Path of one artifact of a version, or None if the version does not include it"""
+        manifest = self.get(version)
+        if name not in manifest["files"]:
+            return None
+        return os.path.join(self.version_dir(version), name)
+
+def create_model_registry() -> ModelRegistry:
+    """Build the registry configured from environment variables"""
+    return ModelRegistry(os.getenv('MODEL_REGISTRY_DIR', 'registry'))
+
+# Global instance
+model_registry = create_model_registry()
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the GlucoPredict model registry")
+    parser.add_argument("--root", default=model_registry.root, help="Registry directory (default: MODEL_REGISTRY_DIR)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    publish = commands.add_parser("publish", help="Register a new model version")
+    publish.add_argument("paths", nargs="+", help="Artifact files (e.g. diabetes_model.npz and its variants)")
+    publish.add_argument("--metrics", help="JSON file of training metrics")
+    publish.add_argument("--params", help="JSON file of hyperparameters")
+    publish.add_argument("--activate", action="store_true", help="Make it the serving version")
+
+    commands.add_parser("list", help="Show registered versions")
+    activate = commands.add_parser("activate", help="Switch the serving version")
+    activate.add_argument("version")
+    args = parser.parse_args()
+
+    registry = ModelRegistry(args.root)
+    try:
+        if args.command == "publish":
+            def read_json(path):
+                if not path:
+                    return None
+                with open(path, encoding='utf-8') as f:
+                    return json.load(f)
+            registry.publish(args.paths, read_json(args.metrics), read_json(args.params), args.activate)
+        elif args.command == "activate":
+            registry.activate(args.version)
+        else:
+            current = registry.current_version()
+            for manifest in registry.list_versions():
+                marker = "*" if manifest["version"] == current else " "
+                metrics = ", ".join(f"{key}={value}" for key, value in manifest["metrics"].items())
+                print(f"{marker} {manifest['version']}  {manifest['created_at']}  {metrics}")
+    except (ModelVersionNotFound, ValueError) as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
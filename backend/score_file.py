@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+GlucoPredict Offline Bulk Scoring
+Scores a CSV or Parquet file of patient records with the same model the API
+serves, streaming fixed-size chunks through a process pool (one engine per
+worker) and writing the input columns plus predictions and probabilities.
+
+Input columns may follow Model/diabetes.csv (Glucose, BloodPressure, ...) or the
+API's field names (glucose, bloodPressure, ...).
+
+Usage:
+    python score_file.py ../Model/diabetes.csv scored.csv
+    python score_file.py patients.parquet scored.parquet --workers 4 --chunk-size 50000
+"""
+
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+from inference import CLASS_NAMES, load_engine
+from validation import FEATURE_FIELDS
+
+load_dotenv()
+
+# Accepted column layouts, in model feature order
+DATASET_COLUMNS = ["Pregnancies", "Glucose", "BloodPressure", "SkinThickness", "Insulin", "BMI", "DiabetesPedigreeFunction", "Age"]
+API_COLUMNS = list(FEATURE_FIELDS)
+
+_engine = None
+
+def _init_worker():
+    """Load the inference engine once per worker process"""
+    global _engine
+    _engine = load_engine()
+
+def _score_matrix(matrix: np.ndarray) -> np.ndarray:
+    """Probabilities for the finite rows of a chunk; rows with missing/invalid values stay NaN"""
+    engine = _engine or load_engine()
+    probabilities = np.full((len(matrix), len(CLASS_NAMES)), np.nan, dtype=np.float32)
+    valid = np.isfinite(matrix).all(axis=1)
+    if valid.any():
+        probabilities[valid] = engine.predict_proba(matrix[valid])
+    return probabilities
+
+def feature_columns(columns) -> list:
+    """Pick the column layout the input file uses"""
+    for layout in (DATASET_COLUMNS, API_COLUMNS):
+        if all(column in columns for column in layout):
+            return layout
+    raise ValueError(
+        f"Input needs the columns {', '.join(DATASET_COLUMNS)} or {', '.join(API_COLUMNS)}"
+    )
+
+def read_chunks(path: str, chunk_size: int):
+    """Yield DataFrames of at most chunk_size rows from a CSV or Parquet file"""
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size)
+
+def to_matrix(chunk: pd.DataFrame, columns: list) -> np.ndarray:
+    """Feature matrix of a chunk; non-numeric values become NaN"""
+    return chunk[columns].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float32)
+
+def add_predictions(chunk: pd.DataFrame, probabilities: np.ndarray) -> pd.DataFrame:
+    """Append predicted class, risk label, probabilities and per-row error to a chunk"""
+    valid = np.isfinite(probabilities).all(axis=1)
+    predicted = np.argmax(np.nan_to_num(probabilities, nan=0.0), axis=1)
+
+    chunk = chunk.copy()
+    chunk["predicted_class"] = pd.Series(predicted, index=chunk.index, dtype="Int64").where(valid)
+    chunk["risk"] = pd.Series(np.take(CLASS_NAMES, predicted), index=chunk.index).where(valid)
+    for i, name in enumerate(CLASS_NAMES):
+        chunk[f"prob_{name}"] = probabilities[:, i]
+    chunk["error"] = np.where(valid, None, "All fields must be finite numbers")
+    return chunk
+
+class ChunkWriter:
+    """Appends scored chunks to a CSV or Parquet output file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.parquet = path.endswith('.parquet')
+        self._parquet_writer = None
+        self._wrote_header = False
+
+    def write(self, chunk: pd.DataFrame):
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if self._parquet_writer is None:
+                self._parquet_writer = pq.ParquetWriter(self.path, table.schema, compression="zstd")
+            self._parquet_writer.write_table(table.cast(self._parquet_writer.schema))
+        else:
+            chunk.to_csv(self.path, mode='a' if self._wrote_header else 'w',
+                         header=not self._wrote_header, index=False)
+            self._wrote_header = True
+
+    def close(self):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+
+def score_file(input_path: str, output_path: str, workers: int = None, chunk_size: int = 20000) -> dict:
+    """Score every row of input_path into output_path; returns row counts and throughput"""
+    workers = workers or os.cpu_count() or 1
+    started = time.perf_counter()
+    rows = failed = 0
+    writer = ChunkWriter(output_path)
+    columns = None
+
+    def finish(chunk, probabilities):
+        nonlocal rows, failed
+        scored = add_predictions(chunk, probabilities)
+        writer.write(scored)
+        rows += len(scored)
+        failed += int(scored["error"].notna().sum())
+
+    try:
+        if workers == 1:
+            _init_worker()
+            for chunk in read_chunks(input_path, chunk_size):
+                columns = columns or feature_columns(chunk.columns)
+                finish(chunk, _score_matrix(to_matrix(chunk, columns)))
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+                # Keep a bounded number of chunks in flight and write them in input order
+                in_flight = deque()
+                for chunk in read_chunks(input_path, chunk_size):
+                    columns = columns or feature_columns(chunk.columns)
+                    in_flight.append((chunk, pool.submit(_score_matrix, to_matrix(chunk, columns))))
+                    if len(in_flight) >= workers * 2:
+                        done_chunk, future = in_flight.popleft()
+                        finish(done_chunk, future.result())
+                while in_flight:
+                    done_chunk, future = in_flight.popleft()
+                    finish(done_chunk, future.result())
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - started
+    return {
+        "rows": rows,
+        "failed": failed,
+        "workers": workers,
+        "seconds": round(elapsed, 3),
+        "rows_per_sec": round(rows / elapsed, 1) if elapsed else 0.0
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a CSV/Parquet file of patient records")
+    parser.add_argument("input", help="Input .csv or .parquet file")
+    parser.add_argument("output", help="Output .csv or .parquet file")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=20000, help="Rows per chunk")
+    parser.add_argument("--artifact", help="Model artifact to use (default: MODEL_ARTIFACT_PATH)")
+    args = parser.parse_args()
+
+    if args.artifact:
+        os.environ['MODEL_ARTIFACT_PATH'] = args.artifact  # inherited by the worker processes
+
+    try:
+        result = score_file(args.input, args.output, args.workers, args.chunk_size)
+    except Exception as e:
+        print(f"❌ Scoring failed: {e}")
+        sys.exit(1)
+
+    print(f"✅ Scored {result['rows']} rows ({result['failed']} invalid) with {result['workers']} workers "
+          f"in {result['seconds']}s: {result['rows_per_sec']} rows/sec")
+
+if __name__ == "__main__":
+    main()
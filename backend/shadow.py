@@ -0,0 +1,234 @@
+"""
+GlucoPredict Shadow / Canary Evaluation
+Compares a candidate model against the serving one on live /predict traffic.
+
+Modes (SHADOW_MODE):
+    off     no candidate (default)
+    shadow  every request is answered by the serving model and its features are
+            mirrored to the candidate on a background thread, so responses do not
+            wait for it
+    canary  CANARY_FRACTION of requests are answered by the candidate; the serving
+            model is then scored on them in the background for comparison
+
+Every compared request becomes one document in the shadow_evaluations collection
+(both predicted classes, agreement, probability deltas, per-row latency of both
+models and the latency the client saw); /admin/shadow/summary aggregates them.
+"""
+
+import os
+import queue
+import random
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SHADOW_MODES = ('off', 'shadow', 'canary')
+
+class ShadowEvaluator:
+    """Routes canary traffic and scores the other model of each request off the request path.
+
+    Comparisons wait in a bounded queue; a background thread scores each batch with
+    one vectorized call per model, so both latencies are measured the same way, and
+    stores the results with one insert_many. When the queue is full comparisons are
+    dropped (and counted) rather than slowing requests down.
+    """
+
+    def __init__(self, repo, primary_engine, load_candidate, mode: str = 'off', canary_fraction: float = 0.05,
+                 max_pending: int = 10000, batch_size: int = 256, flush_interval: float = 0.5):
+        if mode not in SHADOW_MODES:
+            raise ValueError(f"Unknown SHADOW_MODE: {mode} (expected one of {', '.join(SHADOW_MODES)})")
+        self.repo = repo
+        self.primary_engine = primary_engine
+        self.load_candidate = load_candidate
+        self.mode = mode
+        self.canary_fraction = min(max(canary_fraction, 0.0), 1.0)
+        self.max_pending = max_pending
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+
+        self.candidate = None
+        self.load_error = None
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+
+        self.mirrored = 0
+        self.canary_served = 0
+        self.dropped = 0
+        self.evaluated = 0
+        self.failed_batches = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != 'off'
+
+    def _ensure_started(self):
+        """Start the evaluator thread lazily, and again in each forked worker process"""
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            self._queue = queue.Queue(maxsize=self.max_pending)
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="shadow-evaluator", daemon=True)
+            self._thread.start()
+
+    def predict(self, features, predict_primary):
+        """Serve one feature row, from the candidate for a canary fraction of requests; returns (probabilities, model version)
+
+        `predict_primary(features)` is the normal serving path. Until the candidate has
+        loaded in the background, every request is served by it.
+        """
+        if not self.enabled:
+            return predict_primary(features)
+
+        self._ensure_started()
+        started = time.perf_counter()
+        candidate = self.candidate
+        if self.mode == 'canary' and candidate is not None and random.random() < self.canary_fraction:
+            prediction_prob = candidate.predict_proba(features[np.newaxis, :])[0]
+            model_version = candidate.version
+            served_by = 'candidate'
+            with self._stats_lock:
+                self.canary_served += 1
+        else:
+            prediction_prob, model_version = predict_primary(features)
+            served_by = 'primary'
+        served_latency_ms = (time.perf_counter() - started) * 1000
+
+        if candidate is not None:
+            try:
+                self._queue.put_nowait((features, prediction_prob, model_version, served_by, served_latency_ms))
+                mirrored = True
+            except queue.Full:
+                mirrored = False
+            with self._stats_lock:
+                if mirrored:
+                    self.mirrored += 1
+                else:
+                    self.dropped += 1
+        return prediction_prob, model_version
+
+    def _collect_batch(self):
+        """Block for the first comparison, then take whatever else arrives within flush_interval"""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        try:
+            self.candidate = self.load_candidate()
+            print(f"🕶️ Shadow evaluation ({self.mode}) of model version {self.candidate.version} started")
+        except Exception as e:
+            self.load_error = str(e)
+            self.mode = 'off'  # serve normally instead of retrying the load on every request
+            print(f"❌ Failed to load the candidate model, shadow evaluation disabled: {e}")
+            return
+
+        while True:
+            batch = self._collect_batch()
+            try:
+                self.repo.insert_evaluations(self.evaluate(batch))
+                self.evaluated += len(batch)
+            except Exception as e:
+                self.failed_batches += 1
+                print(f"⚠️ Dropped {len(batch)} shadow evaluations: {e}")
+
+    def evaluate(self, batch) -> list:
+        """Score a batch on both models and build one comparison document per request"""
+        features = np.asarray([item[0] for item in batch], dtype=np.float32)
+        primary = self.primary_engine()
+        candidate = self.candidate
+        primary_probs, primary_latency_ms = _timed_predict(primary, features)
+        candidate_probs, candidate_latency_ms = _timed_predict(candidate, features)
+
+        created_at = datetime.now(timezone.utc)
+        documents = []
+        for index, (_, served_prob, served_version, served_by, served_latency_ms) in enumerate(batch):
+            # The served side keeps the probabilities the client actually received
+            if served_by == 'primary':
+                primary_prob, primary_version = served_prob, served_version
+                candidate_prob = candidate_probs[index]
+            else:
+                primary_prob, primary_version = primary_probs[index], primary.version
+                candidate_prob = served_prob
+            primary_class = int(np.argmax(primary_prob))
+            candidate_class = int(np.argmax(candidate_prob))
+            deltas = np.asarray(candidate_prob, dtype=np.float64) - np.asarray(primary_prob, dtype=np.float64)
+            documents.append({
+                "created_at": created_at,
+                "mode": self.mode,
+                "served_by": served_by,
+                "primary_version": primary_version,
+                "candidate_version": candidate.version,
+                "primary_class": primary_class,
+                "candidate_class": candidate_class,
+                "agree": primary_class == candidate_class,
+                "primary_probabilities": [float(p) for p in primary_prob],
+                "candidate_probabilities": [float(p) for p in candidate_prob],
+                "probability_deltas": deltas.round(6).tolist(),
+                "max_abs_delta": float(np.abs(deltas).max()),
+                "primary_latency_ms": primary_latency_ms,
+                "candidate_latency_ms": candidate_latency_ms,
+                "served_latency_ms": round(served_latency_ms, 3)
+            })
+        return documents
+
+    def stats(self) -> dict:
+        """Routing, queue and evaluation counters"""
+        return {
+            "mode": self.mode,
+            "canary_fraction": self.canary_fraction,
+            "candidate_version": self.candidate.version if self.candidate is not None else None,
+            "candidate_loaded": self.candidate is not None,
+            "load_error": self.load_error,
+            "pending": self._queue.qsize() if self._queue is not None else 0,
+            "mirrored": self.mirrored,
+            "canary_served": self.canary_served,
+            "dropped": self.dropped,
+            "evaluated": self.evaluated,
+            "failed_batches": self.failed_batches
+        }
+
+def _timed_predict(engine, features):
+    """Class probabilities of a batch and the per-row share of the call's latency in milliseconds"""
+    started = time.perf_counter()
+    probs = engine.predict_proba(features)
+    return probs, round((time.perf_counter() - started) * 1000 / len(features), 4)
+
+def create_shadow_evaluator(repo, primary_engine) -> ShadowEvaluator:
+    """Build a ShadowEvaluator configured from environment variables
+
+    SHADOW_MODEL_VERSION names the candidate in the model registry.
+    """
+    from inference import load_engine
+
+    mode = os.getenv('SHADOW_MODE', 'off').lower()
+    candidate_version = os.getenv('SHADOW_MODEL_VERSION')
+    if mode != 'off' and not candidate_version:
+        print("⚠️ SHADOW_MODE is set but SHADOW_MODEL_VERSION is not, shadow evaluation disabled")
+        mode = 'off'
+    return ShadowEvaluator(
+        repo,
+        primary_engine,
+        lambda: load_engine(candidate_version),
+        mode=mode,
+        canary_fraction=float(os.getenv('CANARY_FRACTION', 0.05)),
+        max_pending=int(os.getenv('SHADOW_MAX_PENDING', 10000)),
+        batch_size=int(os.getenv('SHADOW_BATCH_SIZE', 256)),
+        flush_interval=float(os.getenv('SHADOW_FLUSH_INTERVAL', 0.5))
+    )
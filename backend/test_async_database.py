@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Async Repository Test Suite
+Runs the same scenarios through the sync (PyMongo) and async (Motor) repositories
+against in-memory MongoDB stand-ins and checks they behave identically, and that
+each event loop's client is closed when the loop shuts down.
+
+Requires: pip install mongomock mongomock-motor
+"""
+
+import asyncio
+import os
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+mongomock = pytest.importorskip('mongomock')
+mongomock_motor = pytest.importorskip('mongomock_motor')
+
+import database
+from database import UserRepository, PredictionRepository
+from async_database import AsyncMongoDB, AsyncUserRepository, AsyncPredictionRepository
+
+SAMPLE_PREDICTION = {
+    "pregnancies": 2,
+    "glucose": 110,
+    "bloodPressure": 75,
+    "skinThickness": 25,
+    "insulin": 80,
+    "bmi": 28.5,
+    "diabetesPedigree": 0.5,
+    "age": 35,
+    "risk": "borderline",
+    "message": "Borderline/Pre-diabetic - Moderate Risk of Diabetes",
+    "probabilities": {"normal": 0.01, "borderline": 0.81, "high": 0.18},
+    "predicted_class": 1,
+    "model_accuracy": 86.4,
+    "response_time_ms": 1.5
+}
+
+def normalize(value):
+    """Replace ids and timestamps so results from both backends can be compared"""
+    if isinstance(value, dict):
+        return {k: normalize(v) for k, v in value.items() if k not in ('_id', 'user_id')}
+    if isinstance(value, list):
+        return [normalize(v) for v in value]
+    if isinstance(value, datetime):
+        return '<datetime>'
+    if isinstance(value, ObjectId):
+        return '<objectid>'
+    return value
+
+@pytest.fixture
+def sync_repos(monkeypatch):
+    """Sync repositories backed by mongomock"""
+    db = mongomock.MongoClient().glucopredict
+    db.users.create_index("email", unique=True)
+    monkeypatch.setattr(database.mongodb, '_db', db)
+    monkeypatch.setattr(database.mongodb, '_pid', os.getpid())
+    return UserRepository(), PredictionRepository()
+
+@pytest.fixture
+def async_repos(monkeypatch):
+    """Async repositories backed by mongomock-motor"""
+    monkeypatch.setenv('MONGODB_URI', 'mongodb://localhost:27017')
+    client = mongomock_motor.AsyncMongoMockClient()
+    mongodb = AsyncMongoDB(client_factory=lambda uri: client)
+
+    async def create_indexes():
+        await mongodb.get_db().users.create_index("email", unique=True)
+
+    asyncio.run(create_indexes())
+    return AsyncUserRepository(mongodb), AsyncPredictionRepository(mongodb)
+
+def user_scenario(users):
+    """Exercise every UserRepository method; `users` methods may be sync or async"""
+    async def call(method, *args):
+        result = getattr(users, method)(*args)
+        return await result if asyncio.iscoroutine(result) else result
+
+    async def run():
+        out = {}
+        user = await call('create_user', 'Test@Example.com ', 'hash', ' Test User ')
+        user_id = str(user['_id'])
+        out['created'] = user
+
+        try:
+            await call('create_user', 'test@example.com', 'hash', 'Other')
+            out['duplicate'] = 'accepted'
+        except ValueError as e:
+            out['duplicate'] = str(e)
+
+        out['by_email_has_hash'] = 'password_hash' in await call('get_user_by_email', 'TEST@example.com')
+        await call('update_last_login', user_id)
+        out['profile_updated'] = await call('update_profile', user_id, ' Renamed ')
+        await call('update_password_hash', user_id, 'rehashed')
+        out['rehashed'] = (await call('get_user_by_email', 'test@example.com'))['password_hash']
+        await call('increment_prediction_count', user_id)
+        await call('increment_prediction_count', user_id, 3)
+        await call('increment_prediction_counts', {user_id: 2})
+        out['deactivated'] = await call('set_active', user_id, False)
+        out['missing_user'] = await call('get_user_by_id', str(ObjectId()))
+
+        stored = await call('get_user_by_id', user_id)
+        out['stored'] = stored
+        out['stored_has_hash'] = 'password_hash' in stored
+        return out
+
+    return run()
+
+def prediction_scenario(predictions, user_id):
+    """Exercise every PredictionRepository method; methods may be sync or async"""
+    async def call(method, *args, **kwargs):
+        result = getattr(predictions, method)(*args, **kwargs)
+        return await result if asyncio.iscoroutine(result) else result
+
+    async def run():
+        out = {}
+        out['single'] = await call('create_prediction', user_id, SAMPLE_PREDICTION)
+        out['many'] = await call('create_predictions', user_id, [
+            {**SAMPLE_PREDICTION, "risk": "normal", "glucose": 90},
+            {**SAMPLE_PREDICTION, "risk": "high", "glucose": 180}
+        ])
+        out['empty'] = await call('create_predictions', user_id, [])
+
+        documents = [predictions._build_prediction_document(user_id, SAMPLE_PREDICTION) for _ in range(3)]
+        for document in documents:
+            document['_id'] = ObjectId()
+        first = await call('insert_prediction_documents', documents[:2])
+        retried = await call('insert_prediction_documents', documents)
+        out['inserted_counts'] = (len(first), len(retried))
+
+        page = await call('get_user_predictions', user_id, limit=2, skip=1)
+        out['page_size'] = len(page)
+        out['history_size'] = len(await call('get_user_predictions', user_id))
+
+        pages, cursor = [], None
+        while True:
+            page, cursor = await call('get_user_predictions_page', user_id, limit=4, cursor=cursor, fields='summary')
+            pages.append(page)
+            if cursor is None:
+                break
+        out['keyset_page_sizes'] = [len(page) for page in pages]
+        out['keyset_unique_ids'] = len({p['_id'] for page in pages for p in page})
+        out['summary_has_probabilities'] = any('probabilities' in p for page in pages for p in page)
+        stats = await call('get_prediction_stats', user_id)
+        out['stats'] = {**stats, "risk_distribution": dict(sorted(stats["risk_distribution"].items()))}
+
+        # Writes after the first read are folded in incrementally, and match a full rebuild
+        await call('create_prediction', user_id, {**SAMPLE_PREDICTION, "risk": "high", "glucose": 200})
+        incremental = await call('get_prediction_stats', user_id)
+        await call('rebuild_prediction_stats', user_id)
+        out['incremental_stats'] = incremental
+        out['rebuilt_stats'] = await call('get_prediction_stats', user_id)
+        return out
+
+    return run()
+
+def test_user_repositories_match(sync_repos, async_repos):
+    """Sync and async user repositories return the same results"""
+    sync_result = asyncio.run(user_scenario(sync_repos[0]))
+    async_result = asyncio.run(user_scenario(async_repos[0]))
+
+    assert sync_result['duplicate'] == "User with this email already exists"
+    assert sync_result['stored']['prediction_count'] == 6
+    assert sync_result['stored']['is_active'] is False
+    assert sync_result['stored_has_hash'] is False
+    assert sync_result['rehashed'] == 'rehashed'
+    assert normalize(async_result) == normalize(sync_result)
+
+def test_prediction_repositories_match(sync_repos, async_repos):
+    """Sync and async prediction repositories return the same results"""
+    user_id = str(ObjectId())
+    sync_result = asyncio.run(prediction_scenario(sync_repos[1], user_id))
+    async_result = asyncio.run(prediction_scenario(async_repos[1], user_id))
+
+    assert sync_result['inserted_counts'] == (2, 1)
+    assert sync_result['history_size'] == 6
+    assert sync_result['keyset_page_sizes'] == [4, 2]
+    assert sync_result['keyset_unique_ids'] == 6
+    assert sync_result['summary_has_probabilities'] is False
+    assert sync_result['stats']['total_predictions'] == 6
+    assert sync_result['stats']['feature_stats']['glucose']['mean'] == round(710 / 6, 4)
+    assert sync_result['incremental_stats']['total_predictions'] == 7
+    assert sync_result['incremental_stats']['recent_trend']['risk_levels'][-1] == 'high'
+    assert normalize(sync_result['incremental_stats']) == normalize(sync_result['rebuilt_stats'])
+    assert normalize(async_result) == normalize(sync_result)
+
+def test_history_cursor_round_trip():
+    """Cursors decode to the position they were built from and reject garbage"""
+    prediction = {"_id": ObjectId(), "created_at": datetime(2024, 5, 1, 12, 30, 15, 123000)}
+    created_at, last_id = database.decode_cursor(database.encode_cursor(prediction))
+    assert last_id == prediction["_id"]
+    assert created_at.replace(tzinfo=None) == prediction["created_at"]
+
+    with pytest.raises(ValueError):
+        database.decode_cursor("not-a-cursor")
+
+def test_async_writes_run_concurrently(async_repos):
+    """Many awaited writes can be gathered on one event loop"""
+    _, predictions = async_repos
+    user_id = str(ObjectId())
+
+    async def run():
+        await asyncio.gather(*(
+            predictions.create_prediction(user_id, SAMPLE_PREDICTION) for _ in range(25)
+        ))
+        return await predictions.get_prediction_stats(user_id)
+
+    assert asyncio.run(run())['total_predictions'] == 25
+
+class ClosableClient:
+    """Motor client stand-in recording whether it was closed"""
+
+    def __init__(self):
+        self.closed = False
+
+    def __getitem__(self, name):
+        return mongomock_motor.AsyncMongoMockClient()[name]
+
+    def close(self):
+        self.closed = True
+
+@pytest.fixture
+def lifecycle(monkeypatch):
+    """An AsyncMongoDB creating ClosableClients, and the list of clients it created"""
+    monkeypatch.setenv('MONGODB_URI', 'mongodb://localhost:27017')
+    clients = []
+
+    def factory(uri):
+        clients.append(ClosableClient())
+        return clients[-1]
+
+    return AsyncMongoDB(client_factory=factory), clients
+
+def test_one_client_per_loop_closed_on_shutdown(lifecycle):
+    """Each loop gets one client, reused across calls, and run() closes it as the loop finishes"""
+    mongodb, clients = lifecycle
+
+    async def use_twice():
+        mongodb.get_db()
+        mongodb.get_db()
+
+    mongodb.run(use_twice())
+    mongodb.run(use_twice())
+    assert len(clients) == 2
+    assert all(client.closed for client in clients)
+    assert mongodb.open_clients() == 0
+
+def test_clients_of_closed_loops_are_reclaimed(lifecycle):
+    """A loop closed without close_loop() has its client closed when the next client is created"""
+    mongodb, clients = lifecycle
+
+    async def use():
+        mongodb.get_db()
+
+    asyncio.run(use())
+    assert mongodb.open_clients() == 1 and not clients[0].closed
+
+    asyncio.run(use())
+    assert clients[0].closed and not clients[1].closed
+    assert mongodb.open_clients() == 1
+    mongodb.close_connection()
+    assert clients[1].closed and mongodb.open_clients() == 0
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-v"]))
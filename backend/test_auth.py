@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Auth Test
+Checks the per-process token and user caches (hits, invalidation, TTL expiry)
+and access to the metrics endpoint, with an in-memory user repository
+"""
+
+import pytest
+from bson import ObjectId
+from flask import Flask
+
+import auth
+import cache
+from cache import LRUCache
+
+class FakeUserRepository:
+    """users collection stand-in counting lookups"""
+
+    def __init__(self):
+        self.users = {}
+        self.lookups = 0
+
+    def get_user_by_id(self, user_id):
+        self.lookups += 1
+        user = self.users.get(user_id)
+        return dict(user) if user else None
+
+@pytest.fixture
+def users(monkeypatch):
+    repo = FakeUserRepository()
+    monkeypatch.setattr(auth, 'user_repo', repo)
+    monkeypatch.setattr(auth, 'AUTH_CACHE_ENABLED', True)
+    monkeypatch.setattr(auth, 'token_cache', LRUCache(ttl_seconds=60))
+    monkeypatch.setattr(auth, 'user_cache', LRUCache(ttl_seconds=10))
+    return repo
+
+def add_user(repo):
+    user_id = str(ObjectId())
+    repo.users[user_id] = {"_id": ObjectId(user_id), "email": "cache@example.com", "is_active": True}
+    return user_id, auth.generate_token(user_id, "cache@example.com")
+
+def test_repeated_requests_hit_the_cache(users):
+    """Only the first authentication of a token reads the user from MongoDB"""
+    user_id, token = add_user(users)
+    for _ in range(3):
+        user, error = auth.authenticate_token(token)
+        assert error is None and str(user["_id"]) == user_id
+
+    assert users.lookups == 1
+    assert auth.token_cache.stats()["hits"] == 2
+    assert auth.user_cache.stats()["hits"] == 2
+
+def test_cached_user_is_a_copy(users):
+    """Callers mutating the returned document do not change the cached one"""
+    user_id, _ = add_user(users)
+    auth.get_cached_user(user_id)["is_active"] = False
+    assert auth.get_cached_user(user_id)["is_active"] is True
+
+def test_invalidation_rereads_the_user(users):
+    """After invalidate_user_cache a deactivation is seen on the next request"""
+    user_id, token = add_user(users)
+    auth.authenticate_token(token)
+    users.users[user_id]["is_active"] = False
+    assert auth.authenticate_token(token)[1] is None  # still cached
+
+    auth.invalidate_user_cache(ObjectId(user_id))
+    assert auth.authenticate_token(token) == (None, 'Account is deactivated')
+    assert users.lookups == 2
+
+def test_other_processes_see_deactivation_after_the_ttl(users, monkeypatch):
+    """Without an invalidation the cached user is re-read once the user-cache TTL passes"""
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, 'monotonic', lambda: now[0])
+    user_id, token = add_user(users)
+    auth.authenticate_token(token)
+    users.users[user_id]["is_active"] = False
+
+    now[0] += 11
+    assert auth.authenticate_token(token) == (None, 'Account is deactivated')
+
+def test_metrics_need_admin_outside_the_internal_port(users, monkeypatch):
+    """Scrape endpoints are tokenless only on METRICS_PORT; elsewhere they need an admin token"""
+    monkeypatch.setattr(auth, 'METRICS_PORT', '9100')
+    monkeypatch.setattr(auth, 'ADMIN_EMAILS', {"admin@example.com"})
+    app = Flask(__name__)
+    app.route("/metrics")(auth.require_admin_or_internal(lambda: "scraped"))
+    client = app.test_client()
+
+    assert client.get("/metrics", base_url="http://localhost:9100").status_code == 200
+    assert client.get("/metrics", base_url="http://localhost:8000").status_code == 401
+
+    user_id, token = add_user(users)
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.get("/metrics", headers=headers).status_code == 403
+    users.users[user_id]["email"] = "admin@example.com"
+    auth.invalidate_user_cache(user_id)
+    assert client.get("/metrics", headers=headers).status_code == 200
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-v"]))
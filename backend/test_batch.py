@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Batch Prediction Endpoint Test
+Checks /predict/batch through the Flask test client: JSON array and NDJSON
+bodies, per-row validation errors, the batch size limit and bulk persistence,
+with an in-memory MongoDB stand-in
+"""
+
+import json
+import os
+
+import pytest
+from bson import ObjectId
+
+mongomock = pytest.importorskip('mongomock')
+
+import database
+
+PATIENT = {
+    "pregnancies": 2, "glucose": 120, "bloodPressure": 70, "skinThickness": 20,
+    "insulin": 79, "bmi": 25.0, "diabetesPedigree": 0.5, "age": 33
+}
+
+class RecordingWriter:
+    """prediction_writer stand-in recording each enqueue_many call"""
+
+    def __init__(self):
+        self.calls = []
+
+    def enqueue_many(self, user_id, predictions_data):
+        self.calls.append((user_id, predictions_data))
+        return [ObjectId() for _ in predictions_data]
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setattr(database.mongodb, '_db', mongomock.MongoClient().glucopredict)
+    monkeypatch.setattr(database.mongodb, '_pid', os.getpid())
+    import main
+    monkeypatch.setattr(main, 'prediction_writer', RecordingWriter())
+    monkeypatch.setattr(main.drift_monitor, 'enabled', False)
+    return main
+
+@pytest.fixture
+def client(app):
+    return app.app.test_client()
+
+def auth_headers(client):
+    response = client.post('/auth/register', json={
+        "email": f"{ObjectId()}@example.com", "password": "testpassword123", "name": "Batch Tester"
+    })
+    return {"Authorization": f"Bearer {response.get_json()['token']}"}
+
+def test_json_array_and_ndjson_bodies_agree(client):
+    """The same records give the same predictions as a JSON array and as NDJSON"""
+    records = [PATIENT, {**PATIENT, "glucose": 180}]
+    from_json = client.post('/predict/batch', json=records).get_json()
+    from_ndjson = client.post(
+        '/predict/batch',
+        data='\n'.join(json.dumps(record) for record in records) + '\n',
+        content_type='application/x-ndjson'
+    ).get_json()
+
+    assert from_json["succeeded"] == from_ndjson["succeeded"] == 2
+    for json_result, ndjson_result in zip(from_json["results"], from_ndjson["results"]):
+        assert json_result["index"] == ndjson_result["index"]
+        assert json_result["risk"] == ndjson_result["risk"]
+        assert json_result["probabilities"] == pytest.approx(ndjson_result["probabilities"])
+
+def test_invalid_rows_are_reported_next_to_valid_ones(client):
+    """Invalid records get a per-row error and do not fail the rest of the batch"""
+    response = client.post(
+        '/predict/batch',
+        data='\n'.join([json.dumps(PATIENT), '{not json', json.dumps({**PATIENT, "glucose": 5}), '[1, 2]']),
+        content_type='application/x-ndjson'
+    )
+    body = response.get_json()
+
+    assert response.status_code == 200
+    assert (body["count"], body["succeeded"], body["failed"]) == (4, 1, 3)
+    assert "risk" in body["results"][0]
+    assert body["results"][1]["error"].startswith("Invalid JSON")
+    assert "glucose" in body["results"][2]["error"]
+    assert body["results"][3]["error"] == "Record must be a JSON object"
+
+def test_oversize_batch_is_rejected(client, app, monkeypatch):
+    """Batches above MAX_BATCH_SIZE get 413 for both body formats"""
+    monkeypatch.setattr(app, 'MAX_BATCH_SIZE', 3)
+    records = [PATIENT] * 4
+
+    assert client.post('/predict/batch', json=records).status_code == 413
+    response = client.post('/predict/batch', data='\n'.join(json.dumps(r) for r in records),
+                           content_type='application/x-ndjson')
+    assert response.status_code == 413
+
+def test_valid_rows_are_persisted_in_one_call(client, app):
+    """An authenticated batch queues only its valid rows, with their parsed values, in a single call"""
+    headers = auth_headers(client)
+    records = [PATIENT, {**PATIENT, "age": "200"}, {**PATIENT, "pregnancies": "3"}]
+    body = client.post('/predict/batch', json=records, headers=headers).get_json()
+
+    writer = app.prediction_writer
+    assert len(writer.calls) == 1
+    _, saved = writer.calls[0]
+    assert [record["pregnancies"] for record in saved] == [2.0, 3.0]
+    assert all(record["risk"] and record["model_version"] for record in saved)
+    assert "prediction_id" in body["results"][0] and "prediction_id" in body["results"][2]
+    assert "prediction_id" not in body["results"][1]
+
+def test_anonymous_batches_are_not_persisted(client, app):
+    """Batches without a token are scored but not saved"""
+    client.post('/predict/batch', json=[PATIENT])
+    assert app.prediction_writer.calls == []
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-v"]))
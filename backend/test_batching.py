@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Micro-Batcher Test
+Checks that concurrent submits share forward passes within the batch size and
+wait limits, that errors reach every waiter, and the stats() counters, using a
+stub predict_fn
+"""
+
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from batching import MicroBatcher
+
+class StubModel:
+    """predict_fn recording the size of every call; each row's probability is its first feature"""
+
+    def __init__(self, error=None):
+        self.calls = []
+        self.error = error
+
+    def __call__(self, features):
+        self.calls.append(len(features))
+        if self.error is not None:
+            raise self.error
+        return np.column_stack([features[:, 0], 1 - features[:, 0]])
+
+def submit_concurrently(batcher, n):
+    """Submit n rows from n threads at once; returns each thread's result or exception"""
+    results = [None] * n
+    barrier = threading.Barrier(n)
+
+    def worker(i):
+        barrier.wait()
+        try:
+            results[i] = batcher.submit(np.array([i / 100, 0], dtype=np.float32))
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    return results
+
+def test_concurrent_submits_share_one_call():
+    """Rows submitted together are scored in one call and each caller gets its own row back"""
+    model = StubModel()
+    batcher = MicroBatcher(model, max_batch_size=8, max_wait_ms=2000)
+    results = submit_concurrently(batcher, 8)
+
+    assert model.calls == [8]
+    for i, result in enumerate(results):
+        assert result[0] == pytest.approx(i / 100)
+
+def test_batches_are_capped_at_max_batch_size():
+    """A full batch is scored right away without waiting out max_wait"""
+    model = StubModel()
+    batcher = MicroBatcher(model, max_batch_size=4, max_wait_ms=2000)
+    started = time.perf_counter()
+    submit_concurrently(batcher, 8)
+
+    assert model.calls == [4, 4]
+    assert time.perf_counter() - started < 2
+
+def test_partial_batch_is_scored_after_max_wait():
+    """A lone row waits at most max_wait for company before it is scored"""
+    model = StubModel()
+    batcher = MicroBatcher(model, max_batch_size=32, max_wait_ms=50)
+    started = time.perf_counter()
+    batcher.submit(np.array([0.5, 0], dtype=np.float32))
+    elapsed = time.perf_counter() - started
+
+    assert model.calls == [1]
+    assert 0.04 <= elapsed < 1
+    assert batcher.stats()["max_queue_wait_ms"] >= 40
+
+def test_errors_reach_every_waiter():
+    """An exception from predict_fn is raised in every caller of the failed batch"""
+    error = RuntimeError("model unavailable")
+    batcher = MicroBatcher(StubModel(error), max_batch_size=3, max_wait_ms=2000)
+    results = submit_concurrently(batcher, 3)
+
+    assert results == [error, error, error]
+
+def test_stats_report_batch_sizes():
+    """stats() counts batches, requests and the batch-size histogram"""
+    batcher = MicroBatcher(StubModel(), max_batch_size=4, max_wait_ms=2000)
+    submit_concurrently(batcher, 4)
+    submit_concurrently(batcher, 4)
+    stats = batcher.stats()
+
+    assert (stats["batches"], stats["requests"], stats["avg_batch_size"]) == (2, 8, 4.0)
+    assert stats["batch_size_histogram"]["4"] == 2
+    assert stats["queue_depth"] == 0
+
+def test_disabled_batcher_calls_predict_fn_directly():
+    """With batching disabled every submit is its own call and no thread is started"""
+    model = StubModel()
+    batcher = MicroBatcher(model, enabled=False)
+    assert batcher.submit(np.array([0.25, 0], dtype=np.float32))[0] == pytest.approx(0.25)
+    assert model.calls == [1]
+    assert batcher._thread is None
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-v"]))
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Benchmark Comparison Test
+Checks that benchmark.py flags throughput and latency regressions between runs
+"""
+
+import pytest
+
+from benchmark import compare_runs, percentile
+
+def make_run(rps, p50, p95, p99):
+    return {
+        "meta": {"git_commit": "abc1234", "timestamp": "2024-01-01T00:00:00+00:00"},
+        "results": [{
+            "name": "predict_public",
+            "requests_per_sec": rps,
+            "latency_ms": {"p50": p50, "p95": p95, "p99": p99, "max": p99}
+        }]
+    }
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile([], 95) == 0.0
+
+def test_compare_runs_flags_regressions_beyond_threshold():
+    baseline = make_run(1000.0, 10.0, 20.0, 30.0)
+    slower = make_run(850.0, 10.5, 25.0, 30.0)
+
+    regressions = compare_runs(baseline, slower, threshold_pct=10.0)
+
+    assert {r["metric"] for r in regressions} == {"requests_per_sec", "latency_ms.p95"}
+
+def test_compare_runs_accepts_improvements():
+    assert compare_runs(make_run(1000.0, 10.0, 20.0, 30.0), make_run(1200.0, 8.0, 15.0, 20.0), 10.0) == []
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-v"]))
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Cache Test
+Checks LRU eviction order, TTL expiry and the byte cap of LRUCache, and the
+feature keys and model-version flush of PredictionCache
+"""
+
+import numpy as np
+import pytest
+
+import cache
+from cache import LRUCache, PredictionCache, estimate_size
+
+FEATURES = np.array([2, 120, 70, 20, 79, 25.0, 0.5, 33], dtype=np.float32)
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable time.monotonic for TTL checks"""
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, 'monotonic', lambda: now[0])
+    return now
+
+def test_least_recently_used_entry_is_evicted():
+    """A read moves an entry to the back, so the oldest unread one is evicted first"""
+    lru = LRUCache(max_entries=2)
+    lru.set('a', 1)
+    lru.set('b', 2)
+    assert lru.get('a') == 1
+    lru.set('c', 3)
+
+    assert lru.get('b') is None
+    assert (lru.get('a'), lru.get('c')) == (1, 3)
+    assert lru.stats()["evictions"] == 1
+
+def test_entries_expire_after_ttl(clock):
+    """Entries are served until their TTL passes, then count as expired misses"""
+    lru = LRUCache(ttl_seconds=10)
+    lru.set('a', 1)
+    clock[0] += 9
+    assert lru.get('a') == 1
+
+    clock[0] += 2
+    assert lru.get('a') is None
+    stats = lru.stats()
+    assert (stats["expirations"], stats["entries"], stats["bytes"]) == (1, 0, 0)
+
+def test_byte_cap_evicts_oldest_entries():
+    """Entries are evicted from the LRU end until the estimated size fits max_bytes"""
+    entry_size = estimate_size(('k', 0), (0.1, 0.2, 0.7))
+    lru = LRUCache(max_entries=100, max_bytes=entry_size * 3)
+    for i in range(5):
+        lru.set(('k', i), (0.1, 0.2, 0.7))
+
+    stats = lru.stats()
+    assert stats["entries"] == 3 and stats["bytes"] <= entry_size * 3
+    assert lru.get(('k', 0)) is None and lru.get(('k', 4)) is not None
+
+def test_prediction_cache_keys_on_float32_features():
+    """Rows that are equal at float32 precision, including -0.0, share an entry"""
+    predictions = PredictionCache(LRUCache())
+    predictions.set(FEATURES, 'v1', np.array([0.7, 0.2, 0.1]))
+
+    same = FEATURES.astype(np.float64)
+    same[3] = 20.000000001
+    assert predictions.get(same, 'v1') == pytest.approx([0.7, 0.2, 0.1])
+    assert PredictionCache.make_key([-0.0]) == PredictionCache.make_key([0.0])
+
+def test_new_model_version_clears_the_cache():
+    """The first lookup under a new model version drops every entry of the old one"""
+    predictions = PredictionCache(LRUCache())
+    predictions.set(FEATURES, 'v1', np.array([0.7, 0.2, 0.1]))
+    assert predictions.get(FEATURES, 'v2') is None
+
+    stats = predictions.stats()
+    assert (stats["model_version"], stats["entries"], stats["invalidations"]) == ('v2', 0, 1)
+    assert predictions.get(FEATURES, 'v1') is None
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-v"]))
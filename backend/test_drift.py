@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Drift Monitor Test
+Checks the quantile sketch, PSI/KS against the training reference, window
+expiry and the cluster-wide snapshot report of the drift monitor on Model/diabetes.csv
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import drift
+from drift import DriftMonitor, QuantileSketch, TRAINING_COLUMNS, build_reference
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+DATASET_PATH = os.path.join(BACKEND_DIR, '..', 'Model', 'diabetes.csv')
+
+class MemoryRepository:
+    """drift_snapshots stand-in applying $inc paths to nested dicts"""
+
+    def __init__(self):
+        self.documents = {}
+
+    def inc_buckets(self, increments):
+        for start, inc in increments.items():
+            document = self.documents.setdefault(start, {"_id": start, "start": start})
+            for path, count in inc.items():
+                *parents, leaf = path.split('.')
+                node = document
+                for key in parents:
+                    node = node.setdefault(key, {})
+                node[leaf] = node.get(leaf, 0) + count
+
+    def load_buckets(self, since):
+        return [document for document in self.documents.values() if document["start"] >= since]
+
+    def delete_buckets_before(self, before):
+        self.documents = {start: document for start, document in self.documents.items() if start >= before}
+
+@pytest.fixture(scope="module")
+def reference():
+    return build_reference(DATASET_PATH)
+
+@pytest.fixture(scope="module")
+def training_rows():
+    return pd.read_csv(DATASET_PATH)[list(TRAINING_COLUMNS)].to_numpy(dtype=np.float32)
+
+def test_quantile_sketch_relative_accuracy():
+    """Sketch quantiles stay within the relative accuracy of the exact ones"""
+    values = np.random.default_rng(0).lognormal(4, 1, 10000)
+    sketch = QuantileSketch()
+    sketch.add_many(values)
+    for q in (0.05, 0.5, 0.95):
+        assert sketch.quantile(q) == pytest.approx(np.quantile(values, q, method='lower'), rel=0.011)
+
+def test_training_data_shows_no_drift(reference, training_rows):
+    """Replaying the training rows gives near-zero PSI and KS below the critical value"""
+    monitor = DriftMonitor(reference)
+    for row in training_rows:
+        monitor.observe(row, 0)
+    report = monitor.report()
+
+    assert report["count"] == len(training_rows)
+    assert report["max_psi"] < 0.01
+    assert report["drifting_features"] == []
+
+def test_shifted_inputs_are_flagged(reference, training_rows):
+    """A glucose shift is reported by PSI and KS, other features stay stable"""
+    shifted = training_rows.copy()
+    shifted[:, 1] += 40
+    monitor = DriftMonitor(reference)
+    monitor.observe_many(shifted, np.zeros(len(shifted), dtype=int))
+    report = monitor.report()
+
+    assert report["features"]["glucose"]["psi_status"] == "significant"
+    assert report["features"]["glucose"]["ks_drift"]
+    assert report["drifting_features"] == ["glucose"]
+    assert report["predicted_classes"]["psi_status"] == "significant"
+
+def test_window_slides(reference, training_rows, monkeypatch):
+    """Observations older than the window no longer count"""
+    now = [1_000_000.0]
+    monkeypatch.setattr(drift.time, 'time', lambda: now[0])
+    monitor = DriftMonitor(reference, window_seconds=60, n_buckets=6)
+    monitor.observe_many(training_rows[:100], np.zeros(100, dtype=int))
+
+    now[0] += 30
+    monitor.observe(training_rows[0], 1)
+    assert monitor.report()["count"] == 101
+
+    now[0] += 45
+    assert monitor.report()["count"] == 1
+
+def test_cluster_report_merges_workers(reference, training_rows):
+    """The cluster report adds up every worker's snapshots; the local one stays per-worker"""
+    repo = MemoryRepository()
+    workers = [DriftMonitor(reference, repo), DriftMonitor(reference, repo)]
+    for monitor in workers:
+        monitor._pid, monitor._thread = os.getpid(), object()  # no background snapshot thread in the test
+    workers[0].observe_many(training_rows, np.ones(len(training_rows), dtype=int))
+    workers[0].snapshot()
+    workers[1].observe(training_rows[0], 2)
+
+    local = workers[1].report()
+    assert (local["scope"], local["count"]) == ("worker", 1)
+
+    # The reporting worker's unsnapshotted counts are included without writing them
+    cluster = workers[1].report(cluster=True)
+    assert (cluster["scope"], cluster["count"]) == ("cluster", len(training_rows) + 1)
+    assert cluster["predicted_classes"]["counts"] == [0, len(training_rows), 1]
+    assert workers[1].snapshots == 0
+    assert workers[0].report(cluster=True)["count"] == len(training_rows)
+
+    workers[1].snapshot()
+    assert workers[0].report(cluster=True)["features"] == cluster["features"]
+
+    # A restarted worker starts with an empty local window but the same cluster view
+    restarted = DriftMonitor(reference, repo)
+    assert restarted.report()["count"] == 0
+    assert restarted.report(cluster=True)["count"] == len(training_rows) + 1
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-v"]))
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Prediction Export Test
+Checks the NDJSON, CSV and Parquet writers against an in-memory MongoDB stand-in
+"""
+
+import csv
+import io
+import json
+import os
+
+import pytest
+from bson import ObjectId
+
+mongomock = pytest.importorskip('mongomock')
+
+import database
+from database import PredictionRepository
+from export import EXPORT_COLUMNS, ndjson_chunks, csv_chunks, write_parquet
+
+SAMPLE_PREDICTION = {
+    "pregnancies": 2, "glucose": 110, "bloodPressure": 75, "skinThickness": 25,
+    "insulin": 80, "bmi": 28.5, "diabetesPedigree": 0.5, "age": 35,
+    "risk": "borderline", "probabilities": {"normal": 0.01, "borderline": 0.81, "high": 0.18},
+    "predicted_class": 1
+}
+
+@pytest.fixture
+def predictions(monkeypatch):
+    """A PredictionRepository over mongomock holding 7 predictions for two users"""
+    db = mongomock.MongoClient().glucopredict
+    monkeypatch.setattr(database.mongodb, '_db', db)
+    monkeypatch.setattr(database.mongodb, '_pid', os.getpid())
+    repo = PredictionRepository()
+    first, second = str(ObjectId()), str(ObjectId())
+    repo.create_predictions(first, [{**SAMPLE_PREDICTION, "glucose": 100 + i} for i in range(5)])
+    repo.create_predictions(second, [SAMPLE_PREDICTION, SAMPLE_PREDICTION])
+    return repo, first
+
+def test_ndjson_chunks_hold_at_most_batch_rows(predictions):
+    repo, user_id = predictions
+    chunks = list(ndjson_chunks(repo.iter_predictions(user_id, batch_size=2), rows_per_chunk=2))
+    rows = [json.loads(line) for chunk in chunks for line in chunk.splitlines()]
+
+    assert [len(chunk.splitlines()) for chunk in chunks] == [2, 2, 1]
+    assert [row["glucose"] for row in rows] == [100, 101, 102, 103, 104]
+    assert rows[0]["prob_borderline"] == SAMPLE_PREDICTION["probabilities"]["borderline"]
+
+def test_csv_export_covers_every_user(predictions):
+    repo, _ = predictions
+    text = ''.join(csv_chunks(repo.iter_predictions(), rows_per_chunk=3))
+    rows = list(csv.DictReader(io.StringIO(text)))
+
+    assert len(rows) == 7
+    assert list(rows[0]) == EXPORT_COLUMNS
+
+def test_parquet_export_writes_row_groups(predictions, tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    repo, _ = predictions
+    path = str(tmp_path / "predictions.parquet")
+
+    assert write_parquet(repo.iter_predictions(), path, rows_per_group=3) == 7
+    assert pq.ParquetFile(path).num_row_groups == 3
+    assert pq.read_table(path).column_names == EXPORT_COLUMNS
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-v"]))
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Password Hashing Pool Test
+Checks bcrypt cost handling, background rehashing and queue bounding
+"""
+
+import threading
+
+import pytest
+
+from hashing import PasswordHasher, HashingPoolFull
+
+def test_hash_verify_and_cost_detection():
+    hasher = PasswordHasher(rounds=4)
+    password_hash = hasher.hash("abc12345")
+
+    assert password_hash.startswith("$2b$04$")
+    assert hasher.verify("abc12345", password_hash)
+    assert not hasher.verify("wrong123", password_hash)
+    assert not hasher.needs_rehash(password_hash)
+    assert PasswordHasher(rounds=5).needs_rehash(password_hash)
+
+def test_rehash_in_background_uses_current_cost():
+    hasher = PasswordHasher(rounds=5)
+    done = threading.Event()
+    new_hashes = []
+
+    def on_hashed(new_hash):
+        new_hashes.append(new_hash)
+        done.set()
+
+    hasher.rehash_in_background("abc12345", on_hashed)
+
+    assert done.wait(10)
+    assert new_hashes[0].startswith("$2b$05$")
+    assert hasher.verify("abc12345", new_hashes[0])
+
+def test_full_queue_rejects_new_work():
+    hasher = PasswordHasher(rounds=4, max_workers=1, max_pending=1)
+    release = threading.Event()
+    blocker = hasher._submit(release.wait)
+
+    with pytest.raises(HashingPoolFull):
+        hasher.hash("abc12345")
+    release.set()
+    blocker.result(10)
+
+    stats = hasher.stats()
+    assert stats["rejected"] == 1
+    assert stats["pending"] == 0
+    assert hasher.hash("abc12345")
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-v"]))
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Inference Engine Parity Test
+Checks that the NumPy engine (scaler folded into its first layer) reproduces the
+Keras model + sklearn scaler on Model/diabetes.csv
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from inference import MODEL_VARIANTS, NumpyInferenceEngine, KerasInferenceEngine, artifact_path_for_variant
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+DATASET_PATH = os.path.join(BACKEND_DIR, '..', 'Model', 'diabetes.csv')
+ARTIFACT_PATH = os.path.join(BACKEND_DIR, 'diabetes_model.npz')
+MODEL_PATH = os.path.join(BACKEND_DIR, 'diabetes_model.h5')
+FOLDED_MODEL_PATH = os.path.join(BACKEND_DIR, 'diabetes_model.folded.h5')
+SCALER_PATH = os.path.join(BACKEND_DIR, 'scaler.pkl')
+
+TOLERANCE = 1e-5
+
+# Max absolute probability difference of each reduced-precision variant from float32
+VARIANT_TOLERANCE = {'float16': 5e-3, 'int8': 3e-2}
+
+def load_features():
+    """Load the eight model features from the training CSV"""
+    df = pd.read_csv(DATASET_PATH)
+    return df.drop(columns=['Outcome']).values
+
+def test_numpy_engine_outputs_probabilities():
+    """NumPy engine returns one normalized 3-class distribution per row"""
+    engine = NumpyInferenceEngine(ARTIFACT_PATH)
+    probs = engine.predict_proba(load_features())
+
+    assert probs.shape == (768, 3)
+    assert np.allclose(probs.sum(axis=1), 1.0, atol=1e-5)
+
+def test_numpy_engine_matches_keras():
+    """NumPy and Keras engines agree within tolerance on every row of the dataset"""
+    pytest.importorskip('tensorflow')
+    features = load_features()
+
+    numpy_probs = NumpyInferenceEngine(ARTIFACT_PATH).predict_proba(features)
+    keras_probs = KerasInferenceEngine(MODEL_PATH, SCALER_PATH).predict_proba(features)
+
+    max_diff = float(np.abs(numpy_probs - keras_probs).max())
+    print(f"Max absolute probability difference: {max_diff:.2e}")
+
+    assert max_diff < TOLERANCE
+    assert np.array_equal(numpy_probs.argmax(axis=1), keras_probs.argmax(axis=1))
+
+def test_default_artifact_is_self_contained():
+    """The served artifact carries no scaler statistics, so transform() does no arithmetic"""
+    engine = NumpyInferenceEngine(ARTIFACT_PATH)
+    features = load_features()[:5].astype(np.float32)
+
+    assert engine.scaler_folded
+    assert np.array_equal(engine.transform(features), features)
+
+def test_folded_keras_model_matches_scaler_pipeline():
+    """The folded Keras fallback needs no scaler and matches model + scaler.transform()"""
+    pytest.importorskip('tensorflow')
+    features = load_features()
+
+    folded = KerasInferenceEngine(FOLDED_MODEL_PATH)
+    reference = KerasInferenceEngine(MODEL_PATH, SCALER_PATH)
+
+    assert folded.scaler_folded and folded.scaler is None
+    assert float(np.abs(folded.predict_proba(features) - reference.predict_proba(features)).max()) < TOLERANCE
+
+@pytest.mark.parametrize('variant', sorted(VARIANT_TOLERANCE))
+def test_reduced_precision_variants_match_float32(variant):
+    """float16/int8 artifacts (scaler folded in) stay close to float32 and pick the same class"""
+    features = load_features()
+    engine = NumpyInferenceEngine(os.path.join(BACKEND_DIR, MODEL_VARIANTS[variant]))
+
+    reference = NumpyInferenceEngine(ARTIFACT_PATH).predict_proba(features)
+    probs = engine.predict_proba(features)
+
+    assert engine.precision == variant
+    assert engine.scaler_folded
+    assert float(np.abs(probs - reference).max()) < VARIANT_TOLERANCE[variant]
+    assert (probs.argmax(axis=1) == reference.argmax(axis=1)).mean() > 0.99
+
+def test_model_variant_selects_artifact(monkeypatch):
+    monkeypatch.delenv('MODEL_ARTIFACT_PATH', raising=False)
+    monkeypatch.setenv('MODEL_VARIANT', 'int8')
+    assert artifact_path_for_variant() == 'diabetes_model.int8.npz'
+
+    monkeypatch.setenv('MODEL_ARTIFACT_PATH', 'custom.npz')
+    assert artifact_path_for_variant() == 'custom.npz'
+
+    monkeypatch.setenv('MODEL_VARIANT', 'int4')
+    with pytest.raises(ValueError):
+        artifact_path_for_variant()
+
+if __name__ == "__main__":
+    test_numpy_engine_outputs_probabilities()
+    test_numpy_engine_matches_keras()
+    test_default_artifact_is_self_contained()
+    test_folded_keras_model_matches_scaler_pipeline()
+    for variant in sorted(VARIANT_TOLERANCE):
+        test_reduced_precision_variants_match_float32(variant)
+    print("✅ NumPy engine matches the Keras model")
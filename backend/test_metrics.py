@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Metrics Test
+Checks stage timing, Server-Timing headers and the gauges built from stats() dicts
+"""
+
+import pytest
+from flask import Flask
+from prometheus_client import CollectorRegistry, generate_latest
+
+import metrics
+from metrics import StatsCollector, stage
+
+def stage_count(name):
+    return next(
+        sample.value for family in metrics.STAGE_SECONDS.collect() for sample in family.samples
+        if sample.name.endswith('_count') and sample.labels.get('stage') == name
+    )
+
+def test_stage_is_observed_and_reported_in_server_timing(monkeypatch):
+    monkeypatch.setattr(metrics, 'SERVER_TIMING_ENABLED', True)
+    app = Flask(__name__)
+    metrics.init_app(app)
+
+    @app.route("/work")
+    def work():
+        with stage('validation'):
+            pass
+        with stage('validation'):
+            pass
+        return "ok"
+
+    before = stage_count('validation')
+    response = app.test_client().get("/work")
+
+    assert stage_count('validation') == before + 2
+    assert response.headers['Server-Timing'].startswith('validation;dur=')
+
+def test_server_timing_is_off_by_default(monkeypatch):
+    monkeypatch.setattr(metrics, 'SERVER_TIMING_ENABLED', False)
+    app = Flask(__name__)
+    metrics.init_app(app)
+
+    @app.route("/work")
+    def work():
+        with stage('validation'):
+            pass
+        return "ok"
+
+    before = stage_count('validation')
+    response = app.test_client().get("/work")
+
+    assert stage_count('validation') == before + 1
+    assert 'Server-Timing' not in response.headers
+
+def test_stats_collector_flattens_numeric_fields():
+    collector = StatsCollector()
+    collector.register('cache', lambda: {
+        "enabled": True, "hits": 3, "hit_rate": 0.75, "model_version": "abc",
+        "histogram": {"1": 2, "+Inf": 1}
+    })
+    registry = CollectorRegistry()
+    registry.register(collector)
+    text = generate_latest(registry).decode()
+
+    assert 'glucopredict_cache_enabled 1.0' in text
+    assert 'glucopredict_cache_hit_rate 0.75' in text
+    assert 'glucopredict_cache_histogram_plus_Inf 1.0' in text
+    assert 'model_version' not in text
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-v"]))
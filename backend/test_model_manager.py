@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Model Manager Test
+Checks eager loading: /ready stays 503 until the engine is loaded and warmed up,
+concurrent callers share a single load, and warm-up runs before readiness, with
+a stub engine whose load can be held back
+"""
+
+import os
+import threading
+
+import numpy as np
+import pytest
+
+import inference
+from inference import ModelManager
+
+class StubEngine:
+    """Engine recording, for every predict_proba call, its batch size and whether the manager was ready"""
+
+    backend = 'stub'
+    precision = 'float32'
+    version = 'stub-v1'
+
+    def __init__(self, manager):
+        self.manager = manager
+        self.calls = []
+
+    def predict_proba(self, features):
+        self.calls.append((len(features), self.manager.is_ready()))
+        return np.tile([0.7, 0.2, 0.1], (len(features), 1))
+
+@pytest.fixture
+def manager(monkeypatch):
+    """A ModelManager whose load_engine blocks until `release` is set; loads are counted"""
+    manager = ModelManager()
+    manager._watcher_pid = os.getpid()  # no registry watcher in the test
+    manager.release = threading.Event()
+    manager.loads = []
+
+    def load_engine(version=None):
+        assert manager.release.wait(5)
+        engine = StubEngine(manager)
+        manager.loads.append(engine)
+        return engine
+
+    monkeypatch.setattr(inference, 'load_engine', load_engine)
+    return manager
+
+def test_ready_is_503_until_loaded(manager, monkeypatch):
+    """/ready answers 503 while the background load runs and 200 once it has finished"""
+    import main
+    monkeypatch.setattr(main, 'model_manager', manager)
+    client = main.app.test_client()
+
+    thread = manager.start_background_load()
+    response = client.get('/ready')
+    assert response.status_code == 503
+    assert response.get_json() == {"status": "loading"}
+
+    manager.release.set()
+    thread.join(5)
+    response = client.get('/ready')
+    assert response.status_code == 200
+    assert response.get_json()["model_version"] == 'stub-v1'
+
+def test_concurrent_callers_share_one_load(manager):
+    """Requests arriving during startup wait for the same load instead of starting their own"""
+    manager.start_background_load()
+    engines = []
+    threads = [threading.Thread(target=lambda: engines.append(manager.get_engine())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+
+    manager.release.set()
+    for thread in threads:
+        thread.join(5)
+    assert len(manager.loads) == 1
+    assert len(engines) == 8 and all(engine is manager.loads[0] for engine in engines)
+
+def test_warm_up_runs_before_ready(manager):
+    """The warm-up inferences happen before the ready event is set"""
+    manager.release.set()
+    engine = manager.load()
+
+    assert engine.calls == [(1, False), (8, False)]
+    assert manager.is_ready()
+    assert manager.load_time_ms is not None
+
+def test_failed_load_is_reported_and_retried(manager, monkeypatch):
+    """A failed load leaves the manager unready with the error, and the next call loads again"""
+    def broken_load_engine(version=None):
+        raise FileNotFoundError("diabetes_model.npz")
+
+    monkeypatch.setattr(inference, 'load_engine', broken_load_engine)
+    manager.start_background_load().join(5)
+    assert not manager.is_ready()
+    assert "diabetes_model.npz" in manager.load_error
+
+    monkeypatch.undo()
+    monkeypatch.setattr(inference, 'load_engine', lambda version=None: StubEngine(manager))
+    assert manager.get_engine().version == 'stub-v1'
+    assert manager.is_ready() and manager.load_error is None
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-v"]))
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Write-Behind Queue Test
+Checks batching, spilling on MongoDB failures, replay and the shutdown drain of
+the write-behind queue with in-memory repositories
+"""
+
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+from bson import ObjectId, json_util
+
+from database import build_prediction_document
+from persistence import WriteBehindQueue
+
+SAMPLE_PREDICTION = {"glucose": 110.0, "age": 35.0, "risk": "normal", "predicted_class": 0}
+
+class FakePredictionRepository:
+    """predictions collection stand-in that can be switched to fail like an unreachable MongoDB"""
+
+    def __init__(self):
+        self.documents = {}
+        self.insert_calls = 0
+        self.failing = False
+
+    def insert_prediction_documents(self, predictions):
+        if self.failing:
+            raise ConnectionError("MongoDB unreachable")
+        self.insert_calls += 1
+        inserted = [document for document in predictions if document['_id'] not in self.documents]
+        for document in inserted:
+            self.documents[document['_id']] = document
+        return inserted
+
+class FakeUserRepository:
+    def __init__(self):
+        self.counts = {}
+
+    def increment_prediction_counts(self, counts):
+        for user_id, amount in counts.items():
+            self.counts[user_id] = self.counts.get(user_id, 0) + amount
+
+@pytest.fixture
+def writer(tmp_path):
+    writer = WriteBehindQueue(FakePredictionRepository(), FakeUserRepository(), batch_size=50,
+                              flush_interval=0.05, spill_dir=str(tmp_path / 'spill'), replay_interval=3600)
+    writer._last_replay_attempt = time.monotonic()  # no startup replay unless a test asks for it
+    yield writer
+    writer.drain(timeout=2)
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert condition()
+
+def spill_files(writer):
+    return sorted(os.listdir(writer.spill_dir)) if os.path.isdir(writer.spill_dir) else []
+
+def test_enqueue_flushes_in_one_batch(writer):
+    """Queued predictions are inserted together with one coalesced count increment"""
+    user_id = str(ObjectId())
+    ids = writer.enqueue_many(user_id, [SAMPLE_PREDICTION] * 10)
+    wait_for(lambda: writer.flushed == 10)
+
+    assert set(writer.prediction_repo.documents) == set(ids)
+    assert writer.prediction_repo.insert_calls == 1
+    assert writer.user_repo.counts == {user_id: 10}
+
+def test_failed_flush_spills_and_replays(writer):
+    """Documents that cannot be inserted go to a spill file and are replayed exactly once"""
+    user_id = str(ObjectId())
+    writer.prediction_repo.failing = True
+    ids = writer.enqueue_many(user_id, [SAMPLE_PREDICTION] * 3)
+    wait_for(lambda: writer.spilled == 3)
+    assert spill_files(writer) == [f"predictions-{os.getpid()}.ndjson"]
+
+    writer.prediction_repo.failing = False
+    writer._replay_spill()
+    writer._replay_spill()
+    assert set(writer.prediction_repo.documents) == set(ids)
+    assert writer.replayed == 3
+    assert writer.user_repo.counts == {user_id: 3}
+    assert spill_files(writer) == []
+
+def test_replay_runs_under_steady_traffic(writer):
+    """Spilled documents are replayed even when every loop iteration has a batch to flush"""
+    user_id = str(ObjectId())
+    writer.prediction_repo.failing = True
+    spilled = writer.enqueue(user_id, SAMPLE_PREDICTION)
+    wait_for(lambda: writer.spilled == 1)
+
+    writer.prediction_repo.failing = False
+    writer.replay_interval = 0
+    deadline = time.monotonic() + 5
+    while writer.replayed == 0 and time.monotonic() < deadline:
+        writer.enqueue(user_id, SAMPLE_PREDICTION)
+        time.sleep(0.005)
+    assert writer.replayed == 1
+    assert spilled in writer.prediction_repo.documents
+
+def test_half_replayed_file_of_dead_process_is_reclaimed(writer):
+    """A spill file claimed by a process that died mid-replay is replayed by the next one"""
+    dead_pid = subprocess.run([sys.executable, '-c', 'import os; print(os.getpid())'],
+                              capture_output=True, text=True).stdout.strip()
+    document = build_prediction_document(str(ObjectId()), SAMPLE_PREDICTION)
+    document['_id'] = ObjectId()
+    os.makedirs(writer.spill_dir)
+    path = os.path.join(writer.spill_dir, f"predictions-{dead_pid}.ndjson.replaying-{dead_pid}")
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(json_util.dumps(document) + '\n')
+
+    writer._replay_spill()
+    assert document['_id'] in writer.prediction_repo.documents
+    assert spill_files(writer) == []
+
+def test_failed_replay_keeps_the_file_claimed(writer):
+    """A replay that fails leaves the claimed file for the next attempt without touching new spills"""
+    writer.prediction_repo.failing = True
+    writer.enqueue(str(ObjectId()), SAMPLE_PREDICTION)
+    wait_for(lambda: writer.spilled == 1)
+    writer._replay_spill()
+    assert spill_files(writer) == [f"predictions-{os.getpid()}.ndjson.replaying-{os.getpid()}"]
+
+    writer.enqueue(str(ObjectId()), SAMPLE_PREDICTION)
+    wait_for(lambda: writer.spilled == 2)
+    writer.prediction_repo.failing = False
+    writer._replay_spill()
+    assert len(writer.prediction_repo.documents) == 2
+    assert spill_files(writer) == []
+
+def test_drain_flushes_pending_documents(writer):
+    """drain() persists what is still queued and stops the flusher"""
+    writer.flush_interval = 1.0
+    ids = writer.enqueue_many(str(ObjectId()), [SAMPLE_PREDICTION] * 5)
+    thread = writer._thread
+    writer.drain(timeout=5)
+
+    assert not thread.is_alive()
+    assert set(writer.prediction_repo.documents) == set(ids)
+    assert writer.spilled == 0
+
+def test_drain_spills_when_mongodb_is_down(writer):
+    """Documents that cannot be flushed at shutdown are kept on disk for the next process"""
+    writer.prediction_repo.failing = True
+    writer.enqueue_many(str(ObjectId()), [SAMPLE_PREDICTION] * 4)
+    writer.drain(timeout=5)
+
+    assert writer.spilled == 4
+    assert len(spill_files(writer)) == 1
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-v"]))
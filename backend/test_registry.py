@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Model Registry Test
+Checks publishing, activation and corruption detection of registry versions,
+and that ModelManager hot-swaps to a newly activated version
+"""
+
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+import inference
+from inference import ModelManager
+from registry import ModelRegistry, ModelVersionNotFound
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+ARTIFACTS = [os.path.join(BACKEND_DIR, name) for name in inference.MODEL_VARIANTS.values()]
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    """Empty registry that load_engine reads from, serving the float32 variant with NumPy"""
+    registry = ModelRegistry(str(tmp_path / 'registry'))
+    monkeypatch.setattr(inference, 'model_registry', registry)
+    monkeypatch.delenv('MODEL_ARTIFACT_PATH', raising=False)
+    monkeypatch.setenv('MODEL_VARIANT', 'float32')
+    monkeypatch.setenv('INFERENCE_BACKEND', 'numpy')
+    return registry
+
+def test_publish_records_manifest_and_deduplicates(registry):
+    """A version stores hashes, metrics and creation time; republishing the same files reuses it"""
+    manifest = registry.publish(ARTIFACTS, metrics={"test_accuracy": 0.86})
+
+    assert manifest["version"].endswith(manifest["content_hash"][:8])
+    assert sorted(manifest["files"]) == sorted(os.path.basename(path) for path in ARTIFACTS)
+    assert manifest["metrics"] == {"test_accuracy": 0.86}
+    assert manifest["created_at"]
+    assert registry.current_version() is None
+
+    assert registry.publish(ARTIFACTS)["version"] == manifest["version"]
+    assert len(registry.list_versions()) == 1
+
+def test_activate_verifies_files(registry):
+    """Unknown versions are rejected and tampered artifacts cannot be activated"""
+    with pytest.raises(ModelVersionNotFound):
+        registry.activate('20260101T000000-deadbeef')
+
+    version = registry.publish(ARTIFACTS)["version"]
+    registry.activate(version)
+    assert registry.current_version() == version
+
+    with open(registry.artifact_path(version, 'diabetes_model.npz'), 'ab') as f:
+        f.write(b'\0')
+    with pytest.raises(ValueError):
+        registry.activate(version)
+
+def test_model_manager_swaps_to_activated_version(registry, tmp_path):
+    """reload() serves the newly active version; the old engine stays usable for in-flight requests"""
+    first = registry.publish(ARTIFACTS, activate=True)["version"]
+
+    # A second version with different content: the same model, stored again under a new file list
+    extra = tmp_path / 'notes.txt'
+    extra.write_text('retrained')
+    second = registry.publish(ARTIFACTS + [str(extra)])["version"]
+    assert second != first
+
+    manager = ModelManager()
+    old_engine = manager.load()
+    assert manager.version == first
+
+    registry.activate(second)
+    new_engine = manager.reload()
+    assert manager.version == second
+    assert manager.get_engine() is new_engine
+    assert manager.swaps == 1
+
+    features = np.array([[2, 120, 70, 20, 79, 25.0, 0.5, 33]], dtype=np.float32)
+    assert np.allclose(old_engine.predict_proba(features), new_engine.predict_proba(features))
+
+def test_failed_reload_keeps_serving_engine(registry):
+    """A version that fails to load leaves the current engine in place"""
+    version = registry.publish(ARTIFACTS, activate=True)["version"]
+    manager = ModelManager()
+    engine = manager.load()
+
+    shutil.rmtree(registry.version_dir(version))
+    with pytest.raises(ModelVersionNotFound):
+        manager.reload()
+    assert manager.get_engine() is engine
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-v"]))
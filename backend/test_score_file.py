@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Bulk Scoring Test
+Checks score_file.py against the API's inference engine on Model/diabetes.csv
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from inference import NumpyInferenceEngine
+from score_file import API_COLUMNS, DATASET_COLUMNS, score_file
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+DATASET_PATH = os.path.join(BACKEND_DIR, '..', 'Model', 'diabetes.csv')
+ARTIFACT_PATH = os.path.join(BACKEND_DIR, 'diabetes_model.npz')
+
+@pytest.fixture
+def patients(tmp_path, monkeypatch):
+    """First 200 dataset rows in the API's column layout, with one unparseable value"""
+    monkeypatch.setenv('MODEL_ARTIFACT_PATH', ARTIFACT_PATH)
+    monkeypatch.setenv('INFERENCE_BACKEND', 'numpy')
+    df = pd.read_csv(DATASET_PATH, nrows=200).rename(columns=dict(zip(DATASET_COLUMNS, API_COLUMNS)))
+    df = df.astype({"glucose": object})
+    df.loc[5, "glucose"] = "n/a"
+    path = tmp_path / "patients.csv"
+    df.to_csv(path, index=False)
+    return df, str(path)
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_scores_match_the_api_engine(patients, tmp_path, workers):
+    df, input_path = patients
+    output_path = str(tmp_path / "scored.csv")
+
+    result = score_file(input_path, output_path, workers=workers, chunk_size=64)
+    scored = pd.read_csv(output_path)
+
+    assert result["rows"] == 200 and result["failed"] == 1
+    assert scored.loc[5, "error"] == "All fields must be finite numbers"
+    assert pd.isna(scored.loc[5, "risk"])
+
+    valid = scored["error"].isna().to_numpy()
+    features = df[API_COLUMNS].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float32)[valid]
+    expected = NumpyInferenceEngine(ARTIFACT_PATH).predict_proba(features)
+    actual = scored.loc[valid, ["prob_normal", "prob_borderline", "prob_high"]].to_numpy()
+    np.testing.assert_allclose(actual, expected, atol=1e-6)
+    assert (scored.loc[valid, "predicted_class"].to_numpy() == expected.argmax(axis=1)).all()
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-v"]))
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Shadow / Canary Evaluation Test
+Checks canary routing, the comparison documents written for mirrored requests
+and the summary report, with stub engines and an in-memory repository
+"""
+
+import time
+
+import numpy as np
+import pytest
+
+from database import build_shadow_summary
+from shadow import ShadowEvaluator
+
+FEATURES = np.array([2, 120, 70, 20, 79, 25.0, 0.5, 33], dtype=np.float32)
+
+class StubEngine:
+    """Engine returning the same probabilities for every row"""
+
+    def __init__(self, version, probabilities):
+        self.version = version
+        self.probabilities = np.array(probabilities, dtype=np.float32)
+
+    def predict_proba(self, features):
+        return np.tile(self.probabilities, (len(features), 1))
+
+class MemoryRepository:
+    def __init__(self):
+        self.documents = []
+
+    def insert_evaluations(self, documents):
+        self.documents.extend(documents)
+
+PRIMARY = StubEngine('primary-v1', [0.7, 0.2, 0.1])
+CANDIDATE = StubEngine('candidate-v2', [0.3, 0.6, 0.1])
+
+def predict_primary(features):
+    return PRIMARY.predict_proba(features[np.newaxis, :])[0], PRIMARY.version
+
+def make_evaluator(mode, **options):
+    repo = MemoryRepository()
+    evaluator = ShadowEvaluator(repo, lambda: PRIMARY, lambda: CANDIDATE, mode=mode, flush_interval=0.01, **options)
+    return evaluator, repo
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert condition()
+
+def test_off_mode_only_calls_primary():
+    """Without a candidate the serving path is returned untouched and nothing is started"""
+    evaluator, repo = make_evaluator('off')
+    prediction_prob, model_version = evaluator.predict(FEATURES, predict_primary)
+
+    assert model_version == 'primary-v1'
+    assert evaluator.stats()["mirrored"] == 0
+    assert evaluator._thread is None
+
+def test_shadow_mode_mirrors_requests():
+    """Shadow mode answers from the primary and records one comparison per request"""
+    evaluator, repo = make_evaluator('shadow')
+    evaluator._ensure_started()
+    wait_for(lambda: evaluator.candidate is not None)
+
+    for _ in range(5):
+        prediction_prob, model_version = evaluator.predict(FEATURES, predict_primary)
+        assert model_version == 'primary-v1'
+    wait_for(lambda: len(repo.documents) == 5)
+
+    document = repo.documents[0]
+    assert document["served_by"] == 'primary'
+    assert (document["primary_class"], document["candidate_class"]) == (0, 1)
+    assert document["agree"] is False
+    assert document["max_abs_delta"] == pytest.approx(0.4, abs=1e-6)
+    assert document["candidate_latency_ms"] >= 0 and document["served_latency_ms"] >= 0
+
+def test_canary_mode_serves_candidate():
+    """With canary_fraction 1 every request is answered by the candidate and compared to the primary"""
+    evaluator, repo = make_evaluator('canary', canary_fraction=1.0)
+    evaluator._ensure_started()
+    wait_for(lambda: evaluator.candidate is not None)
+
+    prediction_prob, model_version = evaluator.predict(FEATURES, predict_primary)
+    assert model_version == 'candidate-v2'
+    assert np.allclose(prediction_prob, CANDIDATE.probabilities)
+    wait_for(lambda: len(repo.documents) == 1)
+    assert repo.documents[0]["served_by"] == 'candidate'
+    assert repo.documents[0]["primary_version"] == 'primary-v1'
+
+def summary_result(primary_version, count, agreements):
+    return {
+        "_id": {"candidate_version": 'candidate-v2', "primary_version": primary_version},
+        "count": count, "agreements": agreements, "served_by_candidate": 1,
+        "mean_max_abs_delta": 0.1, "max_abs_delta": 0.4,
+        "mean_primary_latency_ms": 0.01, "mean_candidate_latency_ms": 0.02, "mean_served_latency_ms": 1.5
+    }
+
+def confusion_result(primary_version, primary_class, candidate_class, count):
+    return {"_id": {"candidate_version": 'candidate-v2', "primary_version": primary_version,
+                    "primary_class": primary_class, "candidate_class": candidate_class}, "count": count}
+
+def test_summary_report():
+    """Aggregated results become agreement rates and a primary x candidate confusion matrix"""
+    report, = build_shadow_summary(
+        [summary_result('primary-v1', 4, 3)],
+        [confusion_result('primary-v1', 0, 0, 3), confusion_result('primary-v1', 0, 1, 1)]
+    )
+
+    assert report["agreement_rate"] == 0.75
+    assert report["confusion"] == [[3, 1, 0], [0, 0, 0], [0, 0, 0]]
+
+def test_summary_keeps_primaries_apart():
+    """A candidate compared with two primary versions gets a separate confusion matrix for each"""
+    first, second = build_shadow_summary(
+        [summary_result('primary-v1', 3, 3), summary_result('primary-v2', 2, 0)],
+        [confusion_result('primary-v1', 0, 0, 3), confusion_result('primary-v2', 2, 1, 2)]
+    )
+
+    assert first["confusion"] == [[3, 0, 0], [0, 0, 0], [0, 0, 0]]
+    assert second["confusion"] == [[0, 0, 0], [0, 0, 0], [0, 2, 0]]
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-v"]))
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Prediction Stats Test
+Checks the per-user summary documents against an in-memory MongoDB stand-in:
+rebuilds from raw predictions, legacy string-valued records and concurrent updates
+"""
+
+import os
+import time
+
+import pytest
+from bson import ObjectId
+
+mongomock = pytest.importorskip('mongomock')
+
+import database
+from database import PredictionRepository
+
+SAMPLE_PREDICTION = {
+    "pregnancies": 2, "glucose": 110, "bloodPressure": 75, "skinThickness": 25,
+    "insulin": 80, "bmi": 28.5, "diabetesPedigree": 0.5, "age": 35,
+    "risk": "borderline", "probabilities": {"normal": 0.01, "borderline": 0.81, "high": 0.18},
+    "predicted_class": 1
+}
+
+@pytest.fixture
+def repo(monkeypatch):
+    """A PredictionRepository over an empty mongomock database"""
+    db = mongomock.MongoClient().glucopredict
+    monkeypatch.setattr(database.mongodb, '_db', db)
+    monkeypatch.setattr(database.mongodb, '_pid', os.getpid())
+    return PredictionRepository()
+
+def test_rebuild_matches_incremental_summary(repo):
+    """Rebuilding from the raw predictions gives the same stats as the incremental updates"""
+    user_id = str(ObjectId())
+    repo.create_predictions(user_id, [{**SAMPLE_PREDICTION, "glucose": 100 + i} for i in range(4)])
+    incremental = repo.get_prediction_stats(user_id)
+
+    repo.rebuild_prediction_stats(user_id)
+    rebuilt = repo.get_prediction_stats(user_id)
+    assert rebuilt["total_predictions"] == incremental["total_predictions"] == 4
+    assert rebuilt["feature_stats"] == incremental["feature_stats"]
+    assert rebuilt["feature_stats"]["glucose"]["mean"] == 101.5
+
+def test_rebuild_skips_string_feature_values(repo):
+    """Legacy records storing a feature as a string are counted but left out of that feature's moments"""
+    user_id = str(ObjectId())
+    repo.create_predictions(user_id, [SAMPLE_PREDICTION])
+    legacy = database.build_prediction_document(user_id, SAMPLE_PREDICTION)
+    legacy["glucose"] = "140"
+    repo.predictions.insert_one(legacy)
+
+    repo.rebuild_prediction_stats(user_id)
+    stats = repo.get_prediction_stats(user_id)
+    assert stats["total_predictions"] == 2
+    assert stats["feature_stats"]["glucose"]["count"] == 1
+    assert stats["feature_stats"]["glucose"]["mean"] == 110
+    assert stats["feature_stats"]["age"]["count"] == 2
+
+def test_rebuild_retries_after_concurrent_update(repo, monkeypatch):
+    """A prediction saved while the rebuild aggregates is not overwritten by the rebuilt summary"""
+    user_id = str(ObjectId())
+    repo.create_predictions(user_id, [SAMPLE_PREDICTION])
+    aggregate = repo.predictions.aggregate
+    calls = []
+
+    def aggregate_with_concurrent_insert(pipeline):
+        calls.append(pipeline)
+        if len(calls) == 1:
+            repo.create_predictions(user_id, [SAMPLE_PREDICTION])
+        return aggregate(pipeline)
+
+    predictions = repo.predictions
+    monkeypatch.setattr(predictions, 'aggregate', aggregate_with_concurrent_insert)
+    monkeypatch.setattr(PredictionRepository, 'predictions', property(lambda self: predictions))
+
+    repo.rebuild_prediction_stats(user_id)
+    assert len(calls) == 4  # two pipelines, twice
+    assert repo.get_prediction_stats(user_id)["total_predictions"] == 2
+
+def test_rebuild_waits_for_claimed_increments(repo, monkeypatch):
+    """A prediction the aggregation counts whose $inc has not landed yet is not counted twice"""
+    user_id = str(ObjectId())
+    repo.create_predictions(user_id, [SAMPLE_PREDICTION])
+    held = []
+    with monkeypatch.context() as patch:
+        patch.setattr(PredictionRepository, 'update_prediction_stats',
+                      lambda self, predictions, claim=None: held.append((predictions, claim)))
+        repo.create_predictions(user_id, [SAMPLE_PREDICTION])  # inserted, increments not yet applied
+
+    sleeps = []
+
+    def sleep_while_the_increments_land(seconds):
+        sleeps.append(seconds)
+        for predictions, claim in held:
+            repo.update_prediction_stats(predictions, claim)
+        held.clear()
+
+    monkeypatch.setattr(database.time, 'sleep', sleep_while_the_increments_land)
+    repo.rebuild_prediction_stats(user_id)
+    assert sleeps == [database.STATS_CLAIM_BACKOFF_SECONDS]
+    assert repo.get_prediction_stats(user_id)["total_predictions"] == 2
+
+def test_rebuild_ignores_abandoned_claims(repo, monkeypatch):
+    """A claim left by a writer that died mid-insert does not block rebuilds once it has timed out"""
+    user_id = str(ObjectId())
+    repo.create_predictions(user_id, [SAMPLE_PREDICTION])
+    claim_id, _ = repo.claim_prediction_stats([user_id])
+    repo.prediction_stats.update_one(
+        {"_id": ObjectId(user_id)},
+        {"$set": {"pending_writes.0.claimed_at": time.time() - database.STATS_CLAIM_TIMEOUT_SECONDS - 1}}
+    )
+    monkeypatch.setattr(database.time, 'sleep', lambda seconds: pytest.fail("rebuild waited on an abandoned claim"))
+
+    repo.rebuild_prediction_stats(user_id)
+    summary = repo.prediction_stats.find_one({"_id": ObjectId(user_id)})
+    assert summary["total"] == 1
+    assert "pending_writes" not in summary
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-v"]))
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Patient Record Validation Test
+Checks parsing into float32 rows, range enforcement and structured errors
+"""
+
+import numpy as np
+import pytest
+
+from validation import FEATURE_FIELDS, ValidationError, parse_features
+
+RECORD = {
+    "pregnancies": 2, "glucose": 110, "bloodPressure": 75, "skinThickness": 25,
+    "insulin": 80, "bmi": 28.5, "diabetesPedigree": 0.5, "age": 35
+}
+
+def test_parses_in_model_order():
+    row = parse_features({**RECORD, "glucose": "110.5"})
+
+    assert row.dtype == np.float32
+    assert row.tolist() == [2.0, 110.5, 75.0, 25.0, 80.0, 28.5, 0.5, 35.0]
+
+def test_fills_preallocated_row():
+    matrix = np.zeros((2, len(FEATURE_FIELDS)), dtype=np.float32)
+
+    assert parse_features(RECORD, out=matrix[1]) is not None
+    assert matrix[1, FEATURE_FIELDS.index("bmi")] == np.float32(28.5)
+    assert not matrix[0].any()
+
+def test_collects_every_invalid_field():
+    record = {**RECORD, "glucose": 900, "age": True, "bmi": "nan", "insulin": "abc"}
+    del record["pregnancies"]
+
+    with pytest.raises(ValidationError) as raised:
+        parse_features(record)
+
+    details = {detail["field"]: detail["message"] for detail in raised.value.details}
+    assert details == {
+        "pregnancies": "Missing field: pregnancies",
+        "glucose": "glucose must be 0 (not measured) or between 20 and 600",
+        "insulin": "insulin must be a finite number",
+        "bmi": "bmi must be a finite number",
+        "age": "age must be a finite number"
+    }
+    body = raised.value.to_dict()
+    assert body["error"].startswith("Missing field: pregnancies; glucose must be")
+    assert len(body["details"]) == 5
+
+def test_ranges_are_inclusive():
+    parse_features({**RECORD, "pregnancies": 0, "age": 120})
+
+    with pytest.raises(ValidationError):
+        parse_features({**RECORD, "age": 120.5})
+
+def test_zero_means_not_measured():
+    row = parse_features({**RECORD, "glucose": 0, "bloodPressure": "0", "bmi": 0.0, "insulin": 0})
+    assert row.tolist() == [2.0, 0.0, 0.0, 25.0, 0.0, 0.0, 0.5, 35.0]
+
+    with pytest.raises(ValidationError):
+        parse_features({**RECORD, "glucose": 5})
+
+def test_rejects_non_objects():
+    with pytest.raises(ValidationError) as raised:
+        parse_features([RECORD])
+
+    assert raised.value.details == [{"field": None, "message": "Request body must be a JSON object"}]
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-v"]))
@@ -0,0 +1,14 @@
+"""
+Production WSGI entry point.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+With preload_app enabled (see gunicorn.conf.py) this module is imported once in
+the gunicorn master, so the model is loaded before the workers are forked and its
+weights are shared copy-on-write between them.
+"""
+
+from main import app, model_manager
+
+# Load synchronously: a background loader thread would not survive the fork
+model_manager.load()